@@ -0,0 +1,229 @@
+"""Admission control in front of outbound LLM calls.
+
+Every LLM request must first get a concurrency slot and then a reservation
+from two token buckets (requests per minute and tokens per minute). Callers
+wait in a bounded FIFO queue; when the queue is full, or the slot or the
+rate budget cannot be had before the caller's deadline, the request is shed
+with :class:`AdmissionRejected` and the caller answers without the LLM.
+
+Both the event loop and worker threads (sync graph nodes) can wait for a
+slot: async waiters are woken through their loop, sync waiters through an
+event, and all state sits behind one ``threading.Lock``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional
+
+
+class AdmissionRejected(RuntimeError):
+    """The LLM call was shed; answer with the fallback instead."""
+
+
+class TokenBucket:
+    """Continuous-refill bucket; reservations may overdraw and report how long to wait."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self._clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` now and return the seconds until the bucket is out of debt."""
+        self._refill()
+        self._level -= min(amount, self.capacity)
+        return -self._level / self.rate if self._level < 0 else 0.0
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self._level = min(self.capacity, self._level + amount)
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "event", "granted")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+
+    def wake(self) -> None:
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+        else:
+            self.event.set()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Concurrency limit, RPM/TPM buckets and a bounded, deadline-aware wait queue."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_queue: int = 100,
+        max_wait: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._clock = clock
+        self._requests = TokenBucket(requests_per_minute, clock) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, clock) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+        self._in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    # -- concurrency slots -------------------------------------------------
+
+    def _try_enter(self, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_Waiter]:
+        """Take a slot (returns ``None``) or join the queue (returns the waiter)."""
+        with self._lock:
+            if self._in_flight < self.max_concurrency and not self._waiters:
+                self._in_flight += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.shed += 1
+                raise AdmissionRejected("LLM kuyruğu dolu")
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Leave the queue after a timeout; ``True`` if a slot was granted meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def _count_shed(self) -> None:
+        with self._lock:
+            self.shed += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                waiter.wake()
+            else:
+                self._in_flight -= 1
+
+    # -- rate budget -------------------------------------------------------
+
+    def _reserve(self, tokens: float, deadline: float) -> float:
+        """Reserve rate budget; returns the wait or sheds when it would miss ``deadline``."""
+        with self._lock:
+            wait = 0.0
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(tokens))
+            if wait and self._clock() + wait > deadline:
+                if self._requests is not None:
+                    self._requests.refund(1)
+                if self._tokens is not None:
+                    self._tokens.refund(tokens)
+                self.shed += 1
+                raise AdmissionRejected("LLM hız sınırı aşıldı")
+            return wait
+
+    def _admitted(self, started: float) -> None:
+        waited = self._clock() - started
+        with self._lock:
+            self.admitted += 1
+            self.total_wait += waited
+            self.max_observed_wait = max(self.max_observed_wait, waited)
+
+    def settle(self, estimated_tokens: float, actual_tokens: Optional[float]) -> None:
+        """Correct the token bucket once the provider reports real usage."""
+        if self._tokens is None or actual_tokens is None:
+            return
+        with self._lock:
+            difference = estimated_tokens - actual_tokens
+            if difference > 0:
+                self._tokens.refund(difference)
+            else:
+                self._tokens.reserve(-difference)
+
+    # -- public API --------------------------------------------------------
+
+    @asynccontextmanager
+    async def aadmit(self, tokens: float = 0.0, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+        started = self._clock()
+        deadline = started + (self.max_wait if max_wait is None else max_wait)
+        waiter = self._try_enter(asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), deadline - self._clock())
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    self._count_shed()
+                    raise AdmissionRejected("LLM kuyruğunda bekleme süresi doldu") from None
+            except BaseException:
+                if self._abandon(waiter):
+                    self._release()
+                raise
+        try:
+            wait = self._reserve(tokens, deadline)
+            if wait:
+                await asyncio.sleep(wait)
+            self._admitted(started)
+            yield
+        finally:
+            self._release()
+
+    @contextmanager
+    def admit(self, tokens: float = 0.0, max_wait: Optional[float] = None) -> Iterator[None]:
+        started = self._clock()
+        deadline = started + (self.max_wait if max_wait is None else max_wait)
+        waiter = self._try_enter(None)
+        if waiter is not None:
+            if not waiter.event.wait(max(0.0, deadline - self._clock())) and not self._abandon(waiter):
+                self._count_shed()
+                raise AdmissionRejected("LLM kuyruğunda bekleme süresi doldu")
+        try:
+            wait = self._reserve(tokens, deadline)
+            if wait:
+                time.sleep(wait)
+            self._admitted(started)
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queue_length": len(self._waiters),
+                "max_concurrency": self.max_concurrency,
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "mean_wait_ms": round(self.total_wait * 1000 / self.admitted, 2) if self.admitted else 0.0,
+                "max_wait_ms": round(self.max_observed_wait * 1000, 2),
+            }
@@ -0,0 +1,465 @@
+"""Build and serve the embeddable widget assets.
+
+The widget files are minified, fingerprinted and pre-compressed once, in
+memory, when the app starts. ``/static/widget.<hash>.css`` style URLs are
+served with ``Cache-Control: immutable`` for a year, because their content
+can never change. Plain names such as ``/static/widget.js``, which customer
+pages embed, get a short ``max-age`` and are revalidated with their strong
+ETag, so a deploy reaches every site within minutes. References between
+assets (the widget loads its stylesheet) are rewritten to the fingerprinted
+URLs at build time.
+
+Responses are picked by ``Accept-Encoding``. Brotli is used when the
+optional ``brotli`` package is installed; otherwise gzip. Files outside the
+pipeline fall through to ``StaticFiles``. To write the built files plus a
+``manifest.json`` for a CDN or nginx ``gzip_static``, run::
+
+    python -m backend.assets --out dist/static
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CONTENT_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+}
+
+
+def _brotli_compress() -> Optional[Callable[[bytes], bytes]]:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return lambda data: brotli.compress(data, quality=11)
+
+
+# --- minifiers -------------------------------------------------------------
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_STRING = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+_CSS_SPACE_AROUND = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(source: str) -> str:
+    """Drop comments and redundant whitespace; string contents are left alone.
+
+    Spaces before ``:`` are kept (``a :hover`` differs from ``a:hover``).
+    """
+    parts = _CSS_STRING.split(_CSS_COMMENT.sub("", source))
+    for index in range(0, len(parts), 2):
+        code = " ".join(parts[index].split())
+        code = _CSS_SPACE_AROUND.sub(r"\1", code)
+        parts[index] = code.replace(": ", ":").replace(";}", "}")
+    return "".join(parts).strip()
+
+
+_WORD = re.compile(r"[A-Za-z0-9_$]")
+_TRAILING_WORD = re.compile(r"[A-Za-z0-9_$]+$")
+# After these a "/" starts a regular expression literal, not a division.
+_REGEX_AFTER_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_AFTER_WORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw"}
+
+
+def _string_end(source: str, start: int) -> int:
+    quote = source[start]
+    index = start + 1
+    while index < len(source):
+        char = source[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == quote:
+            return index + 1
+        index += 1
+    raise ValueError(f"unterminated string at offset {start}")
+
+
+def _template_end(source: str, start: int) -> int:
+    index = start + 1
+    while index < len(source):
+        char = source[index]
+        if char == "\\":
+            index += 2
+        elif char == "`":
+            return index + 1
+        elif source.startswith("${", index):
+            index = _code_end(source, index + 2)
+        else:
+            index += 1
+    raise ValueError(f"unterminated template literal at offset {start}")
+
+
+def _code_end(source: str, start: int) -> int:
+    """Offset just past the ``}`` closing a template substitution."""
+    depth = 0
+    index = start
+    while index < len(source):
+        char = source[index]
+        if char in "'\"":
+            index = _string_end(source, index)
+        elif char == "`":
+            index = _template_end(source, index)
+        elif char == "{":
+            depth += 1
+            index += 1
+        elif char == "}":
+            if depth == 0:
+                return index + 1
+            depth -= 1
+            index += 1
+        else:
+            index += 1
+    raise ValueError(f"unterminated template substitution at offset {start}")
+
+
+def _regex_end(source: str, start: int) -> int:
+    index = start + 1
+    in_class = False
+    while index < len(source):
+        char = source[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "\n":
+            raise ValueError(f"unterminated regular expression at offset {start}")
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            index += 1
+            while index < len(source) and _WORD.match(source[index]):
+                index += 1
+            return index
+        index += 1
+    raise ValueError(f"unterminated regular expression at offset {start}")
+
+
+def minify_js(source: str) -> str:
+    """Strip comments and indentation without parsing the script.
+
+    Line breaks are kept (collapsed to one), so automatic semicolon
+    insertion behaves exactly as in the source. Strings, template literals
+    and regular expressions are copied verbatim.
+    """
+    out: List[str] = []
+    index = 0
+    length = len(source)
+
+    def last() -> str:
+        return out[-1][-1] if out else "\n"
+
+    while index < length:
+        char = source[index]
+        if char in "'\"":
+            end = _string_end(source, index)
+        elif char == "`":
+            end = _template_end(source, index)
+        elif source.startswith("//", index):
+            newline = source.find("\n", index)
+            index = length if newline == -1 else newline
+            continue
+        elif source.startswith("/*", index):
+            close = source.find("*/", index + 2)
+            if close == -1:
+                raise ValueError(f"unterminated comment at offset {index}")
+            comment = source[index : close + 2]
+            index = close + 2
+            # A comment spanning lines still separates statements.
+            if "\n" in comment and last() != "\n":
+                out.append("\n")
+            continue
+        elif char.isspace():
+            end = index
+            while end < length and source[end].isspace():
+                end += 1
+            following = source[end] if end < length else ""
+            previous = last()
+            if "\n" in source[index:end]:
+                if previous != "\n" and following:
+                    out.append("\n")
+            elif (
+                following
+                and previous != "\n"
+                and (
+                    (_WORD.match(previous) and _WORD.match(following))
+                    or (previous in "+-" and following in "+-")
+                )
+            ):
+                out.append(" ")
+            index = end
+            continue
+        elif char == "/":
+            previous = last()
+            words = _TRAILING_WORD.search("".join(out[-12:]))
+            if previous in _REGEX_AFTER_CHARS or previous == "\n" or (
+                words is not None and words.group() in _REGEX_AFTER_WORDS
+            ):
+                end = _regex_end(source, index)
+            else:
+                end = index + 1
+        else:
+            end = index + 1
+        out.append(source[index:end])
+        index = end
+    return "".join(out).strip() + "\n"
+
+
+MINIFIERS: Dict[str, Callable[[str], str]] = {".css": minify_css, ".js": minify_js}
+
+
+# --- pipeline --------------------------------------------------------------
+
+
+@dataclass
+class Asset:
+    name: str
+    hashed_name: str
+    content_type: str
+    # Encoding ("identity", "gzip", "br") -> body; only encodings that save bytes are kept
+    bodies: Dict[str, bytes]
+    etag: str
+
+    def etag_for(self, encoding: str) -> str:
+        # Strong ETags must differ between content codings of the same version.
+        return self.etag if encoding == "identity" else f'{self.etag[:-1]}-{encoding}"'
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_filename(name: str, digest: str) -> str:
+    path = Path(name)
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}"))
+
+
+def build_asset(
+    name: str, text: str, brotli: Optional[Callable[[bytes], bytes]] = None
+) -> Asset:
+    minify = MINIFIERS.get(Path(name).suffix)
+    data = (minify(text) if minify else text).encode("utf-8")
+    digest = fingerprint(data)
+    bodies = {"identity": data}
+    compressed = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli(data)
+    for encoding, body in compressed.items():
+        if len(body) < len(data):
+            bodies[encoding] = body
+    return Asset(
+        name=name,
+        hashed_name=hashed_filename(name, digest),
+        content_type=CONTENT_TYPES.get(Path(name).suffix, "application/octet-stream"),
+        bodies=bodies,
+        etag=f'"{digest}"',
+    )
+
+
+class AssetPipeline:
+    """Minified, fingerprinted and pre-compressed copies of ``files``.
+
+    Files are processed in order, and later files have references to
+    earlier ones (``/static/widget.css``) rewritten to their fingerprinted
+    URLs. The build runs once, on first use or when :meth:`build` is called
+    at startup.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str,
+        files: Sequence[str],
+        url_prefix: str = "/static/",
+        brotli: Optional[Callable[[bytes], bytes]] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.files = list(files)
+        self.url_prefix = url_prefix
+        self.brotli = brotli if brotli is not None else _brotli_compress()
+        self._by_path: Optional[Dict[str, Tuple[Asset, bool]]] = None
+        self._assets: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+
+    def build(self) -> Dict[str, str]:
+        """(Re)build every asset; returns the logical -> fingerprinted name manifest."""
+        assets: Dict[str, Asset] = {}
+        for name in self.files:
+            path = self.directory / name
+            if not path.is_file():
+                logger.warning("Statik dosya bulunamadı, atlandı: %s", path)
+                continue
+            text = path.read_text(encoding="utf-8")
+            for built in assets.values():
+                text = text.replace(self.url_prefix + built.name, self.url_prefix + built.hashed_name)
+            assets[name] = build_asset(name, text, self.brotli)
+
+        by_path: Dict[str, Tuple[Asset, bool]] = {}
+        for asset in assets.values():
+            by_path[asset.name] = (asset, False)
+            by_path[asset.hashed_name] = (asset, True)
+        with self._lock:
+            self._assets = assets
+            self._by_path = by_path
+        sizes = (f"{asset.hashed_name} ({len(asset.bodies['identity'])} B)" for asset in assets.values())
+        logger.info("📦 Statik dosyalar hazırlandı: %s", ", ".join(sizes))
+        return self.manifest()
+
+    def _ensure_built(self) -> Dict[str, Tuple[Asset, bool]]:
+        if self._by_path is None:
+            self.build()
+        return self._by_path or {}
+
+    def lookup(self, path: str) -> Optional[Tuple[Asset, bool]]:
+        """``(asset, immutable)`` for a logical or fingerprinted name."""
+        return self._ensure_built().get(path)
+
+    def get(self, name: str) -> Optional[Asset]:
+        self._ensure_built()
+        return self._assets.get(name)
+
+    def manifest(self) -> Dict[str, str]:
+        self._ensure_built()
+        return {name: asset.hashed_name for name, asset in self._assets.items()}
+
+    def url(self, name: str) -> str:
+        asset = self.get(name)
+        return self.url_prefix + (asset.hashed_name if asset else name)
+
+    def write(self, directory: Path | str) -> Dict[str, str]:
+        """Write every asset under its fingerprinted name (plus ``.gz``/``.br``) and a manifest."""
+        target = Path(directory)
+        target.mkdir(parents=True, exist_ok=True)
+        manifest = self.build()
+        suffixes = {"identity": "", "gzip": ".gz", "br": ".br"}
+        for asset in self._assets.values():
+            for encoding, body in asset.bodies.items():
+                (target / (asset.hashed_name + suffixes[encoding])).write_bytes(body)
+        (target / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+        return manifest
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(asset: Asset, accept_encoding: str) -> str:
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding in ("br", "gzip"):
+        if encoding in asset.bodies and accepted.get(encoding, 0.0) > 0:
+            return encoding
+    return "identity"
+
+
+def _etag_matches(asset: Asset, if_none_match: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(asset.etag_for(encoding) in tags for encoding in asset.bodies)
+
+
+def asset_response(
+    asset: Asset, request_headers: Mapping[str, str], cache_control: str, head: bool = False
+) -> Response:
+    """200 with the best encoding, or 304 when ``If-None-Match`` names this version."""
+    encoding = negotiate_encoding(asset, request_headers.get("accept-encoding", ""))
+    headers = {
+        "Cache-Control": cache_control,
+        "ETag": asset.etag_for(encoding),
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and _etag_matches(asset, if_none_match):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    body = asset.bodies[encoding]
+    response = Response(content=b"" if head else body, headers=headers, media_type=asset.content_type)
+    response.headers["Content-Length"] = str(len(body))
+    return response
+
+
+class AssetFiles:
+    """ASGI app serving pipeline assets, delegating everything else to ``StaticFiles``."""
+
+    def __init__(self, pipeline: AssetPipeline, fallback: StaticFiles, max_age: int = 300) -> None:
+        self.pipeline = pipeline
+        self.fallback = fallback
+        self.cache_control = f"public, max-age={max_age}, must-revalidate"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            path = self.fallback.get_path(scope)
+            if path == "manifest.json":
+                response: Response = Response(
+                    json.dumps(self.pipeline.manifest()),
+                    media_type="application/json",
+                    headers={"Cache-Control": "no-cache"},
+                )
+                await response(scope, receive, send)
+                return
+            found = self.pipeline.lookup(path)
+            if found is not None:
+                asset, immutable = found
+                headers = {
+                    key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]
+                }
+                response = asset_response(
+                    asset,
+                    headers,
+                    IMMUTABLE_CACHE_CONTROL if immutable else self.cache_control,
+                    head=scope["method"] == "HEAD",
+                )
+                await response(scope, receive, send)
+                return
+        await self.fallback(scope, receive, send)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Minify, fingerprint and pre-compress the widget assets.")
+    parser.add_argument("--source", type=Path, default=Path(__file__).resolve().parent.parent / "frontend")
+    parser.add_argument("--out", type=Path, help="write the built files and manifest.json here")
+    parser.add_argument("files", nargs="*", default=["widget.css", "widget.js"])
+    args = parser.parse_args()
+
+    pipeline = AssetPipeline(args.source, args.files)
+    manifest = pipeline.write(args.out) if args.out else pipeline.build()
+    for name, hashed in manifest.items():
+        asset = pipeline.get(name)
+        sizes = ", ".join(f"{encoding}={len(body)}" for encoding, body in asset.bodies.items())
+        print(f"{name} -> {hashed} ({sizes})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Batch runs of many chat turns for replays, evaluations and bulk traffic.
+
+Items are grouped by session: turns of one session run in input order (they
+share conversation memory), while up to ``concurrency`` sessions run at the
+same time. Retrieval for every distinct message is computed up front in one
+call (:func:`backend.graph.prefetch_retrieval`) and shared by all turns, and
+finished turns are written in groups of ``persist_batch_size`` with one
+insert each instead of one commit per turn. Results are yielded in completion
+order with the latency of each turn, followed by one closing record
+``{"done": true, "persisted": ..., "persist_failed": ...}`` once every
+write has been attempted, so lost writes are visible to the caller.
+
+Batch turns do not count towards the live session metrics. The CLI replays a
+JSON-lines file in-process or against a running server::
+
+    python -m backend.batch requests.jsonl --concurrency 32 > results.ndjson
+    python -m backend.batch requests.jsonl --url http://localhost:8000 --admin-token secret
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+from backend import graph
+from backend.config import settings
+from backend.persistence import PendingTurn, apersist_turns
+from backend.sessions import SessionCoordinator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    index: int
+    session_id: str
+    message: str
+    message_id: Optional[str] = None
+    # Opaque client id echoed back with the result
+    id: Any = None
+
+
+def parse_items(records: Iterable[Any], session_prefix: str = "batch") -> List[BatchItem]:
+    """Validate decoded records; raises ``ValueError`` naming the first bad one.
+
+    ``body`` is accepted for ``message`` so transcript dumps replay as-is.
+    Records without a ``session_id`` each get a session of their own.
+    """
+    items = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f"item {index}: expected an object")
+        message = str(record.get("message") or record.get("body") or "").strip()
+        if not message:
+            raise ValueError(f"item {index}: message is empty")
+        items.append(
+            BatchItem(
+                index=index,
+                session_id=str(record.get("session_id") or f"{session_prefix}-{index}"),
+                message=message,
+                message_id=record.get("message_id") or None,
+                id=record.get("id"),
+            )
+        )
+    return items
+
+
+def parse_ndjson(lines: Iterable[str | bytes]) -> List[Any]:
+    records = []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"line {number}: {exc.msg}") from exc
+    return records
+
+
+class _TurnBuffer:
+    """Collects finished turns and writes them ``size`` at a time."""
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, size)
+        self._turns: List[PendingTurn] = []
+        self.written = 0
+        self.failed = 0
+
+    async def add(self, turn: PendingTurn) -> None:
+        self._turns.append(turn)
+        if len(self._turns) >= self.size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        turns, self._turns = self._turns, []
+        if not turns:
+            return
+        try:
+            await apersist_turns(turns)
+        except Exception:
+            self.failed += len(turns)
+            logger.exception("Toplu çalıştırma mesajları kaydedilemedi (%d tur)", len(turns))
+        else:
+            self.written += len(turns)
+
+
+async def run_batch(
+    items: Sequence[BatchItem],
+    concurrency: int = 16,
+    persist: bool = True,
+    persist_batch_size: int = 200,
+    coordinator: Optional[SessionCoordinator] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run ``items`` through the agent and yield one result per item as it finishes.
+
+    The closing ``done`` record comes last and only when the run completes.
+    With a ``coordinator`` batch turns also queue behind live turns of the
+    same session and reuse its message-id deduplication. Closing the
+    generator early cancels the turns still running.
+    """
+    sessions: "OrderedDict[str, List[BatchItem]]" = OrderedDict()
+    for item in items:
+        sessions.setdefault(item.session_id, []).append(item)
+    pending = list(sessions.values())
+    pending.reverse()
+
+    prefetched = await graph.run_sync(graph.prefetch_retrieval, [item.message for item in items])
+    buffer = _TurnBuffer(persist_batch_size)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def run_item(item: BatchItem) -> Dict[str, Any]:
+        async def turn() -> Dict[str, Any]:
+            return await graph.arun_agent(item.session_id, item.message, persist=False)
+
+        received_at = datetime.utcnow()
+        started = time.perf_counter()
+        if coordinator is not None:
+            result, coalesced = await coordinator.run(item.session_id, item.message_id, turn)
+        else:
+            result, coalesced = await turn(), False
+        latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        if persist and not coalesced:
+            turn_record = PendingTurn(
+                item.session_id, item.message, result["response"], result["metadata"], received_at
+            )
+            await buffer.add(turn_record)
+        return {
+            "response": result["response"],
+            "metadata": result.get("metadata", {}),
+            "latency_ms": latency_ms,
+        }
+
+    async def worker() -> None:
+        graph.BATCH_RETRIEVAL.set(prefetched)
+        while pending:
+            for item in pending.pop():
+                line: Dict[str, Any] = {
+                    "index": item.index,
+                    "id": item.id,
+                    "session_id": item.session_id,
+                }
+                if item.message_id:
+                    line["message_id"] = item.message_id
+                try:
+                    line.update(await run_item(item))
+                except Exception as exc:
+                    logger.exception("Toplu çalıştırma turu başarısız: %s", item.session_id)
+                    line["error"] = str(exc) or type(exc).__name__
+                await results.put(line)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(sessions))))]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if persist:
+            await buffer.flush()
+    yield {"done": True, "persisted": buffer.written, "persist_failed": buffer.failed}
+
+
+async def _replay_local(
+    items: Sequence[BatchItem], concurrency: int, persist: bool
+) -> AsyncIterator[Dict[str, Any]]:
+    from backend.database import init_db
+
+    await init_db()
+    async for line in run_batch(
+        items,
+        concurrency=concurrency,
+        persist=persist,
+        persist_batch_size=settings.PERSISTENCE_MAX_BATCH_SIZE,
+    ):
+        yield line
+
+
+async def _replay_remote(
+    items: Sequence[BatchItem], url: str, concurrency: int, admin_token: Optional[str]
+) -> AsyncIterator[Dict[str, Any]]:
+    import httpx
+
+    headers = {"Content-Type": "application/x-ndjson"}
+    if admin_token:
+        headers["X-Admin-Token"] = admin_token
+    records = (
+        {"session_id": item.session_id, "message": item.message, "message_id": item.message_id, "id": item.id}
+        for item in items
+    )
+    body = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+        async with client.stream(
+            "POST",
+            "/api/chat/batch",
+            params={"concurrency": concurrency},
+            content=body.encode(),
+            headers=headers,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+async def _replay(args: argparse.Namespace) -> Dict[str, Any]:
+    with args.path.open(encoding="utf-8") as handler:
+        items = parse_items(parse_ndjson(handler), session_prefix=args.session_prefix)
+    if args.limit:
+        items = items[: args.limit]
+
+    if args.url:
+        lines = _replay_remote(items, args.url, args.concurrency, args.admin_token)
+    else:
+        lines = _replay_local(items, args.concurrency, not args.no_persist)
+
+    started = time.perf_counter()
+    latencies: List[float] = []
+    failed = 0
+    status: Dict[str, Any] = {}
+    async for line in lines:
+        if line.get("done"):
+            status = line
+            continue
+        sys.stdout.write(json.dumps(line, ensure_ascii=False) + "\n")
+        if "error" in line:
+            failed += 1
+        else:
+            latencies.append(line["latency_ms"])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "items": len(items),
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "items_per_second": round(len(items) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+        "persisted": status.get("persisted"),
+        "persist_failed": status.get("persist_failed"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a JSON-lines file of chat messages as one batch.")
+    parser.add_argument("path", type=Path, help="objects with message (or body) and optional session_id")
+    parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY)
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N items")
+    parser.add_argument("--session-prefix", default="replay", help="session prefix for items without one")
+    parser.add_argument("--no-persist", action="store_true", help="do not store the replayed turns")
+    parser.add_argument("--url", help="send the batch to a running server instead of running in-process")
+    parser.add_argument("--admin-token")
+    args = parser.parse_args()
+
+    summary = asyncio.run(_replay(args))
+    print(json.dumps(summary), file=sys.stderr)
+    if summary["persist_failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
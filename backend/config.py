@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -19,10 +19,145 @@ class Settings(BaseSettings):
     DATABASE_URL: Optional[str] = None
     SQLITE_URL: str = "sqlite+aiosqlite:///./webchat_ai.db"
 
+    # Connection pools; the sync pool only serves the write-behind thread and background jobs
+    DB_POOL_SIZE: int = 5
+    DB_SYNC_POOL_SIZE: int = 2
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    # Reconnect connections older than this; -1 keeps them forever
+    DB_POOL_RECYCLE_SECONDS: float = 1_800.0
+    # How long SQLite writers wait for the database lock before failing
+    SQLITE_BUSY_TIMEOUT_SECONDS: float = 5.0
+
     GROQ_API_KEY: Optional[str] = None
     GROQ_MODEL: str = "llama3-70b-8192"
 
+    # Admission control for outbound LLM calls (defaults match Groq's free tier);
+    # calls that cannot start within LLM_MAX_WAIT_SECONDS get the rule-based answer
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_REQUESTS_PER_MINUTE: Optional[float] = 30
+    LLM_TOKENS_PER_MINUTE: Optional[float] = 6_000
+    LLM_MAX_QUEUE: int = 100
+    LLM_MAX_WAIT_SECONDS: float = 5.0
+    LLM_COMPLETION_TOKENS_ESTIMATE: int = 256
+    # Rounds of model-requested tool calls per turn before a final answer is forced
+    LLM_MAX_TOOL_ITERATIONS: int = 3
+
+    # Cache for LLM answers keyed on normalized question + retrieved context
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    RESPONSE_CACHE_PATH: Path = Path("response_cache.db")
+    RESPONSE_CACHE_SIZE: int = 5_000
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    RESPONSE_CACHE_MAX_VALUE_CHARS: int = 8_000
+
+    # LangGraph checkpointer holding per-session conversation state
+    CHECKPOINT_BACKEND: Literal["memory", "sqlite"] = "sqlite"
+    CHECKPOINT_PATH: Path = Path("checkpoints.db")
+    # Latest checkpoint of recently active sessions kept in memory; 0 disables
+    CHECKPOINT_CACHE_SIZE: int = 1_000
+    CHECKPOINT_CACHE_TTL_SECONDS: float = 900.0
+    # Turns kept verbatim; older ones are folded into a rolling summary
+    HISTORY_MAX_TURNS: int = 10
+    # Token budget for prior turns sent to the LLM
+    HISTORY_MAX_TOKENS: int = 2_000
+    HISTORY_SUMMARY_MAX_CHARS: int = 1_500
+
+    # JSON/JSONL file or a directory of shards
     KNOWLEDGE_BASE_PATH: Path = Path("knowledge/kb.json")
+    # Optional prebuilt index (python -m backend.kb_index); memory-mapped and shared by workers
+    KNOWLEDGE_INDEX_PATH: Optional[Path] = None
+    # "bm25" (lexical), "vector" (hashed n-gram embeddings) or "hybrid"
+    RETRIEVAL_MODE: Literal["bm25", "vector", "hybrid"] = "bm25"
+    VECTOR_DIMENSIONS: int = 256
+    VECTOR_MIN_SCORE: float = 0.15
+    HYBRID_LEXICAL_WEIGHT: float = 0.5
+    # Seconds between knowledge base file checks; 0 disables background reloads
+    KNOWLEDGE_BASE_RELOAD_INTERVAL_SECONDS: float = 5.0
+
+    # Intent keywords, weights and entity patterns compiled by backend.intents
+    INTENTS_PATH: Path = Path("knowledge/intents.json")
+
+    # Window in which a repeated client message_id returns the first answer
+    MESSAGE_DEDUP_WINDOW_SECONDS: float = 300.0
+    MESSAGE_DEDUP_CACHE_SIZE: int = 10_000
+
+    # Sessions idle this long drop out of /api/metrics; the table is capped at METRICS_MAX_SESSIONS
+    METRICS_SESSION_IDLE_SECONDS: float = 1_800.0
+    METRICS_MAX_SESSIONS: int = 10_000
+
+    # Worker processes serving the app (set by gunicorn.conf.py); >1 disables per-process
+    # caches that would go stale when a session's turns land on different workers
+    WORKERS: int = 1
+    # Where workers publish state for cross-worker aggregation ("sqlite" for multi-worker;
+    # put the file on /dev/shm to keep it in memory)
+    SHARED_STATE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    SHARED_STATE_PATH: Path = Path("shared_state.db")
+    # Seconds between metric publications; entries older than 3 intervals are ignored
+    METRICS_PUBLISH_INTERVAL_SECONDS: float = 5.0
+
+    # Share of turns traced, and of traced turns whose sync nodes run under cProfile/tracemalloc
+    TRACE_SAMPLE_RATE: float = 1.0
+    TRACE_PROFILE_RATE: float = 0.0
+    TRACE_BUFFER_SIZE: int = 200
+    # Append finished traces as OTLP/JSON lines when set
+    TRACE_EXPORT_PATH: Optional[Path] = None
+
+    # Tool execution: "mock" simulates remote services with latency/failures for load tests
+    TOOL_BACKEND: Literal["local", "mock"] = "local"
+    TOOL_TIMEOUT_SECONDS: float = 2.5
+    # Per-tool result cache TTLs; tools missing here are not cached
+    TOOL_CACHE_TTL_SECONDS: Dict[str, float] = {
+        "policy_lookup": 6 * 3600.0,
+        "calculate_shipping": 3600.0,
+        "check_order_status": 10.0,
+    }
+    TOOL_CACHE_SIZE: int = 1_024
+    TOOL_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    TOOL_CIRCUIT_RESET_SECONDS: float = 30.0
+    TOOL_MOCK_MIN_LATENCY_SECONDS: float = 0.1
+    TOOL_MOCK_MAX_LATENCY_SECONDS: float = 2.0
+    TOOL_MOCK_FAILURE_RATE: float = 0.0
+
+    # Messages older than this are archived and deleted by month (KVKK); None keeps them forever
+    RETENTION_DAYS: Optional[float] = None
+    RETENTION_INTERVAL_SECONDS: float = 6 * 3600.0
+    # Expired months are written here before deletion; None deletes without archiving
+    RETENTION_ARCHIVE_DIR: Optional[Path] = Path("archive")
+    RETENTION_ARCHIVE_FORMAT: Literal["jsonl.gz", "parquet"] = "jsonl.gz"
+    # Monthly PostgreSQL partitions of `messages` created ahead of time
+    MESSAGE_PARTITIONS_AHEAD: int = 2
+
+    # Rows fetched per round-trip when exporting a transcript as NDJSON
+    TRANSCRIPT_EXPORT_BATCH_SIZE: int = 1_000
+
+    # POST /api/chat/batch: sessions of a batch run in parallel, turns of one session in order
+    BATCH_MAX_ITEMS: int = 50_000
+    BATCH_CONCURRENCY: int = 16
+    BATCH_MAX_CONCURRENCY: int = 64
+
+    # Required in the X-Admin-Token header for /api/admin/*, /api/conversations/* and /api/chat/batch;
+    # those endpoints answer 403 while it is unset
+    ADMIN_TOKEN: Optional[str] = None
+
+    # Upper bound for threads used to run synchronous graph nodes from async handlers
+    AGENT_SYNC_POOL_SIZE: int = 32
+
+    # Write-behind persistence: turns are queued and flushed in bulk by a background worker
+    PERSISTENCE_WRITE_BEHIND: bool = True
+    PERSISTENCE_MAX_BATCH_SIZE: int = 200
+    PERSISTENCE_MAX_DELAY_SECONDS: float = 0.05
+    PERSISTENCE_QUEUE_SIZE: int = 10_000
+
+    # session_id -> conversation id cache used by the persistence layer
+    CONVERSATION_CACHE_SIZE: int = 10_000
+    CONVERSATION_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Widget files minified, fingerprinted and pre-compressed at startup (backend/assets.py)
+    STATIC_ASSETS: List[str] = Field(default_factory=lambda: ["widget.css", "widget.js", "index.html"])
+    # Cache lifetime of un-hashed URLs such as /static/widget.js embedded on customer pages
+    STATIC_MAX_AGE_SECONDS: int = 300
 
     ALLOWED_ORIGINS: List[str] = Field(default_factory=lambda: ["*"])
 
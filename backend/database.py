@@ -1,13 +1,147 @@
-"""Database engines and session helpers."""
+"""Database engines and session helpers.
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+Both engines come from :func:`build_engine` and share the ``DB_*`` pool
+settings. SQLAlchemy cannot hand one pool to a sync and an async driver, so
+the async engine serves request handlers while the sync engine, sized by
+``DB_SYNC_POOL_SIZE``, only serves the write-behind thread and background
+jobs. SQLite connections get WAL, ``synchronous=NORMAL`` and a busy timeout
+so concurrent writers wait for the lock instead of failing with "database
+is locked". Every pool records how long checkouts wait and how close it is
+to its limit (:func:`database_stats`).
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional, Type
+
+from sqlalchemy import create_engine, event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
 
 from backend.config import settings
+from backend.metrics import LatencyHistogram
+
+
+class PoolTelemetry:
+    """Checkout wait times and timeouts of one connection pool."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.wait = LatencyHistogram()
+        self.timeouts = 0
+
+
+def _timed(base: Type[Pool]) -> Type[Pool]:
+    class TimedPool(base):  # type: ignore[valid-type, misc]
+        telemetry: PoolTelemetry
+
+        # _do_get is where a checkout blocks on a full pool (or opens a connection).
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                record = super()._do_get()
+            except sa_exc.TimeoutError:
+                self.telemetry.timeouts += 1
+                raise
+            self.telemetry.wait.observe(time.perf_counter() - started)
+            return record
+
+        def recreate(self):
+            # dispose() swaps in a fresh pool; keep counting into the same telemetry.
+            pool = super().recreate()
+            pool.telemetry = self.telemetry
+            return pool
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+TimedQueuePool = _timed(QueuePool)
+TimedAsyncQueuePool = _timed(AsyncAdaptedQueuePool)
+
 
-# Async SQLAlchemy engine/session (FastAPI startup & background jobs)
-async_engine = create_async_engine(settings.database_url, echo=False, future=True)
+def _sqlite_pragmas(busy_timeout: float):
+    def on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        cursor.close()
+
+    return on_connect
+
+
+def build_engine(
+    url: str,
+    asynchronous: bool,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30.0,
+    pre_ping: bool = True,
+    recycle: float = 1_800.0,
+    sqlite_busy_timeout: float = 5.0,
+) -> Engine | AsyncEngine:
+    """Create an engine with an instrumented, explicitly sized pool."""
+    sqlite = url.startswith("sqlite")
+    in_memory = sqlite and (":memory:" in url or url.rstrip("/").endswith(":"))
+    options: Dict[str, Any] = {
+        "echo": False,
+        # A local SQLite file cannot drop a connection, so pinging it is wasted work.
+        "pool_pre_ping": pre_ping and not sqlite,
+        "pool_recycle": recycle,
+    }
+    if not in_memory:
+        options.update(
+            poolclass=TimedAsyncQueuePool if asynchronous else TimedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+        )
+    if sqlite:
+        options["connect_args"] = {"timeout": sqlite_busy_timeout}
+
+    engine = create_async_engine(url, **options) if asynchronous else create_engine(url, **options)
+    sync_engine = engine.sync_engine if asynchronous else engine
+    if sqlite and not in_memory:
+        event.listen(sync_engine, "connect", _sqlite_pragmas(sqlite_busy_timeout))
+    if isinstance(sync_engine.pool, (TimedQueuePool, TimedAsyncQueuePool)):
+        sync_engine.pool.telemetry = PoolTelemetry(pool_size + max(max_overflow, 0))
+    return engine
+
+
+def pool_stats(engine: Engine | AsyncEngine) -> Dict[str, Any]:
+    pool = (engine.sync_engine if isinstance(engine, AsyncEngine) else engine).pool
+    telemetry: Optional[PoolTelemetry] = getattr(pool, "telemetry", None)
+    if telemetry is None:
+        return {"pool": type(pool).__name__}
+    checked_out = pool.checkedout()
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "capacity": telemetry.capacity,
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / telemetry.capacity, 3) if telemetry.capacity else 0.0,
+        "timeouts": telemetry.timeouts,
+        "checkout_wait": telemetry.wait.summary(),
+    }
+
+
+# Async SQLAlchemy engine/session (request handlers, history reads)
+async_engine = build_engine(
+    settings.database_url,
+    asynchronous=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pre_ping=settings.DB_POOL_PRE_PING,
+    recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    sqlite_busy_timeout=settings.SQLITE_BUSY_TIMEOUT_SECONDS,
+)
 AsyncSessionLocal = sessionmaker(
     async_engine,
     class_=AsyncSession,
@@ -17,10 +151,18 @@ AsyncSessionLocal = sessionmaker(
 Base = declarative_base()
 
 
+def _create_schema(connection) -> None:
+    Base.metadata.create_all(connection)
+    # create_all skips indexes of tables that already exist; add ones introduced later.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
 async def init_db() -> None:
-    """Create database tables on startup."""
+    """Create database tables and indexes on startup."""
     async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_schema)
 
 
 async def get_async_db():
@@ -29,8 +171,17 @@ async def get_async_db():
         yield session
 
 
-# Sync engine/session pair for LangGraph workflow persistence
-sync_engine = create_engine(settings.sync_database_url, echo=False, future=True)
+# Sync engine/session pair for the write-behind thread, retention and sync graph runs
+sync_engine = build_engine(
+    settings.sync_database_url,
+    asynchronous=False,
+    pool_size=settings.DB_SYNC_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pre_ping=settings.DB_POOL_PRE_PING,
+    recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    sqlite_busy_timeout=settings.SQLITE_BUSY_TIMEOUT_SECONDS,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
 
@@ -41,3 +192,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def database_stats() -> Dict[str, Any]:
+    return {"async": pool_stats(async_engine), "sync": pool_stats(sync_engine)}
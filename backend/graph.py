@@ -2,37 +2,160 @@
 
 from __future__ import annotations
 
-import re
-import unicodedata
-from typing import Annotated, Dict, List, Literal, TypedDict
+import asyncio
+import contextvars
+import functools
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import (
+    Annotated,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    TypedDict,
+)
 
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
 from langgraph.graph import END, StateGraph
 from langgraph.graph.message import add_messages
+from langgraph.utils.runnable import RunnableCallable
 
+from backend.admission import AdmissionController, AdmissionRejected
 from backend.config import settings
-from backend.database import SessionLocal
-from backend.models import Conversation, Message as MessageModel
-from backend.rag_setup import load_knowledge_base, mini_rag_search
-from backend.tools import (
-    TOOL_REGISTRY,
-    calculate_shipping,
-    check_order_status,
-    policy_lookup,
+from backend.intents import IntentClassifier
+from backend.knowledge import KnowledgeBaseManager
+from backend.memory import (
+    approximate_tokens,
+    build_checkpointer,
+    conversation_turns,
+    extractive_summary,
+    split_for_summary,
+    trim_history,
+)
+from backend.metrics import metrics_state
+from backend.persistence import PendingTurn, apersist_turns, persist_turns, write_behind
+from backend.rag_setup import mini_rag_search
+from backend.response_cache import build_response_cache
+from backend.tool_executor import (
+    MockToolService,
+    ToolCall,
+    ToolResult,
+    build_tool_executor,
 )
+from backend.tools import TOOL_REGISTRY
+from backend.tracing import Tracer
 
 try:  # Optional Groq LLM integration
     if settings.GROQ_API_KEY:
         from langchain_groq import ChatGroq
 
-        _llm = ChatGroq(model=settings.GROQ_MODEL, api_key=settings.GROQ_API_KEY, temperature=0.2)
-        LLM_WITH_TOOLS = _llm.bind_tools(TOOL_REGISTRY)
+        CHAT_LLM = ChatGroq(model=settings.GROQ_MODEL, api_key=settings.GROQ_API_KEY, temperature=0.2)
+        LLM_WITH_TOOLS = CHAT_LLM.bind_tools(TOOL_REGISTRY)
     else:
+        CHAT_LLM = None
         LLM_WITH_TOOLS = None
 except Exception:
+    CHAT_LLM = None
     LLM_WITH_TOOLS = None
+SUMMARY_LLM = CHAT_LLM
+
+logger = logging.getLogger(__name__)
+
+_embedder = None
+if settings.RETRIEVAL_MODE != "bm25":
+    from backend.vector_search import HashingEmbedder
+
+    _embedder = HashingEmbedder(dim=settings.VECTOR_DIMENSIONS)
+
+KNOWLEDGE_BASE = KnowledgeBaseManager(
+    settings.KNOWLEDGE_BASE_PATH,
+    settings.KNOWLEDGE_INDEX_PATH,
+    embedder=_embedder,
+    lexical_weight=0.0 if settings.RETRIEVAL_MODE == "vector" else settings.HYBRID_LEXICAL_WEIGHT,
+    min_vector_score=settings.VECTOR_MIN_SCORE,
+)
+
+
+RESPONSE_CACHE = (
+    build_response_cache(
+        settings.RESPONSE_CACHE_BACKEND,
+        maxsize=settings.RESPONSE_CACHE_SIZE,
+        ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+        path=settings.RESPONSE_CACHE_PATH,
+        max_value_chars=settings.RESPONSE_CACHE_MAX_VALUE_CHARS,
+    )
+    if settings.RESPONSE_CACHE_ENABLED
+    else None
+)
+
+LLM_ADMISSION = AdmissionController(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    max_queue=settings.LLM_MAX_QUEUE,
+    max_wait=settings.LLM_MAX_WAIT_SECONDS,
+)
+
+TRACER = Tracer(
+    service_name=settings.APP_NAME,
+    sample_rate=settings.TRACE_SAMPLE_RATE,
+    profile_rate=settings.TRACE_PROFILE_RATE,
+    buffer_size=settings.TRACE_BUFFER_SIZE,
+    export_path=settings.TRACE_EXPORT_PATH,
+)
+
+CHECKPOINTER = build_checkpointer(
+    settings.CHECKPOINT_BACKEND,
+    settings.CHECKPOINT_PATH,
+    cache_size=settings.CHECKPOINT_CACHE_SIZE if settings.WORKERS == 1 else 0,
+    cache_ttl=settings.CHECKPOINT_CACHE_TTL_SECONDS,
+)
 
-KNOWLEDGE_BASE = load_knowledge_base(settings.KNOWLEDGE_BASE_PATH)
+
+def _estimated_tokens(messages: List[BaseMessage]) -> int:
+    return approximate_tokens(messages) + settings.LLM_COMPLETION_TOKENS_ESTIMATE
+
+
+def _settle_usage(estimate: int, ai_message: BaseMessage, span) -> None:
+    usage = getattr(ai_message, "usage_metadata", None) or {}
+    LLM_ADMISSION.settle(estimate, usage.get("total_tokens"))
+    if usage:
+        span.set_attribute("llm.total_tokens", usage.get("total_tokens", 0))
+
+
+def call_llm(model, messages: List[BaseMessage]) -> BaseMessage:
+    """Invoke ``model`` through ``LLM_ADMISSION``; raises :class:`AdmissionRejected` when shed."""
+    estimate = _estimated_tokens(messages)
+    with TRACER.span("llm.chat", **{"llm.tokens_estimate": estimate}) as span:
+        with LLM_ADMISSION.admit(estimate):
+            ai_message = model.invoke(messages)
+        _settle_usage(estimate, ai_message, span)
+    return ai_message
+
+
+async def acall_llm(model, messages: List[BaseMessage]) -> BaseMessage:
+    """Async variant of :func:`call_llm`."""
+    estimate = _estimated_tokens(messages)
+    with TRACER.span("llm.chat", **{"llm.tokens_estimate": estimate}) as span:
+        async with LLM_ADMISSION.aadmit(estimate):
+            ai_message = await model.ainvoke(messages)
+        _settle_usage(estimate, ai_message, span)
+    return ai_message
 
 
 class AgentState(TypedDict):
@@ -40,80 +163,212 @@ class AgentState(TypedDict):
     intent: Literal["faq", "tool", "general"]
     context: Dict[str, str]
     next: Literal["retriever", "tool_caller", "response_builder", str]
+    # Rolling summary of turns that no longer fit the history window
+    summary: str
+    # Classifier output reused by downstream nodes (order_id, city, topic...)
+    entities: Dict[str, str]
+    confidence: float
+    # LLM tool-call rounds executed in the current turn
+    tool_iterations: int
+
+
+_SUMMARY_PROMPT = (
+    "Aşağıdaki önceki özeti ve konuşma parçasını, sonraki cevaplarda gerekecek "
+    "bilgileri (sipariş numaraları, tercihler, açık sorular) koruyarak kısa bir "
+    "özet halinde birleştir."
+)
 
 
-def _normalize_text(text: str) -> str:
-    """Case-fold and strip diacritics for robust intent detection."""
-    folded = unicodedata.normalize("NFKD", text.casefold())
-    return "".join(char for char in folded if not unicodedata.combining(char))
+def _summary_request(previous: str, folded: List[BaseMessage]) -> List[BaseMessage]:
+    transcript = extractive_summary(previous, folded, max_chars=settings.HISTORY_SUMMARY_MAX_CHARS * 4)
+    return [SystemMessage(content=_SUMMARY_PROMPT), HumanMessage(content=transcript)]
 
 
-FAQ_KEYWORDS = [_normalize_text(word) for word in ["iade", "kargo", "ödeme", "policy", "faq"]]
-TOOL_KEYWORDS = [_normalize_text(word) for word in ["sipariş", "order", "takip", "kargo ücret"]]
+def _history_update(folded: List[BaseMessage], summary: str) -> Dict[str, object]:
+    summary = summary[: settings.HISTORY_SUMMARY_MAX_CHARS]
+    return {"messages": [RemoveMessage(id=message.id) for message in folded], "summary": summary}
 
 
-def intent_router_node(state: AgentState) -> AgentState:
-    """Route incoming message to the appropriate node."""
-    last_message = _normalize_text(state["messages"][-1].content)
-    state["intent"] = "general"
-    state["next"] = "response_builder"
+def history_manager_node(state: AgentState) -> Dict[str, object]:
+    """Fold turns beyond ``HISTORY_MAX_TURNS`` into the rolling summary.
+
+    Uses the LLM when available and falls back to an extractive summary, so
+    the checkpointed history stays bounded either way.
+    """
+    folded, _ = split_for_summary(state["messages"], settings.HISTORY_MAX_TURNS)
+    if not folded:
+        return state
+    previous = state.get("summary", "")
+    summary = None
+    if SUMMARY_LLM:
+        try:
+            summary = call_llm(SUMMARY_LLM, _summary_request(previous, folded)).content
+        except AdmissionRejected:
+            pass
+        except Exception:
+            logger.exception("Konuşma özeti oluşturulamadı, kısaltılmış özet kullanılıyor")
+    if not summary:
+        summary = extractive_summary(previous, folded, settings.HISTORY_SUMMARY_MAX_CHARS)
+    return _history_update(folded, summary)
+
+
+async def ahistory_manager_node(state: AgentState) -> Dict[str, object]:
+    """Async variant of :func:`history_manager_node`."""
+    folded, _ = split_for_summary(state["messages"], settings.HISTORY_MAX_TURNS)
+    if not folded:
+        return state
+    previous = state.get("summary", "")
+    summary = None
+    if SUMMARY_LLM:
+        try:
+            summary = (await acall_llm(SUMMARY_LLM, _summary_request(previous, folded))).content
+        except AdmissionRejected:
+            pass
+        except Exception:
+            logger.exception("Konuşma özeti oluşturulamadı, kısaltılmış özet kullanılıyor")
+    if not summary:
+        summary = extractive_summary(previous, folded, settings.HISTORY_SUMMARY_MAX_CHARS)
+    return _history_update(folded, summary)
 
-    if any(keyword in last_message for keyword in FAQ_KEYWORDS):
-        state["intent"] = "faq"
-        state["next"] = "retriever"
-    elif any(keyword in last_message for keyword in TOOL_KEYWORDS):
-        state["intent"] = "tool"
-        state["next"] = "tool_caller"
 
+INTENT_CLASSIFIER = IntentClassifier.from_file(settings.INTENTS_PATH)
+
+_INTENT_ROUTES = {"faq": "retriever", "tool": "tool_caller"}
+
+
+def intent_router_node(state: AgentState) -> AgentState:
+    """Classify the message once and route it to the appropriate node."""
+    match = INTENT_CLASSIFIER.classify(state["messages"][-1].content)
+    state["intent"] = match.category if match.category in _INTENT_ROUTES else "general"
+    state["next"] = _INTENT_ROUTES.get(match.category, "response_builder")
+    state["entities"] = match.entities
+    state["confidence"] = match.confidence
+    if state["next"] == "tool_caller" and LLM_WITH_TOOLS:
+        # The model picks tools and arguments itself; see llm_tools_node.
+        state["next"] = "response_builder"
+    elif match.tool:
+        state.setdefault("context", {})["tool_name"] = match.tool
     return state
 
 
+# Retrieval results shared by all turns of one batch run (backend.batch), keyed by query.
+BATCH_RETRIEVAL: contextvars.ContextVar[Optional[Dict[str, List[str]]]] = contextvars.ContextVar(
+    "batch_retrieval", default=None
+)
+
+
+def prefetch_retrieval(queries: Sequence[str], k: int = 2) -> Dict[str, List[str]]:
+    """Search every distinct query once, in a single call when the retriever can batch."""
+    unique = list(dict.fromkeys(queries))
+    retriever = KNOWLEDGE_BASE.retriever
+    search_batch = getattr(retriever, "search_batch", None)
+    if search_batch is not None:
+        results = search_batch(unique, k=k)
+    else:
+        results = [mini_rag_search(query, retriever, k=k) for query in unique]
+    return dict(zip(unique, results))
+
+
 def retriever_node(state: AgentState) -> AgentState:
     """Fetch FAQ snippets via the lightweight RAG helper."""
     last_message = state["messages"][-1].content
-    kb_results = mini_rag_search(last_message, KNOWLEDGE_BASE, k=2)
+    prefetched = BATCH_RETRIEVAL.get()
+    kb_results = prefetched.get(last_message) if prefetched is not None else None
+    if kb_results is None:
+        kb_results = mini_rag_search(last_message, KNOWLEDGE_BASE.retriever, k=2)
     if kb_results:
         state.setdefault("context", {})["kb"] = kb_results
     state["next"] = "response_builder"
     return state
 
 
-def _extract_order_id(text: str) -> str:
-    match = re.search(r"(\d{4,})", text)
-    return match.group(1) if match else "12345"
+DEFAULT_ORDER_ID = "12345"
+
+_TOOL_ARGUMENTS: Dict[str, Callable[[Dict[str, str]], Dict[str, str]]] = {
+    "check_order_status": lambda entities: {"order_id": entities.get("order_id", DEFAULT_ORDER_ID)},
+    "calculate_shipping": lambda entities: {"city": entities.get("city", "İstanbul")},
+    "policy_lookup": lambda entities: {"topic": entities.get("topic", "kargo")},
+}
+
+TOOL_EXECUTOR = build_tool_executor(
+    backend=settings.TOOL_BACKEND,
+    timeout=settings.TOOL_TIMEOUT_SECONDS,
+    cache_ttls=settings.TOOL_CACHE_TTL_SECONDS,
+    cache_size=settings.TOOL_CACHE_SIZE,
+    failure_threshold=settings.TOOL_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.TOOL_CIRCUIT_RESET_SECONDS,
+    mock_service=MockToolService(
+        min_latency=settings.TOOL_MOCK_MIN_LATENCY_SECONDS,
+        max_latency=settings.TOOL_MOCK_MAX_LATENCY_SECONDS,
+        failure_rate=settings.TOOL_MOCK_FAILURE_RATE,
+    ),
+)
+
 
+def _tool_call(state: AgentState) -> ToolCall:
+    tool_name = state.get("context", {}).get("tool_name")
+    if tool_name not in _TOOL_ARGUMENTS:
+        tool_name = "policy_lookup"
+    return ToolCall(tool_name, _TOOL_ARGUMENTS[tool_name](state.get("entities", {})))
 
-def tool_caller_node(state: AgentState) -> AgentState:
-    """Execute mock tools without waiting for LLM function calls."""
-    raw_message = state["messages"][-1].content
-    message = _normalize_text(raw_message)
+
+def _store_tool_result(state: AgentState, result: ToolResult) -> AgentState:
     context = state.setdefault("context", {})
+    context["tool_name"] = result.name
+    context["tool_result"] = result.content
+    if not result.ok:
+        context["tool_error"] = result.error
+    state["next"] = "response_builder"
+    return state
+
+
+def tool_caller_node(state: AgentState) -> AgentState:
+    """Execute the tool picked by the intent classifier with its entities."""
+    return _store_tool_result(state, TOOL_EXECUTOR.run(_tool_call(state)))
+
+
+async def atool_caller_node(state: AgentState) -> AgentState:
+    """Async counterpart of :func:`tool_caller_node`; runs on the event loop."""
+    return _store_tool_result(state, await TOOL_EXECUTOR.execute(_tool_call(state)))
 
-    if "sipariş" in message or re.search(r"\d{4,}", raw_message):
-        order_id = _extract_order_id(raw_message)
-        context["tool_name"] = "check_order_status"
-        context["tool_result"] = check_order_status(order_id)
-    elif "kargo" in message and ("hesap" in message or "ücret" in message):
-        city_match = re.search(r"(istanbul|ankara|izmir|antalya)", message)
-        city = city_match.group(1) if city_match else "İstanbul"
-        context["tool_name"] = "calculate_shipping"
-        context["tool_result"] = calculate_shipping(city)
-    else:
-        if "iade" in message:
-            topic = "iade"
-        elif "kargo" in message:
-            topic = "kargo"
-        elif "odeme" in message or "ödeme" in message:
-            topic = "ödeme"
-        else:
-            topic = "kargo"
-        context["tool_name"] = "policy_lookup"
-        context["tool_result"] = policy_lookup(topic)
 
+def _requested_tool_calls(state: AgentState) -> List[ToolCall]:
+    return [ToolCall(call["name"], call["args"], call["id"]) for call in state["messages"][-1].tool_calls]
+
+
+def _store_tool_messages(state: AgentState, results: List[ToolResult]) -> AgentState:
+    context = state.setdefault("context", {})
+    context["tool_name"] = results[0].name
+    context["tool_result"] = "\n".join(result.content for result in results)
+    context["tool_calls"] = [*context.get("tool_calls", []), *(result.name for result in results)]
+    errors = [result.error for result in results if not result.ok]
+    if errors:
+        context["tool_error"] = errors[0]
+    state["messages"].extend(
+        ToolMessage(content=result.content, tool_call_id=result.id, name=result.name) for result in results
+    )
+    state["tool_iterations"] = state.get("tool_iterations", 0) + 1
     state["next"] = "response_builder"
     return state
 
 
+def llm_tools_node(state: AgentState) -> AgentState:
+    """Execute the tool calls requested by the model and hand the outputs back to it."""
+    return _store_tool_messages(state, TOOL_EXECUTOR.run_many(_requested_tool_calls(state)))
+
+
+async def allm_tools_node(state: AgentState) -> AgentState:
+    """Async variant of :func:`llm_tools_node`; calls run concurrently on the event loop."""
+    return _store_tool_messages(state, await TOOL_EXECUTOR.execute_many(_requested_tool_calls(state)))
+
+
+def _after_response(state: AgentState) -> str:
+    last = state["messages"][-1]
+    if getattr(last, "tool_calls", None) and state.get("tool_iterations", 0) < settings.LLM_MAX_TOOL_ITERATIONS:
+        return "llm_tools"
+    return END
+
+
 def _compose_response(state: AgentState) -> str:
     context = state.get("context", {})
     intent = state.get("intent", "general")
@@ -132,8 +387,7 @@ def _compose_response(state: AgentState) -> str:
     return f"'{user_text}' mesajınızı aldım. Size nasıl yardımcı olabilirim?"
 
 
-def response_builder_node(state: AgentState) -> AgentState:
-    """Return an AI message using Groq when available, otherwise rule-based text."""
+def _build_llm_messages(state: AgentState) -> List[BaseMessage]:
     system_prompt = (
         "Sen Etkin.ai WebChat asistanısın. Profesyonel, net ve yardımsever bir üslupla cevap ver."
     )
@@ -150,25 +404,207 @@ def response_builder_node(state: AgentState) -> AgentState:
             )
         )
 
-    if LLM_WITH_TOOLS:
-        messages = [SystemMessage(content=system_prompt), *context_messages, *state["messages"]]
-        ai_message = LLM_WITH_TOOLS.invoke(messages)
-        response_text = ai_message.content
-    else:
-        response_text = _compose_response(state)
-        ai_message = AIMessage(content=response_text)
+    if state.get("summary"):
+        context_messages.append(
+            SystemMessage(content=f"Önceki konuşmanın özeti:\n{state['summary']}")
+        )
+
+    messages = state["messages"]
+    turn_start = max(
+        (index for index, message in enumerate(messages) if isinstance(message, HumanMessage)),
+        default=len(messages) - 1,
+    )
+    history = trim_history(messages[:turn_start], settings.HISTORY_MAX_TOKENS)
+    return [SystemMessage(content=system_prompt), *context_messages, *history, *messages[turn_start:]]
 
+
+def _finish_response(state: AgentState, ai_message: BaseMessage) -> AgentState:
+    if getattr(ai_message, "tool_calls", None) and state.get("tool_iterations", 0) >= settings.LLM_MAX_TOOL_ITERATIONS:
+        ai_message = AIMessage(content=_compose_response(state))
     state["messages"].append(ai_message)
     state["next"] = END
     return state
 
 
+def _response_model(state: AgentState):
+    """The tool-bound model until the tool-call budget is spent, then the plain one."""
+    if state.get("tool_iterations", 0) >= settings.LLM_MAX_TOOL_ITERATIONS and CHAT_LLM is not None:
+        return CHAT_LLM
+    return LLM_WITH_TOOLS
+
+
+def _history_digest(state: AgentState) -> str:
+    """Fingerprint of earlier turns; empty for the first message of a session."""
+    history = conversation_turns(state["messages"][:-1])
+    if not history and not state.get("summary"):
+        return ""
+    payload = "\x1f".join([state.get("summary", ""), *(str(message.content) for message in history)])
+    return ":" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _response_cache_key(state: AgentState) -> str | None:
+    # Answers built on tool output (order status, prices) are not cached.
+    if RESPONSE_CACHE is None or state.get("tool_iterations"):
+        return None
+    namespace = f"{settings.GROQ_MODEL}:{KNOWLEDGE_BASE.fingerprint}{_history_digest(state)}"
+    return RESPONSE_CACHE.key_for(state["messages"][-1].content, state.get("context", {}), namespace)
+
+
+def _cached_response(state: AgentState, cache_key: str | None, cached: str | None) -> BaseMessage | None:
+    if cache_key is None:
+        return None
+    # Recorded so metrics count a miss only for turns that actually consulted the cache.
+    context = state.setdefault("context", {})
+    context["cache_lookup"] = True
+    if cached is None:
+        return None
+    context["cache_hit"] = True
+    return AIMessage(content=cached)
+
+
+def _store_response(key: str | None, ai_message: BaseMessage) -> None:
+    if key is not None and not getattr(ai_message, "tool_calls", None):
+        RESPONSE_CACHE.set(key, ai_message.content)
+
+
+def _shed_response(state: AgentState, exc: AdmissionRejected) -> BaseMessage:
+    logger.warning("⏳ LLM çağrısı kuyruktan düşürüldü, kural tabanlı yanıt veriliyor: %s", exc)
+    state.setdefault("context", {})["llm_shed"] = True
+    return AIMessage(content=_compose_response(state))
+
+
+def response_builder_node(state: AgentState) -> AgentState:
+    """Return an AI message using Groq when available, otherwise rule-based text.
+
+    LLM answers are served from ``RESPONSE_CACHE`` when the same question
+    arrives with the same retrieved context. Calls shed by ``LLM_ADMISSION``
+    fall back to the rule-based answer. A reply with ``tool_calls`` is routed
+    to :func:`llm_tools_node` and the model is invoked again with the
+    results, up to ``LLM_MAX_TOOL_ITERATIONS`` rounds.
+    """
+    if LLM_WITH_TOOLS:
+        cache_key = _response_cache_key(state)
+        ai_message = _cached_response(state, cache_key, RESPONSE_CACHE.get(cache_key) if cache_key else None)
+        if ai_message is None:
+            try:
+                ai_message = call_llm(_response_model(state), _build_llm_messages(state))
+            except AdmissionRejected as exc:
+                ai_message = _shed_response(state, exc)
+            else:
+                _store_response(cache_key, ai_message)
+    else:
+        ai_message = AIMessage(content=_compose_response(state))
+
+    return _finish_response(state, ai_message)
+
+
+async def aresponse_builder_node(state: AgentState) -> AgentState:
+    """Async variant of :func:`response_builder_node` awaiting the Groq client directly."""
+    if LLM_WITH_TOOLS:
+        cache_key = _response_cache_key(state)
+        cached = None
+        if cache_key is not None:
+            if RESPONSE_CACHE.backend.blocking:
+                cached = await run_sync(RESPONSE_CACHE.get, cache_key)
+            else:
+                cached = RESPONSE_CACHE.get(cache_key)
+        ai_message = _cached_response(state, cache_key, cached)
+        if ai_message is None:
+            try:
+                ai_message = await acall_llm(_response_model(state), _build_llm_messages(state))
+            except AdmissionRejected as exc:
+                ai_message = _shed_response(state, exc)
+            else:
+                if cache_key is not None and RESPONSE_CACHE.backend.blocking:
+                    await run_sync(_store_response, cache_key, ai_message)
+                else:
+                    _store_response(cache_key, ai_message)
+    else:
+        ai_message = AIMessage(content=_compose_response(state))
+
+    return _finish_response(state, ai_message)
+
+
+# Bounded pool for nodes without a native async implementation. LangGraph would
+# otherwise fall back to the loop's default executor (or run them inline).
+_SYNC_NODE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.AGENT_SYNC_POOL_SIZE,
+    thread_name_prefix="agent-node",
+)
+
+
+async def run_sync(func: Callable[..., object], *args: object) -> object:
+    """Run a blocking callable on the bounded agent thread pool."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_SYNC_NODE_EXECUTOR, functools.partial(context.run, func, *args))
+
+
+def _offloaded(func: Callable[[AgentState], AgentState]) -> Callable[[AgentState], Awaitable[AgentState]]:
+    @functools.wraps(func)
+    async def _wrapper(state: AgentState) -> AgentState:
+        return await run_sync(func, state)
+
+    return _wrapper
+
+
+def _timed(node: str, func: Callable[[AgentState], AgentState]) -> Callable[[AgentState], AgentState]:
+    @functools.wraps(func)
+    def _wrapper(state: AgentState) -> AgentState:
+        started = time.perf_counter()
+        try:
+            with TRACER.span(f"node.{node}", profile=True):
+                return func(state)
+        finally:
+            metrics_state.observe_node(node, time.perf_counter() - started)
+
+    return _wrapper
+
+
+def _atimed(
+    node: str, afunc: Callable[[AgentState], Awaitable[AgentState]]
+) -> Callable[[AgentState], Awaitable[AgentState]]:
+    @functools.wraps(afunc)
+    async def _wrapper(state: AgentState) -> AgentState:
+        started = time.perf_counter()
+        try:
+            with TRACER.span(f"node.{node}"):
+                return await afunc(state)
+        finally:
+            metrics_state.observe_node(node, time.perf_counter() - started)
+
+    return _wrapper
+
+
+def _graph_node(
+    func: Callable[[AgentState], AgentState],
+    afunc: Callable[[AgentState], Awaitable[AgentState]] | None = None,
+) -> RunnableCallable:
+    """Register sync and async implementations; sync-only nodes run on the bounded pool.
+
+    Both paths record their latency and a trace span under the node name
+    (``func`` without the ``_node`` suffix). Sync bodies are instrumented
+    where they run, so sampled profiles cover the worker thread.
+    """
+    node = func.__name__.removesuffix("_node")
+    timed = _timed(node, func)
+    return RunnableCallable(
+        timed,
+        _atimed(node, afunc) if afunc else _offloaded(timed),
+        name=func.__name__,
+        trace=False,
+    )
+
+
 workflow = StateGraph(AgentState)
-workflow.add_node("intent_router", intent_router_node)
-workflow.add_node("retriever", retriever_node)
-workflow.add_node("tool_caller", tool_caller_node)
-workflow.add_node("response_builder", response_builder_node)
-workflow.set_entry_point("intent_router")
+workflow.add_node("history_manager", _graph_node(history_manager_node, ahistory_manager_node))
+workflow.add_node("intent_router", _graph_node(intent_router_node))
+workflow.add_node("retriever", _graph_node(retriever_node))
+workflow.add_node("tool_caller", _graph_node(tool_caller_node, atool_caller_node))
+workflow.add_node("response_builder", _graph_node(response_builder_node, aresponse_builder_node))
+workflow.add_node("llm_tools", _graph_node(llm_tools_node, allm_tools_node))
+workflow.set_entry_point("history_manager")
+workflow.add_edge("history_manager", "intent_router")
 workflow.add_conditional_edges(
     "intent_router",
     lambda current_state: current_state["next"],
@@ -180,63 +616,174 @@ workflow.add_conditional_edges(
 )
 workflow.add_edge("retriever", "response_builder")
 workflow.add_edge("tool_caller", "response_builder")
+workflow.add_conditional_edges("response_builder", _after_response, {"llm_tools": "llm_tools", END: END})
+workflow.add_edge("llm_tools", "response_builder")
 
-graph_app = workflow.compile()
+graph_app = workflow.compile(checkpointer=CHECKPOINTER)
 
 
 def _persist_messages(session_id: str, user_message: str, ai_message: str, metadata: Dict[str, object]):
-    db = SessionLocal()
+    turn = PendingTurn(session_id, user_message, ai_message, metadata)
     try:
-        conversation = db.query(Conversation).filter_by(session_id=session_id).first()
-        if not conversation:
-            conversation = Conversation(session_id=session_id)
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-
-        db.add(
-            MessageModel(
-                conversation_id=conversation.id,
-                sender="user",
-                content=user_message,
-                metadata_json={"intent": metadata.get("intent")},
-            )
-        )
-        db.add(
-            MessageModel(
-                conversation_id=conversation.id,
-                sender="assistant",
-                content=ai_message,
-                metadata_json=metadata,
-            )
-        )
-        db.commit()
+        persist_turns([turn])
     except Exception:
-        db.rollback()
-    finally:
-        db.close()
+        logger.exception("Mesajlar kaydedilemedi: %s", session_id)
 
 
-def run_agent(session_id: str, user_input: str) -> Dict[str, object]:
-    """Execute the LangGraph workflow and persist conversation history."""
-    if not graph_app:
-        return {"response": "Agent başlatılamadı", "metadata": {"intent": "error"}}
+async def _apersist_messages(
+    session_id: str, user_message: str, ai_message: str, metadata: Dict[str, object]
+):
+    turn = PendingTurn(session_id, user_message, ai_message, metadata)
+    try:
+        await apersist_turns([turn])
+    except Exception:
+        logger.exception("Mesajlar kaydedilemedi: %s", session_id)
+
+
+def _enqueue_turn(
+    session_id: str,
+    user_message: str,
+    ai_message: str,
+    metadata: Dict[str, object],
+    received_at: datetime,
+) -> bool:
+    """Hand the turn to the write-behind queue; ``False`` means persist inline."""
+    if not settings.PERSISTENCE_WRITE_BEHIND:
+        return False
+    write_behind.enqueue(
+        PendingTurn(
+            session_id=session_id,
+            user_message=user_message,
+            ai_message=ai_message,
+            metadata=metadata,
+            received_at=received_at,
+        )
+    )
+    return True
+
 
-    initial_state: AgentState = {
+def _initial_state(user_input: str) -> AgentState:
+    return {
         "messages": [HumanMessage(content=user_input)],
         "intent": "general",
         "context": {},
         "next": "response_builder",
+        "entities": {},
+        "confidence": 0.0,
+        "tool_iterations": 0,
     }
 
-    final_state = graph_app.invoke(initial_state, config={"configurable": {"thread_id": session_id}})
-    response_message = final_state["messages"][-1].content
-    metadata = {
+
+def _build_metadata(final_state: AgentState) -> Dict[str, object]:
+    context = final_state.get("context", {})
+    return {
         "intent": final_state.get("intent"),
-        "kb_results": final_state.get("context", {}).get("kb", []),
-        "tool": final_state.get("context", {}).get("tool_name"),
-        "tool_result": final_state.get("context", {}).get("tool_result"),
+        "confidence": final_state.get("confidence", 0.0),
+        "entities": final_state.get("entities", {}),
+        "kb_results": context.get("kb", []),
+        "tool": context.get("tool_name"),
+        "tool_result": context.get("tool_result"),
+        "tool_error": context.get("tool_error"),
+        "tool_calls": context.get("tool_calls", []),
+        "cache_lookup": bool(context.get("cache_lookup")),
+        "cache_hit": bool(context.get("cache_hit")),
+        "llm_shed": bool(context.get("llm_shed")),
+        "trace_id": TRACER.current_trace_id(),
     }
 
-    _persist_messages(session_id, user_input, response_message, metadata)
+
+def run_agent(session_id: str, user_input: str) -> Dict[str, object]:
+    """Execute the LangGraph workflow and persist conversation history."""
+    if not graph_app:
+        return {"response": "Agent başlatılamadı", "metadata": {"intent": "error"}}
+
+    received_at = datetime.utcnow()
+    with TRACER.trace("agent.turn", **{"session.id": session_id}) as root:
+        final_state = graph_app.invoke(
+            _initial_state(user_input), config={"configurable": {"thread_id": session_id}}
+        )
+        response_message = final_state["messages"][-1].content
+        metadata = _build_metadata(final_state)
+        root.set_attribute("agent.intent", metadata["intent"])
+
+        with TRACER.span("persist"):
+            if not _enqueue_turn(session_id, user_input, response_message, metadata, received_at):
+                _persist_messages(session_id, user_input, response_message, metadata)
     return {"response": response_message, "metadata": metadata}
+
+
+async def _afinish_turn(
+    session_id: str, user_input: str, final_state: AgentState, received_at: datetime, persist: bool = True
+) -> Dict[str, object]:
+    response_message = final_state["messages"][-1].content
+    metadata = _build_metadata(final_state)
+    if not persist:
+        return {"response": response_message, "metadata": metadata}
+
+    with TRACER.span("persist"):
+        if not _enqueue_turn(session_id, user_input, response_message, metadata, received_at):
+            await _apersist_messages(session_id, user_input, response_message, metadata)
+    return {"response": response_message, "metadata": metadata}
+
+
+async def arun_agent(session_id: str, user_input: str, persist: bool = True) -> Dict[str, object]:
+    """Async counterpart of :func:`run_agent` that never blocks the event loop.
+
+    ``persist=False`` leaves storing the turn to the caller (batch runs group
+    many turns into one insert).
+    """
+    if not graph_app:
+        return {"response": "Agent başlatılamadı", "metadata": {"intent": "error"}}
+
+    received_at = datetime.utcnow()
+    with TRACER.trace("agent.turn", **{"session.id": session_id}) as root:
+        final_state = await graph_app.ainvoke(
+            _initial_state(user_input), config={"configurable": {"thread_id": session_id}}
+        )
+        root.set_attribute("agent.intent", final_state.get("intent"))
+        return await _afinish_turn(session_id, user_input, final_state, received_at, persist)
+
+
+async def astream_agent(session_id: str, user_input: str) -> AsyncIterator[Dict[str, object]]:
+    """Run the workflow and yield LLM tokens as they are generated.
+
+    Yields ``{"type": "delta", "delta": ...}`` events for every non-empty chunk
+    the response builder's model emits, then a single ``{"type": "response"}``
+    event shaped like :func:`arun_agent`'s result. Rule-based and cached
+    answers produce no deltas, only the final event. A round that streamed
+    text but ended in tool calls is followed by ``{"type": "reset"}``: that
+    text is not the answer (the next round or the rule-based fallback at the
+    tool-call cap is), so clients drop what they have shown so far.
+    """
+    if not graph_app:
+        yield {"type": "response", "response": "Agent başlatılamadı", "metadata": {"intent": "error"}}
+        return
+
+    received_at = datetime.utcnow()
+    final_state: AgentState | None = None
+    streamed = False
+    with TRACER.trace("agent.turn", **{"session.id": session_id, "agent.streaming": True}) as root:
+        async for event in graph_app.astream_events(
+            _initial_state(user_input),
+            config={"configurable": {"thread_id": session_id}},
+            version="v2",
+        ):
+            kind = event["event"]
+            if kind in ("on_chat_model_stream", "on_chat_model_end"):
+                if event["metadata"].get("langgraph_node") != "response_builder":
+                    continue
+                if kind == "on_chat_model_end":
+                    if streamed and getattr(event["data"].get("output"), "tool_calls", None):
+                        yield {"type": "reset"}
+                    streamed = False
+                    continue
+                delta = event["data"]["chunk"].content
+                if isinstance(delta, str) and delta:
+                    streamed = True
+                    yield {"type": "delta", "delta": delta}
+            elif kind == "on_chain_end" and not event["parent_ids"]:
+                final_state = event["data"]["output"]
+
+        root.set_attribute("agent.intent", final_state.get("intent"))
+        result = await _afinish_turn(session_id, user_input, final_state, received_at)
+    yield {"type": "response", **result}
@@ -0,0 +1,128 @@
+"""Read path for stored conversations.
+
+Pages use keyset pagination on ``(created_at, id)``: the cursor encodes the
+last row of the previous page and the next page is an index range scan on
+``ix_messages_conversation_created`` starting right after it, so page N
+costs the same as page 1. Full transcripts are exported as NDJSON from a
+server-side cursor (``yield_per``) without materializing the result.
+
+Turns still waiting in the write-behind queue are not visible yet.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import AsyncSessionLocal
+from backend.models import Conversation, Message
+from backend.persistence import conversation_ids
+
+_COLUMNS = (Message.id, Message.sender, Message.content, Message.metadata_json, Message.created_at)
+
+
+def encode_cursor(created_at: datetime, message_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{message_id.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of :func:`encode_cursor`; raises ``ValueError`` on malformed input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, message_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(hex=message_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _serialize(row: Any) -> Dict[str, Any]:
+    return {
+        "id": str(row.id),
+        "sender": row.sender,
+        "content": row.content,
+        "metadata": row.metadata_json or {},
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+async def _conversation_id(db: AsyncSession, session_id: str) -> Optional[uuid.UUID]:
+    conversation_id = conversation_ids.get(session_id)
+    if conversation_id is None:
+        conversation_id = await db.scalar(
+            select(Conversation.id).where(Conversation.session_id == session_id)
+        )
+        if conversation_id is not None:
+            conversation_ids.set(session_id, conversation_id)
+    return conversation_id
+
+
+async def find_conversation(
+    session_id: str, session_factory: sessionmaker = AsyncSessionLocal
+) -> Optional[uuid.UUID]:
+    async with session_factory() as db:
+        return await _conversation_id(db, session_id)
+
+
+async def fetch_messages_page(
+    session_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    session_factory: sessionmaker = AsyncSessionLocal,
+) -> Optional[Dict[str, Any]]:
+    """One page of a transcript, or ``None`` when the session has no conversation.
+
+    ``next_cursor`` is ``None`` on the last page. ``descending`` pages from
+    the newest message backwards.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    async with session_factory() as db:
+        conversation_id = await _conversation_id(db, session_id)
+        if conversation_id is None:
+            return None
+
+        key = tuple_(Message.created_at, Message.id)
+        statement = select(*_COLUMNS).where(Message.conversation_id == conversation_id)
+        if after is not None:
+            statement = statement.where(key < after if descending else key > after)
+        if descending:
+            statement = statement.order_by(Message.created_at.desc(), Message.id.desc())
+        else:
+            statement = statement.order_by(Message.created_at, Message.id)
+        # One extra row tells whether another page exists without a COUNT.
+        rows = (await db.execute(statement.limit(limit + 1))).all()
+
+    page = rows[:limit]
+    return {
+        "session_id": session_id,
+        "messages": [_serialize(row) for row in page],
+        "next_cursor": encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None,
+    }
+
+
+async def stream_transcript(
+    conversation_id: uuid.UUID,
+    batch_size: int = 1_000,
+    session_factory: sessionmaker = AsyncSessionLocal,
+) -> AsyncIterator[bytes]:
+    """NDJSON lines of a whole conversation, fetched ``batch_size`` rows at a time."""
+    async with session_factory() as db:
+        result = await db.stream(
+            select(*_COLUMNS)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at, Message.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions():
+            yield "".join(
+                json.dumps(_serialize(row), ensure_ascii=False) + "\n" for row in partition
+            ).encode()
@@ -0,0 +1,202 @@
+"""Data-driven intent classification in a single pass over the message.
+
+Intents, their weighted keywords and the entity patterns live in a JSON
+file (``knowledge/intents.json``)::
+
+    {
+      "intents": [
+        {"name": "order_status", "category": "tool", "tool": "check_order_status",
+         "keywords": {"sipariş": 1.5}, "entities": {"order_id": 1.5}}
+      ],
+      "entities": {"order_id": "\\\\d{4,}"}
+    }
+
+All keywords are compiled into one prefix-factored regex (a trie rendered as
+nested alternations), so a message is scanned once and the work per position
+is bounded by the alphabet rather than by the number of keywords. Keywords
+match at word starts, which keeps Turkish suffixes ("siparişim") matching.
+Entity patterns are combined into one regex with a named group per entity.
+Both run against normalized text (casefolded, diacritics removed).
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from backend.text import normalize
+
+DEFAULT_INTENTS: Dict[str, Any] = {
+    "intents": [
+        {
+            "name": "faq",
+            "category": "faq",
+            # "kargo ücretsiz" (free shipping) is policy; as the longer keyword it wins over "kargo ücret".
+            "keywords": {
+                "iade": 1.0,
+                "kargo": 1.0,
+                "kargo ücretsiz": 1.0,
+                "ödeme": 1.0,
+                "policy": 1.0,
+                "faq": 1.0,
+            },
+        },
+        {
+            "name": "order_status",
+            "category": "tool",
+            "tool": "check_order_status",
+            "keywords": {"sipariş": 1.5, "order": 1.5, "takip": 1.5},
+            "entities": {"order_id": 1.5},
+        },
+        {
+            "name": "shipping_cost",
+            "category": "tool",
+            "tool": "calculate_shipping",
+            "keywords": {"kargo ücret": 2.0, "kargo hesap": 2.0, "kargo fiyat": 2.0},
+            "entities": {"city": 0.5},
+        },
+    ],
+    "entities": {
+        "order_id": r"\d{4,}",
+        "city": "istanbul|ankara|izmir|antalya",
+        "topic": "iade|kargo|odeme",
+    },
+}
+
+
+@dataclass(frozen=True)
+class IntentSpec:
+    name: str
+    category: str
+    tool: Optional[str] = None
+    keywords: Mapping[str, float] = field(default_factory=dict)
+    entities: Mapping[str, float] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    name: str
+    category: str
+    tool: Optional[str]
+    confidence: float
+    entities: Dict[str, str]
+    scores: Dict[str, float]
+
+
+def trie_pattern(words: Sequence[str]) -> str:
+    """Regex matching any of ``words``, factored by common prefixes (longest match wins)."""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if "" in node else body
+
+    return render(trie)
+
+
+class IntentClassifier:
+    """Score every intent from one keyword scan and one entity scan."""
+
+    def __init__(
+        self,
+        intents: Sequence[IntentSpec],
+        entity_patterns: Mapping[str, str] | None = None,
+        default_intent: str = "general",
+    ) -> None:
+        self.intents = list(intents)
+        self.default_intent = default_intent
+        self._keyword_weights: Dict[str, List[Tuple[int, float]]] = {}
+        for position, intent in enumerate(self.intents):
+            for keyword, weight in intent.keywords.items():
+                normalized = " ".join(normalize(keyword).split())
+                if normalized:
+                    self._keyword_weights.setdefault(normalized, []).append((position, weight))
+
+        self._keywords = (
+            re.compile(r"\b" + trie_pattern(list(self._keyword_weights))) if self._keyword_weights else None
+        )
+        entity_patterns = dict(entity_patterns or {})
+        self._entities = (
+            re.compile(
+                "|".join(f"\\b(?P<{name}>{pattern})" for name, pattern in entity_patterns.items())
+            )
+            if entity_patterns
+            else None
+        )
+
+    @classmethod
+    def from_config(cls, data: Mapping[str, Any]) -> "IntentClassifier":
+        intents = [
+            IntentSpec(
+                name=str(item["name"]),
+                category=str(item.get("category", item["name"])),
+                tool=item.get("tool"),
+                keywords={str(key): float(value) for key, value in item.get("keywords", {}).items()},
+                entities={str(key): float(value) for key, value in item.get("entities", {}).items()},
+            )
+            for item in data.get("intents", [])
+        ]
+        return cls(intents, data.get("entities"), str(data.get("default_intent", "general")))
+
+    @classmethod
+    def from_file(cls, path: Path | str) -> "IntentClassifier":
+        """Load intents from JSON; fall back to :data:`DEFAULT_INTENTS` when missing."""
+        intents_path = Path(path)
+        if intents_path.exists():
+            with intents_path.open("r", encoding="utf-8") as handler:
+                return cls.from_config(json.load(handler))
+        return cls.from_config(DEFAULT_INTENTS)
+
+    def extract_entities(self, normalized: str) -> Dict[str, str]:
+        """First match of every entity pattern in already-normalized text."""
+        entities: Dict[str, str] = {}
+        if self._entities is not None:
+            for match in self._entities.finditer(normalized):
+                entities.setdefault(match.lastgroup, match.group(match.lastgroup))
+        return entities
+
+    def classify(self, text: str) -> IntentMatch:
+        """Normalize ``text`` once and return the best scoring intent with its entities."""
+        normalized = " ".join(normalize(text).split())
+        entities = self.extract_entities(normalized)
+
+        scores: Dict[int, float] = {}
+        if self._keywords is not None:
+            for match in self._keywords.finditer(normalized):
+                for position, weight in self._keyword_weights[match.group(0)]:
+                    scores[position] = scores.get(position, 0.0) + weight
+        # Entities only strengthen intents a keyword already selected: a bare
+        # number is as likely a year or a price as an order id.
+        for position in list(scores):
+            for entity, bonus in self.intents[position].entities.items():
+                if entity in entities:
+                    scores[position] += bonus
+
+        named_scores = {self.intents[position].name: score for position, score in scores.items()}
+        if not scores:
+            return IntentMatch(self.default_intent, self.default_intent, None, 0.0, entities, {})
+
+        # Highest score wins; ties go to the intent listed first.
+        best = max(scores, key=lambda position: (scores[position], -position))
+        intent = self.intents[best]
+        return IntentMatch(
+            name=intent.name,
+            category=intent.category,
+            tool=intent.tool,
+            confidence=round(scores[best] / sum(scores.values()), 4),
+            entities=entities,
+            scores=named_scores,
+        )
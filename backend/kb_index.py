@@ -0,0 +1,277 @@
+"""Prebuilt, memory-mapped BM25 index for large knowledge bases.
+
+The index is a single read-only file holding the token dictionary, the
+posting arrays and the document texts. Every worker maps the same file, so
+the operating system keeps one page-cache copy instead of one private heap
+per process. Build it offline and publish it with an atomic rename::
+
+    python -m backend.kb_index knowledge/kb.jsonl knowledge/kb.idx
+
+Tokens are stored already normalized, so the header records
+:data:`backend.text.NORMALIZATION_VERSION` and an index built with other
+folding rules is refused; rebuild it with the command above.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from backend.rag_setup import bm25_idf, iter_knowledge_entries
+from backend.text import NORMALIZATION_VERSION, tokenize
+
+MAGIC = b"WCKBIDX2"
+_MAGIC_FAMILY = MAGIC[:-1]
+# magic, normalization version, document count, token count, posting count, total token length
+_HEADER = struct.Struct("<8sIIIQQ")
+_ALIGNMENT = 8
+
+
+def _padding(offset: int) -> int:
+    return -offset % _ALIGNMENT
+
+
+# Sections are always stored little-endian; big-endian hosts swap on write and read.
+_BYTESWAP = sys.byteorder != "little"
+
+
+def _little_endian(values: array) -> bytes:
+    if _BYTESWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def build_index(entries: Iterable[Tuple[str, str]], path: Path | str) -> int:
+    """Write an index for streamed ``(key, text)`` entries; returns the document count.
+
+    Later duplicates of a key are ignored. The file is written next to
+    ``path`` and renamed into place, so readers never see a partial index.
+    """
+    seen: set[str] = set()
+    doc_offsets = array("Q", [0])
+    doc_lengths = array("I")
+    doc_blob = bytearray()
+    postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    for key, text in entries:
+        if key in seen:
+            continue
+        seen.add(key)
+        doc_id = len(doc_lengths)
+        terms = Counter(tokenize(text))
+        for token, frequency in terms.items():
+            postings[token].append((doc_id, frequency))
+        doc_lengths.append(sum(terms.values()))
+        doc_blob += text.encode("utf-8")
+        doc_offsets.append(len(doc_blob))
+
+    tokens = sorted(postings, key=lambda token: token.encode("utf-8"))
+    token_offsets = array("Q", [0])
+    posting_offsets = array("Q", [0])
+    posting_doc_ids = array("I")
+    posting_frequencies = array("I")
+    token_blob = bytearray()
+    for token in tokens:
+        token_blob += token.encode("utf-8")
+        token_offsets.append(len(token_blob))
+        for doc_id, frequency in postings[token]:
+            posting_doc_ids.append(doc_id)
+            posting_frequencies.append(frequency)
+        posting_offsets.append(len(posting_doc_ids))
+
+    sections = [
+        _little_endian(doc_offsets),
+        _little_endian(doc_lengths),
+        _little_endian(token_offsets),
+        _little_endian(posting_offsets),
+        _little_endian(posting_doc_ids),
+        _little_endian(posting_frequencies),
+        bytes(token_blob),
+        bytes(doc_blob),
+    ]
+
+    target = Path(path)
+    temporary = target.with_name(target.name + ".tmp")
+    with temporary.open("wb") as handler:
+        header = _HEADER.pack(
+            MAGIC,
+            NORMALIZATION_VERSION,
+            len(doc_lengths),
+            len(tokens),
+            len(posting_doc_ids),
+            sum(doc_lengths),
+        )
+        handler.write(header)
+        offset = len(header)
+        for section in sections:
+            pad = _padding(offset)
+            handler.write(b"\0" * pad)
+            handler.write(section)
+            offset += pad + len(section)
+    os.replace(temporary, target)
+    return len(doc_lengths)
+
+
+class MmapBM25Index(Sequence[str]):
+    """Read-only BM25 index backed by a memory-mapped file from :func:`build_index`."""
+
+    def __init__(self, path: Path | str, k1: float = 1.5, b: float = 0.75) -> None:
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self._handle = self.path.open("rb")
+        self._mmap = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic = bytes(view[: len(MAGIC)])
+        if magic != MAGIC:
+            view.release()
+            self.close()
+            if magic.startswith(_MAGIC_FAMILY):
+                raise ValueError(f"{self.path} eski biçimde bir bilgi bankası indeksi, yeniden oluşturulmalı")
+            raise ValueError(f"{self.path} bir bilgi bankası indeksi değil")
+        _, normalization, n_docs, n_tokens, n_postings, total_length = _HEADER.unpack_from(view)
+        if normalization != NORMALIZATION_VERSION:
+            view.release()
+            self.close()
+            raise ValueError(
+                f"{self.path} farklı bir metin normalizasyonuyla (v{normalization}) oluşturulmuş, "
+                "yeniden oluşturulmalı"
+            )
+        self._n_docs = n_docs
+        self._n_tokens = n_tokens
+        self._avg_length = total_length / n_docs if n_docs else 0.0
+
+        offset = _HEADER.size
+
+        def take(typecode: str, count: int) -> memoryview:
+            nonlocal offset
+            offset += _padding(offset)
+            size = count * array(typecode).itemsize
+            section = view[offset : offset + size].cast(typecode)
+            offset += size
+            if _BYTESWAP:
+                # A cast view reads native order, so big-endian hosts get a swapped copy.
+                values = array(typecode, section)
+                section.release()
+                values.byteswap()
+                section = memoryview(values)
+            return section
+
+        self._doc_offsets = take("Q", n_docs + 1)
+        self._doc_lengths = take("I", n_docs)
+        self._token_offsets = take("Q", n_tokens + 1)
+        self._posting_offsets = take("Q", n_tokens + 1)
+        self._posting_doc_ids = take("I", n_postings)
+        self._posting_frequencies = take("I", n_postings)
+        offset += _padding(offset)
+        self._token_blob = view[offset : offset + self._token_offsets[n_tokens]]
+        offset += self._token_offsets[n_tokens]
+        offset += _padding(offset)
+        self._doc_blob = view[offset : offset + self._doc_offsets[n_docs]]
+        self._views = [
+            self._doc_offsets,
+            self._doc_lengths,
+            self._token_offsets,
+            self._posting_offsets,
+            self._posting_doc_ids,
+            self._posting_frequencies,
+            self._token_blob,
+            self._doc_blob,
+            view,
+        ]
+
+    def close(self) -> None:
+        for view in getattr(self, "_views", ()):
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._handle.close()
+
+    def __len__(self) -> int:
+        return self._n_docs
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self._n_docs))]
+        if index < 0:
+            index += self._n_docs
+        if not 0 <= index < self._n_docs:
+            raise IndexError(index)
+        start, end = self._doc_offsets[index], self._doc_offsets[index + 1]
+        return bytes(self._doc_blob[start:end]).decode("utf-8")
+
+    def _token_id(self, token: str) -> int | None:
+        needle = token.encode("utf-8")
+        low, high = 0, self._n_tokens
+        while low < high:
+            middle = (low + high) // 2
+            start, end = self._token_offsets[middle], self._token_offsets[middle + 1]
+            candidate = bytes(self._token_blob[start:end])
+            if candidate < needle:
+                low = middle + 1
+            elif candidate > needle:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def _document_frequency(self, token: str) -> int:
+        token_id = self._token_id(token)
+        if token_id is None:
+            return 0
+        return self._posting_offsets[token_id + 1] - self._posting_offsets[token_id]
+
+    def score_ceiling(self, query: str) -> float:
+        """Upper bound of any document's score for ``query`` (unknown tokens included)."""
+        return sum(
+            bm25_idf(self._n_docs, self._document_frequency(token)) * query_frequency * (self.k1 + 1)
+            for token, query_frequency in Counter(tokenize(query)).items()
+        )
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """Return BM25 scores keyed by document index for documents sharing a query token."""
+        scores: Dict[int, float] = defaultdict(float)
+        for token, query_frequency in Counter(tokenize(query)).items():
+            token_id = self._token_id(token)
+            if token_id is None:
+                continue
+            start = self._posting_offsets[token_id]
+            end = self._posting_offsets[token_id + 1]
+            weight = bm25_idf(self._n_docs, end - start) * query_frequency
+            for position in range(start, end):
+                doc_id = self._posting_doc_ids[position]
+                frequency = self._posting_frequencies[position]
+                length_ratio = self._doc_lengths[doc_id] / self._avg_length if self._avg_length else 0.0
+                norm = self.k1 * (1 - self.b + self.b * length_ratio)
+                scores[doc_id] += weight * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+    def search(self, query: str, k: int = 2) -> List[str]:
+        """Return up to ``k`` matching documents, best first."""
+        scores = self.scores(query)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [self[doc_id] for doc_id, _ in top]
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Bilgi bankası için mmap BM25 indeksi oluşturur")
+    parser.add_argument("source", type=Path, help="JSON, JSONL dosyası veya shard dizini")
+    parser.add_argument("output", type=Path, help="Oluşturulacak indeks dosyası")
+    args = parser.parse_args(argv)
+
+    count = build_index(iter_knowledge_entries(args.source), args.output)
+    print(f"{count} kayıt indekslendi -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Hot-reloadable knowledge base snapshots.
+
+``KnowledgeBaseManager`` owns the current :class:`BM25Retriever` snapshot.
+Reloads diff the file against the live snapshot by entry key, derive a new
+index incrementally and publish it with a single reference assignment, so
+in-flight requests keep reading the snapshot they started with. When a
+prebuilt index file is configured the manager maps it instead and re-maps
+it whenever the file is replaced.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Tuple
+
+from backend.kb_index import MmapBM25Index
+from backend.rag_setup import BM25Retriever, load_knowledge_entries
+
+if TYPE_CHECKING:
+    from backend.vector_search import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+def _stat_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Cheap change detector: newest mtime, total size and file count."""
+    try:
+        if path.is_dir():
+            stats = [child.stat() for child in path.iterdir() if child.is_file()]
+        else:
+            stats = [path.stat()]
+    except OSError:
+        return None
+    return (
+        max((stat.st_mtime_ns for stat in stats), default=0),
+        sum(stat.st_size for stat in stats),
+        len(stats),
+    )
+
+
+def _signature_fingerprint(signature: Optional[Tuple[int, int, int]]) -> str:
+    return hashlib.sha256(repr(signature).encode("ascii")).hexdigest()
+
+
+def _fingerprint(entries: Dict[str, str]) -> str:
+    payload = json.dumps(entries, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class KnowledgeBaseManager:
+    """Load, watch and atomically swap the knowledge base index."""
+
+    def __init__(
+        self,
+        path: Path | str,
+        index_path: Path | str | None = None,
+        embedder: Embedder | None = None,
+        lexical_weight: float = 0.5,
+        min_vector_score: float = 0.15,
+    ) -> None:
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else None
+        self.embedder = embedder
+        self.lexical_weight = lexical_weight
+        self.min_vector_score = min_vector_score
+        self._reload_lock = threading.Lock()
+        self._retriever: Sequence[str] | None = None
+        self.version = 1
+        self.loaded_at = datetime.utcnow()
+        # Whether the snapshot comes from the prebuilt index or from the source
+        # file (used while the index is missing or refused).
+        self._index_active = False
+        self._index_signature: Optional[Tuple[int, int, int]] = None
+        self._file_signature: Optional[Tuple[int, int, int]] = None
+
+        index = self._open_index()
+        if index is not None:
+            self._index_active = True
+            self._lexical = index
+            self.fingerprint = _signature_fingerprint(self._index_signature)
+        else:
+            self._file_signature = _stat_signature(self.path)
+            entries = load_knowledge_entries(self.path)
+            self._lexical = BM25Retriever(entries.values(), entries.keys())
+            self.fingerprint = _fingerprint(entries)
+        self._retriever = self._snapshot(self._lexical)
+
+    @property
+    def retriever(self) -> Sequence[str]:
+        """The current immutable snapshot; grab it once per request."""
+        return self._retriever
+
+    def _snapshot(self, lexical: BM25Retriever | MmapBM25Index) -> Sequence[str]:
+        """Wrap the lexical index with vector search when an embedder is configured."""
+        if self.embedder is None:
+            return lexical
+
+        from backend.vector_search import HybridRetriever, VectorIndex
+
+        previous = getattr(self._retriever, "vector", None)
+        if previous is not None:
+            vector = previous.with_documents(lexical)
+        else:
+            vector = VectorIndex(lexical, self.embedder)
+        return HybridRetriever(lexical, vector, self.lexical_weight, self.min_vector_score)
+
+    def _uses_index(self) -> bool:
+        return self.index_path is not None and self.index_path.is_file()
+
+    def _open_index(self) -> Optional[MmapBM25Index]:
+        """Map the prebuilt index; an outdated one is skipped in favour of the source file."""
+        if not self._uses_index():
+            return None
+        self._index_signature = _stat_signature(self.index_path)
+        try:
+            return MmapBM25Index(self.index_path)
+        except ValueError as exc:
+            logger.warning("⚠️ Bilgi bankası indeksi kullanılamıyor, kaynak dosya yükleniyor: %s", exc)
+            return None
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the source if it changed; returns ``True`` when a new snapshot was published."""
+        if self._uses_index():
+            if self._index_active:
+                return self._reload_index(force)
+            # A refused index is retried once it is replaced; until then follow the source.
+            if _stat_signature(self.index_path) != self._index_signature and self._reload_index(force=True):
+                return True
+        return self._reload_source(force)
+
+    def _reload_source(self, force: bool) -> bool:
+        with self._reload_lock:
+            signature = _stat_signature(self.path)
+            if not force and signature == self._file_signature:
+                return False
+
+            try:
+                entries = load_knowledge_entries(self.path)
+            except (OSError, ValueError) as exc:
+                logger.warning("Bilgi bankası yeniden yüklenemedi, eski sürüm korunuyor: %s", exc)
+                return False
+
+            self._file_signature = signature
+            fingerprint = _fingerprint(entries)
+            if fingerprint == self.fingerprint:
+                return False
+
+            current = self._lexical
+            if not isinstance(current, BM25Retriever):
+                current = BM25Retriever(())
+            deletions = [key for key in current.keys() if key not in entries]
+            upserts = {key: text for key, text in entries.items() if current.get(key) != text}
+            self._publish(current.with_changes(upserts, deletions), fingerprint)
+            self._index_active = False
+
+        logger.info(
+            "📚 Bilgi bankası güncellendi (v%d): +%d/-%d kayıt",
+            self.version,
+            len(upserts),
+            len(deletions),
+        )
+        return True
+
+    def _reload_index(self, force: bool) -> bool:
+        with self._reload_lock:
+            signature = _stat_signature(self.index_path)
+            if not force and signature == self._index_signature:
+                return False
+            # Remembered even when the file is refused, so it is retried only once it is replaced.
+            self._index_signature = signature
+            try:
+                index = MmapBM25Index(self.index_path)
+            except (OSError, ValueError) as exc:
+                logger.warning("Bilgi bankası indeksi açılamadı, eski sürüm korunuyor: %s", exc)
+                return False
+            # The previous mapping is released once in-flight readers drop it.
+            self._publish(index, _signature_fingerprint(signature))
+            self._index_active = True
+            self._file_signature = None
+
+        logger.info("📚 Bilgi bankası indeksi yeniden eşlendi (v%d): %d kayıt", self.version, len(index))
+        return True
+
+    def _publish(self, lexical: BM25Retriever | MmapBM25Index, fingerprint: str) -> None:
+        retriever = self._snapshot(lexical)
+        self._lexical = lexical
+        self._retriever = retriever
+        self.fingerprint = fingerprint
+        self.version += 1
+        self.loaded_at = datetime.utcnow()
+
+    async def watch(self, interval: float) -> None:
+        """Poll the file every ``interval`` seconds and reload it in a worker thread."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:  # pragma: no cover - defensive
+                logger.exception("Bilgi bankası izleme hatası")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "documents": len(self._retriever),
+            "fingerprint": self.fingerprint,
+            "loaded_at": self.loaded_at.isoformat(),
+        }
@@ -2,23 +2,51 @@
 
 from __future__ import annotations
 
+import asyncio
+import hmac
 import json
 import logging
-from collections import Counter
-from datetime import datetime
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Literal
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
+from backend.assets import AssetFiles, AssetPipeline, asset_response
+from backend.batch import parse_items, parse_ndjson, run_batch
 from backend.config import settings
-from backend.database import init_db
-from backend.graph import run_agent
+from backend.database import database_stats, init_db, sync_engine
+from backend.graph import (
+    CHECKPOINTER,
+    KNOWLEDGE_BASE,
+    LLM_ADMISSION,
+    RESPONSE_CACHE,
+    TOOL_EXECUTOR,
+    TRACER,
+    arun_agent,
+    astream_agent,
+)
+from backend.history import fetch_messages_page, find_conversation, stream_transcript
+from backend.metrics import metrics_state
+from backend.persistence import write_behind
+from backend.retention import RetentionManager
+from backend.sessions import SessionCoordinator
+from backend.shared_state import worker_id
+from backend.workers import acluster_metrics, publish_periodically, retire_worker
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -26,7 +54,12 @@ logging.basicConfig(level=logging.INFO)
 app = FastAPI(title=settings.APP_NAME)
 
 frontend_dir = Path(__file__).resolve().parent.parent / "frontend"
-app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
+static_assets = AssetPipeline(frontend_dir, settings.STATIC_ASSETS)
+app.mount(
+    "/static",
+    AssetFiles(static_assets, StaticFiles(directory=frontend_dir), max_age=settings.STATIC_MAX_AGE_SECONDS),
+    name="static",
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,71 +70,91 @@ app.add_middleware(
 )
 
 
-class MetricsState:
-    def __init__(self) -> None:
-        self.started_at = datetime.utcnow()
-        self.total_messages = 0
-        self.sessions: Dict[str, Dict[str, Any]] = {}
-        self.tool_usage: Counter[str] = Counter()
-
-    def register_session(self, session_id: str) -> None:
-        self.sessions.setdefault(session_id, {"message_count": 0, "last_message_at": None})
-
-    def record_message(self, session_id: str, metadata: Dict[str, Any]) -> None:
-        self.register_session(session_id)
-        session = self.sessions[session_id]
-        session["message_count"] += 1
-        session["last_message_at"] = datetime.utcnow().isoformat()
-        self.total_messages += 1
-
-        tool_name = metadata.get("tool")
-        if tool_name:
-            self.tool_usage[tool_name] += 1
-
-    def close_session(self, session_id: str) -> None:
-        self.sessions.pop(session_id, None)
-
-    def snapshot(self) -> Dict[str, Any]:
-        uptime = (datetime.utcnow() - self.started_at).total_seconds()
-        return {
-            "uptime_seconds": uptime,
-            "total_messages": self.total_messages,
-            "active_sessions": len(self.sessions),
-            "tool_usage": dict(self.tool_usage),
-            "sessions": [
-                {"session_id": sid, **info}
-                for sid, info in sorted(self.sessions.items())
-            ],
-        }
-
+session_coordinator = SessionCoordinator(
+    dedup_window=settings.MESSAGE_DEDUP_WINDOW_SECONDS,
+    dedup_size=settings.MESSAGE_DEDUP_CACHE_SIZE,
+)
 
-metrics_state = MetricsState()
+retention_manager = RetentionManager(
+    sync_engine,
+    retention_days=settings.RETENTION_DAYS,
+    archive_dir=settings.RETENTION_ARCHIVE_DIR,
+    archive_format=settings.RETENTION_ARCHIVE_FORMAT,
+    partitions_ahead=settings.MESSAGE_PARTITIONS_AHEAD,
+    checkpointer=CHECKPOINTER,
+)
 
 
 class ChatRequest(BaseModel):
     message: str
     session_id: str
+    # Client-generated id; retries with the same id reuse the first answer
+    message_id: str | None = None
 
 
 class ChatResponse(BaseModel):
     response: str
     session_id: str
+    message_id: str | None = None
     metadata: Dict[str, Any] | None = None
 
 
+background_tasks: list[asyncio.Task] = []
+
+
+async def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    # Fail closed: without a configured token the admin surface (transcripts, batch runs) stays shut.
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Yönetici erişimi yapılandırılmamış (ADMIN_TOKEN)")
+    if x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(status_code=403, detail="Yetkisiz erişim")
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
     logger.info("🚀 Uygulama başlatılıyor...")
     await init_db()
+    # PostgreSQL needs this month's partition before the first insert.
+    await asyncio.to_thread(retention_manager.prepare)
+    await asyncio.to_thread(static_assets.build)
+    write_behind.start()
     logger.info("✅ Veritabanı hazır")
 
+    if settings.KNOWLEDGE_BASE_RELOAD_INTERVAL_SECONDS > 0:
+        background_tasks.append(
+            asyncio.create_task(
+                KNOWLEDGE_BASE.watch(settings.KNOWLEDGE_BASE_RELOAD_INTERVAL_SECONDS)
+            )
+        )
+    if settings.RETENTION_INTERVAL_SECONDS > 0:
+        background_tasks.append(
+            asyncio.create_task(retention_manager.run_periodically(settings.RETENTION_INTERVAL_SECONDS))
+        )
+    if settings.METRICS_PUBLISH_INTERVAL_SECONDS > 0:
+        background_tasks.append(
+            asyncio.create_task(publish_periodically(settings.METRICS_PUBLISH_INTERVAL_SECONDS))
+        )
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await asyncio.to_thread(write_behind.stop)
+    logger.info("💾 Bekleyen mesajlar veritabanına yazıldı")
+    await asyncio.to_thread(TRACER.flush)
+    await asyncio.to_thread(retire_worker)
+
 
 @app.get("/", response_class=HTMLResponse)
-async def home() -> HTMLResponse:
-    index_path = frontend_dir / "index.html"
-    if not index_path.exists():
+async def home(request: Request) -> Response:
+    page = static_assets.get("index.html")
+    if page is None:
         raise HTTPException(status_code=404, detail="index.html bulunamadı")
-    return FileResponse(index_path)
+    return asset_response(page, request.headers, "no-cache")
 
 
 @app.get("/api/health")
@@ -111,20 +164,109 @@ async def health_check() -> Dict[str, Any]:
 
 @app.get("/api/metrics")
 async def metrics() -> Dict[str, Any]:
-    return metrics_state.snapshot()
+    cluster = await acluster_metrics()
+    return {
+        **cluster.snapshot(),
+        # Sections below are local to the worker that answered
+        "worker": worker_id(),
+        "persistence": write_behind.stats(),
+        "knowledge_base": KNOWLEDGE_BASE.stats(),
+        "response_cache": RESPONSE_CACHE.stats() if RESPONSE_CACHE else None,
+        "checkpoints": CHECKPOINTER.stats(),
+        "turns": session_coordinator.stats(),
+        "llm_admission": LLM_ADMISSION.stats(),
+        "tracing": TRACER.stats(),
+        "tools": TOOL_EXECUTOR.stats(),
+        "retention": retention_manager.stats(),
+        "database": database_stats(),
+    }
+
+
+@app.get("/api/admin/sessions", dependencies=[Depends(require_admin)])
+async def metrics_sessions(
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1_000),
+) -> Dict[str, Any]:
+    return metrics_state.sessions_page(offset, limit)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> PlainTextResponse:
+    admission = LLM_ADMISSION.stats()
+    database = database_stats()
+    cluster = await acluster_metrics()
+    body = cluster.render_prometheus(
+        {
+            **{
+                f"webchat_db_{engine}_pool_{key}": pool[key]
+                for engine, pool in database.items()
+                for key in ("checked_out", "saturation", "timeouts")
+                if key in pool
+            },
+            "webchat_llm_in_flight": admission["in_flight"],
+            "webchat_llm_queue_length": admission["queue_length"],
+            "webchat_persistence_queue_depth": write_behind.stats()["queue_depth"],
+            "webchat_turns_waiting": session_coordinator.stats()["waiting_turns"],
+        }
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/admin/traces", dependencies=[Depends(require_admin)])
+async def dump_traces(limit: int | None = Query(default=None, ge=0)) -> Dict[str, Any]:
+    return TRACER.dump(limit)
+
+
+@app.post("/api/admin/knowledge/reload", dependencies=[Depends(require_admin)])
+async def reload_knowledge_base() -> Dict[str, Any]:
+    reloaded = await asyncio.to_thread(KNOWLEDGE_BASE.reload, True)
+    return {"reloaded": reloaded, **KNOWLEDGE_BASE.stats()}
+
+
+@app.post("/api/admin/retention/run", dependencies=[Depends(require_admin)])
+async def run_retention() -> Dict[str, Any]:
+    return await asyncio.to_thread(retention_manager.run_once)
+
+
+@app.get("/api/conversations/{session_id}/messages", dependencies=[Depends(require_admin)])
+async def conversation_messages(
+    session_id: str,
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = Query(default=None),
+    order: Literal["asc", "desc"] = Query(default="asc"),
+) -> Dict[str, Any]:
+    try:
+        page = await fetch_messages_page(session_id, limit, cursor, descending=order == "desc")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz cursor")
+    if page is None:
+        raise HTTPException(status_code=404, detail="Konuşma bulunamadı")
+    return page
+
+
+@app.get("/api/conversations/{session_id}/export", dependencies=[Depends(require_admin)])
+async def export_conversation(session_id: str) -> StreamingResponse:
+    conversation_id = await find_conversation(session_id)
+    if conversation_id is None:
+        raise HTTPException(status_code=404, detail="Konuşma bulunamadı")
+    return StreamingResponse(
+        stream_transcript(conversation_id, settings.TRANSCRIPT_EXPORT_BATCH_SIZE),
+        media_type="application/x-ndjson",
+    )
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket) -> None:
     session_id = websocket.query_params.get("session_id") or f"session-{uuid4().hex}"
     await websocket.accept()
-    metrics_state.register_session(session_id)
+    metrics_state.open_connection(session_id)
     logger.info("🔌 WebSocket bağlandı: %s", session_id)
 
     try:
         while True:
             raw_message = await websocket.receive_text()
             payload_session_id = None
+            message_id = None
             message_text = raw_message
 
             try:
@@ -135,6 +277,7 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
             if isinstance(parsed, dict):
                 message_text = str(parsed.get("message", "")).strip()
                 payload_session_id = parsed.get("session_id")
+                message_id = parsed.get("message_id") or None
             else:
                 message_text = str(raw_message).strip()
 
@@ -154,14 +297,26 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
 
             logger.info("📨 Mesaj alındı (%s): %s", session_id, message_text)
 
-            result = run_agent(session_id=session_id, user_input=message_text)
-            metrics_state.record_message(session_id, result.get("metadata", {}))
-
+            async def stream_turn() -> Dict[str, Any]:
+                started = time.perf_counter()
+                async for event in astream_agent(session_id=session_id, user_input=message_text):
+                    if event["type"] in ("delta", "reset"):
+                        await websocket.send_json(
+                            {**event, "session_id": session_id, "message_id": message_id}
+                        )
+                        continue
+                    metrics_state.record_message(
+                        session_id, event.get("metadata", {}), time.perf_counter() - started
+                    )
+                    return event
+
+            result, _ = await session_coordinator.run(session_id, message_id, stream_turn)
             await websocket.send_json(
                 {
                     "type": "response",
                     "response": result["response"],
                     "session_id": session_id,
+                    "message_id": message_id,
                     "metadata": result.get("metadata", {}),
                 }
             )
@@ -186,11 +341,63 @@ async def chat_endpoint(request: ChatRequest) -> ChatResponse:
         raise HTTPException(status_code=422, detail="Mesaj alanı boş bırakılamaz")
 
     metrics_state.register_session(request.session_id)
-    result = run_agent(session_id=request.session_id, user_input=request.message)
-    metrics_state.record_message(request.session_id, result.get("metadata", {}))
 
+    async def run_turn() -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = await arun_agent(session_id=request.session_id, user_input=request.message)
+        metrics_state.record_message(
+            request.session_id, result.get("metadata", {}), time.perf_counter() - started
+        )
+        return result
+
+    result, _ = await session_coordinator.run(request.session_id, request.message_id, run_turn)
     return ChatResponse(
         response=result["response"],
         session_id=request.session_id,
+        message_id=request.message_id,
         metadata=result.get("metadata", {}),
     )
+
+
+@app.post("/api/chat/batch", dependencies=[Depends(require_admin)])
+async def chat_batch(
+    request: Request,
+    concurrency: int = Query(
+        default=settings.BATCH_CONCURRENCY, ge=1, le=settings.BATCH_MAX_CONCURRENCY
+    ),
+    persist: bool = Query(default=True),
+) -> StreamingResponse:
+    """Run many turns at once; accepts a JSON list (or ``{"items": [...]}``) or an NDJSON body."""
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            records = parse_ndjson(body.splitlines())
+        else:
+            records = json.loads(body)
+            if isinstance(records, dict):
+                records = records.get("items")
+            if not isinstance(records, list):
+                raise ValueError("expected a list of items")
+        items = parse_items(records)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Geçersiz toplu istek: {exc}")
+    if not items:
+        raise HTTPException(status_code=400, detail="Toplu istek boş")
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"En fazla {settings.BATCH_MAX_ITEMS} mesaj gönderilebilir"
+        )
+
+    logger.info("📦 Toplu çalıştırma: %d mesaj, eşzamanlılık %d", len(items), concurrency)
+
+    async def lines():
+        async for result in run_batch(
+            items,
+            concurrency=concurrency,
+            persist=persist,
+            persist_batch_size=settings.PERSISTENCE_MAX_BATCH_SIZE,
+            coordinator=session_coordinator,
+        ):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,343 @@
+"""Conversation memory: checkpoint storage and the history window policy.
+
+The compiled graph persists its state per ``thread_id`` through a LangGraph
+checkpointer. :class:`CachedCheckpointSaver` wraps any saver with an LRU of
+the latest checkpoint of hot threads, so an active session does not re-read
+and deserialize its checkpoint on every message. The cache assumes a session
+sticks to one worker, so it is disabled when ``WORKERS`` > 1.
+
+The helpers below keep the stored history bounded (older turns are folded
+into a rolling summary) and trim what is sent to the LLM to a token budget.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import pickle
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, trim_messages
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.base.id import UUID as CheckpointUUID
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from backend.cache import TTLCache
+
+
+def _clone(value: Any) -> Any:
+    """Deep copy via pickle, several times faster than ``copy.deepcopy`` for message lists."""
+    try:
+        return pickle.loads(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return copy.deepcopy(value)
+
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_id_floor(moment: datetime) -> str:
+    """Smallest checkpoint id LangGraph can issue at ``moment`` (naive UTC).
+
+    Checkpoint ids are UUIDv6, whose string form sorts by creation time, so
+    ``checkpoint_id < checkpoint_id_floor(cutoff)`` selects checkpoints taken
+    before ``cutoff`` without deserializing them.
+    """
+    delta = moment - datetime(1970, 1, 1)
+    timestamp = (delta.days * 86_400 + delta.seconds) * 10**7 + delta.microseconds * 10 + _UUID_EPOCH_OFFSET
+    value = ((timestamp >> 12) & 0xFFFFFFFFFFFF) << 80 | (timestamp & 0x0FFF) << 64
+    return str(CheckpointUUID(int=value, version=6))
+
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """Write-through cache of each thread's latest checkpoint in front of ``saver``.
+
+    Only "latest checkpoint" lookups are served from the cache. Pending
+    writes invalidate the thread's entry, so a cached tuple never hides
+    writes stored for it. Async calls on a blocking saver run in a thread.
+    """
+
+    def __init__(
+        self,
+        saver: BaseCheckpointSaver,
+        maxsize: int = 1000,
+        ttl: Optional[float] = None,
+        blocking: bool = False,
+    ) -> None:
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.blocking = blocking
+        self._latest: Optional[TTLCache[Tuple[str, str], CheckpointTuple]] = (
+            TTLCache(maxsize=maxsize, ttl=ttl) if maxsize > 0 else None
+        )
+
+    @staticmethod
+    def _thread_key(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    def _cached(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        if self._latest is None:
+            return None
+        cached = self._latest.get(self._thread_key(config))
+        if cached is None:
+            return None
+        requested = config["configurable"].get("checkpoint_id")
+        if requested and requested != cached.checkpoint["id"]:
+            return None
+        # The graph mutates channel values it reads, so never hand out the cached objects.
+        return _clone(cached)
+
+    def _remember(
+        self,
+        config: RunnableConfig,
+        saved_config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> None:
+        if self._latest is None:
+            return
+        parent_id = config["configurable"].get("checkpoint_id")
+        parent_config = (
+            {"configurable": {**saved_config["configurable"], "checkpoint_id": parent_id}}
+            if parent_id
+            else None
+        )
+        self._latest.set(
+            self._thread_key(saved_config),
+            _clone(CheckpointTuple(saved_config, checkpoint, metadata, parent_config, [])),
+        )
+
+    def _forget(self, config: RunnableConfig) -> None:
+        if self._latest is not None:
+            self._latest.pop(self._thread_key(config))
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        cached = self._cached(config)
+        if cached is not None:
+            return cached
+        saved = self.saver.get_tuple(config)
+        if saved is not None and self._latest is not None and not saved.pending_writes:
+            if not config["configurable"].get("checkpoint_id"):
+                self._latest.set(self._thread_key(config), _clone(saved))
+        return saved
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        saved_config = self.saver.put(config, checkpoint, metadata, new_versions)
+        self._remember(config, saved_config, checkpoint, metadata)
+        return saved_config
+
+    def put_writes(
+        self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str
+    ) -> None:
+        self._forget(config)
+        self.saver.put_writes(config, writes, task_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        cached = self._cached(config)
+        if cached is not None:
+            return cached
+        if self.blocking:
+            return await asyncio.to_thread(self.get_tuple, config)
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = self.saver.list(config, filter=filter, before=before, limit=limit)
+        if self.blocking:
+            items = await asyncio.to_thread(list, items)
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        if self.blocking:
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str
+    ) -> None:
+        if self.blocking:
+            await asyncio.to_thread(self.put_writes, config, writes, task_id)
+        else:
+            self.put_writes(config, writes, task_id)
+
+    def get_next_version(self, current, channel):  # type: ignore[override]
+        return self.saver.get_next_version(current, channel)
+
+    def delete_threads(self, thread_ids: Sequence[str]) -> None:
+        """Drop every checkpoint and pending write of ``thread_ids`` (used by retention)."""
+        if not thread_ids:
+            return
+        for thread_id in thread_ids:
+            self._forget({"configurable": {"thread_id": thread_id}})
+        saver = self.saver
+        if isinstance(saver, SqliteSaver):
+            rows = [(str(thread_id),) for thread_id in thread_ids]
+            with saver.lock, saver.cursor() as cursor:
+                cursor.executemany("DELETE FROM checkpoints WHERE thread_id = ?", rows)
+                cursor.executemany("DELETE FROM writes WHERE thread_id = ?", rows)
+        elif isinstance(saver, MemorySaver):
+            doomed = {str(thread_id) for thread_id in thread_ids}
+            for thread_id in doomed:
+                saver.storage.pop(thread_id, None)
+            for key in [key for key in saver.writes if key[0] in doomed]:
+                del saver.writes[key]
+
+    def prune(self, before: datetime) -> int:
+        """Drop checkpoints (and their pending writes) taken before ``before``; returns how many.
+
+        Used by retention so superseded states holding expired messages do not
+        outlive them. A thread's latest checkpoint still carries its bounded
+        history window; threads idle since ``before`` lose every checkpoint.
+        """
+        floor = checkpoint_id_floor(before)
+        saver = self.saver
+        if isinstance(saver, SqliteSaver):
+            with saver.lock, saver.cursor() as cursor:
+                cursor.execute("SELECT DISTINCT thread_id FROM checkpoints WHERE checkpoint_id < ?", (floor,))
+                threads = [row[0] for row in cursor.fetchall()]
+                cursor.execute("DELETE FROM checkpoints WHERE checkpoint_id < ?", (floor,))
+                pruned = cursor.rowcount
+                cursor.execute("DELETE FROM writes WHERE checkpoint_id < ?", (floor,))
+        elif isinstance(saver, MemorySaver):
+            threads, pruned = [], 0
+            for thread_id, namespaces in list(saver.storage.items()):
+                expired = [
+                    (checkpoints, checkpoint_id)
+                    for checkpoints in namespaces.values()
+                    for checkpoint_id in checkpoints
+                    if checkpoint_id < floor
+                ]
+                if not expired:
+                    continue
+                for checkpoints, checkpoint_id in expired:
+                    del checkpoints[checkpoint_id]
+                pruned += len(expired)
+                threads.append(thread_id)
+                if not any(namespaces.values()):
+                    del saver.storage[thread_id]
+            for key in [key for key in saver.writes if key[2] < floor]:
+                del saver.writes[key]
+        else:
+            return 0
+        for thread_id in threads:
+            self._forget({"configurable": {"thread_id": thread_id}})
+        return pruned
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.saver).__name__,
+            "hot_threads": self._latest.stats() if self._latest is not None else None,
+        }
+
+
+def sqlite_saver(path: Path | str) -> SqliteSaver:
+    connection = sqlite3.connect(str(path), check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    return SqliteSaver(connection)
+
+
+def build_checkpointer(
+    backend: str, path: Path | str, cache_size: int, cache_ttl: Optional[float]
+) -> CachedCheckpointSaver:
+    if backend == "sqlite":
+        return CachedCheckpointSaver(sqlite_saver(path), cache_size, cache_ttl, blocking=True)
+    return CachedCheckpointSaver(MemorySaver(), cache_size, cache_ttl)
+
+
+def approximate_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Cheap token estimate (~4 characters per token plus per-message overhead)."""
+    return sum(len(str(message.content)) // 4 + 4 for message in messages)
+
+
+def conversation_turns(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """User/assistant text turns; tool-call requests and tool outputs are dropped."""
+    return [
+        message
+        for message in messages
+        if isinstance(message, HumanMessage)
+        or (isinstance(message, AIMessage) and not message.tool_calls and message.content)
+    ]
+
+
+def split_for_summary(
+    messages: Sequence[BaseMessage], max_turns: int
+) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """Split ``messages`` into ``(to_fold, to_keep)`` once more than ``max_turns`` user turns exist.
+
+    Half of the window is folded at a time so summarization runs once every
+    few turns instead of on every message.
+    """
+    starts = [index for index, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    if len(starts) <= max_turns:
+        return [], list(messages)
+    keep_from = starts[-max(1, max_turns // 2)]
+    return list(messages[:keep_from]), list(messages[keep_from:])
+
+
+def extractive_summary(previous: str, messages: Sequence[BaseMessage], max_chars: int) -> str:
+    """Fallback summary without an LLM: one short line per turn, newest lines win."""
+    lines = [previous] if previous else []
+    for message in conversation_turns(messages):
+        speaker = "Kullanıcı" if isinstance(message, HumanMessage) else "Asistan"
+        text = " ".join(str(message.content).split())
+        lines.append(f"{speaker}: {text[:200]}")
+    summary = "\n".join(lines)
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:]
+        summary = summary[summary.find("\n") + 1 :] if "\n" in summary else summary
+    return summary
+
+
+def trim_history(history: Sequence[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """Most recent ``history`` that fits ``max_tokens``, starting on a user message."""
+    if max_tokens <= 0:
+        return []
+    return trim_messages(
+        conversation_turns(history),
+        max_tokens=max_tokens,
+        token_counter=approximate_tokens,
+        strategy="last",
+        start_on="human",
+    )
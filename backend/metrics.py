@@ -0,0 +1,349 @@
+"""In-process metrics with bounded memory and O(1) hot-path updates.
+
+Latencies go into fixed-bucket histograms (per graph node and per turn),
+counts into plain counters, and sessions into an LRU ordered by last
+activity, so idle sessions are evicted from the front without scanning.
+``/api/metrics`` reads summaries; per-session details are paginated and the
+same data is rendered in the Prometheus text exposition format.
+
+With several worker processes each keeps its own state; :meth:`MetricsState.export`
+produces a JSON-safe copy of the counters that workers publish to shared
+state, and :meth:`MetricsState.merge` sums those copies into one view.
+
+Writers do unlocked integer increments. Sync graph nodes record from worker
+threads, so under CPython an increment racing another on the same bucket can
+very rarely be lost, which is acceptable for monitoring.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from backend.config import settings
+
+# Upper bounds in seconds; roughly 2.5x apart from 1 ms to one minute.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; the last slot counts observations above every bound."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                if index == len(self.bounds):
+                    return lower
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total * 1000 / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 2),
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "p99_ms": round(self.quantile(0.99) * 1000, 2),
+        }
+
+    def cumulative(self) -> Iterable[Tuple[str, int]]:
+        running = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            running += bucket_count
+            yield repr(bound), running
+        yield "+Inf", self.count
+
+    def export(self) -> Dict[str, Any]:
+        return {"counts": list(self.counts), "total": self.total, "count": self.count}
+
+    def absorb(self, exported: Mapping[str, Any]) -> None:
+        """Add another histogram's exported buckets (same bounds) to this one."""
+        for index, bucket_count in enumerate(exported["counts"][: len(self.counts)]):
+            self.counts[index] += bucket_count
+        self.total += exported["total"]
+        self.count += exported["count"]
+
+
+class _SessionInfo:
+    __slots__ = ("message_count", "last_seen", "last_message_at")
+
+    def __init__(self, now: float) -> None:
+        self.message_count = 0
+        self.last_seen = now
+        self.last_message_at: Optional[float] = None
+
+
+def _label(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+class MetricsState:
+    """Counters, latency histograms and a bounded, idle-evicting session table."""
+
+    def __init__(
+        self,
+        idle_timeout: float = 1_800.0,
+        max_sessions: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self.started_at = clock()
+        self.total_messages = 0
+        self.sessions: "OrderedDict[str, _SessionInfo]" = OrderedDict()
+        self.websocket_connections = 0
+        self.evicted_sessions = 0
+        self.intents: Counter[str] = Counter()
+        self.tool_usage: Counter[str] = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.llm_shed = 0
+        self.turn_latency = LatencyHistogram()
+        self.node_latency: Dict[str, LatencyHistogram] = {}
+        # Sessions tracked by other workers, set on merged views only
+        self.remote_sessions = 0
+        self.workers = 1
+
+    # -- hot path ------------------------------------------------------------
+
+    def _touch(self, session_id: str) -> _SessionInfo:
+        now = self._clock()
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = _SessionInfo(now)
+        else:
+            session.last_seen = now
+            self.sessions.move_to_end(session_id)
+        self.evict_idle(now)
+        return session
+
+    def register_session(self, session_id: str) -> None:
+        self._touch(session_id)
+
+    def open_connection(self, session_id: str) -> None:
+        self.websocket_connections += 1
+        self._touch(session_id)
+
+    def close_session(self, session_id: str) -> None:
+        self.websocket_connections = max(0, self.websocket_connections - 1)
+        self.sessions.pop(session_id, None)
+
+    def record_message(
+        self, session_id: str, metadata: Mapping[str, Any], duration: Optional[float] = None
+    ) -> None:
+        session = self._touch(session_id)
+        session.message_count += 1
+        session.last_message_at = self._wall_clock()
+        self.total_messages += 1
+
+        self.intents[metadata.get("intent") or "unknown"] += 1
+        tool_name = metadata.get("tool")
+        if tool_name:
+            self.tool_usage[tool_name] += 1
+        if metadata.get("cache_hit"):
+            self.cache_hits += 1
+        elif metadata.get("cache_lookup"):
+            # Rule-based and tool-backed turns never consult the cache.
+            self.cache_misses += 1
+        if metadata.get("llm_shed"):
+            self.llm_shed += 1
+        if duration is not None:
+            self.turn_latency.observe(duration)
+
+    def observe_node(self, node: str, seconds: float) -> None:
+        histogram = self.node_latency.get(node)
+        if histogram is None:
+            histogram = self.node_latency.setdefault(node, LatencyHistogram())
+        histogram.observe(seconds)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop sessions idle past the timeout, oldest first, and enforce the cap."""
+        now = self._clock() if now is None else now
+        evicted = 0
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if len(self.sessions) <= self.max_sessions and now - session.last_seen < self.idle_timeout:
+                break
+            del self.sessions[session_id]
+            evicted += 1
+        self.evicted_sessions += evicted
+        return evicted
+
+    # -- multi-worker aggregation --------------------------------------------
+
+    def export(self) -> Dict[str, Any]:
+        """JSON-safe counters and histograms, without per-session details."""
+        self.evict_idle()
+        return {
+            "total_messages": self.total_messages,
+            "active_sessions": len(self.sessions),
+            "websocket_connections": self.websocket_connections,
+            "evicted_sessions": self.evicted_sessions,
+            "intents": dict(self.intents),
+            "tool_usage": dict(self.tool_usage),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "llm_shed": self.llm_shed,
+            "turn_latency": self.turn_latency.export(),
+            "node_latency": {node: hist.export() for node, hist in list(self.node_latency.items())},
+        }
+
+    def merge(self, exports: Iterable[Mapping[str, Any]]) -> "MetricsState":
+        """A read-only view summing ``exports``; uptime is this worker's.
+
+        Session details stay per worker, so the view reports remote sessions
+        as a count and its ``sessions_page`` is empty.
+        """
+        merged = MetricsState(self.idle_timeout, self.max_sessions, self._clock, self._wall_clock)
+        merged.started_at = self.started_at
+        merged.workers = 0
+        for exported in exports:
+            merged.workers += 1
+            merged.total_messages += exported["total_messages"]
+            merged.remote_sessions += exported["active_sessions"]
+            merged.websocket_connections += exported["websocket_connections"]
+            merged.evicted_sessions += exported["evicted_sessions"]
+            merged.intents.update(exported["intents"])
+            merged.tool_usage.update(exported["tool_usage"])
+            merged.cache_hits += exported["cache_hits"]
+            merged.cache_misses += exported["cache_misses"]
+            merged.llm_shed += exported["llm_shed"]
+            merged.turn_latency.absorb(exported["turn_latency"])
+            for node, hist in exported["node_latency"].items():
+                merged.node_latency.setdefault(node, LatencyHistogram()).absorb(hist)
+        return merged
+
+    # -- readers -------------------------------------------------------------
+
+    def _active_sessions(self) -> int:
+        return len(self.sessions) + self.remote_sessions
+
+    def snapshot(self) -> Dict[str, Any]:
+        self.evict_idle()
+        return {
+            "uptime_seconds": self._clock() - self.started_at,
+            "total_messages": self.total_messages,
+            "active_sessions": self._active_sessions(),
+            "workers": self.workers,
+            "sessions": {
+                "tracked": self._active_sessions(),
+                "websocket_connections": self.websocket_connections,
+                "evicted_idle": self.evicted_sessions,
+            },
+            "intents": dict(self.intents),
+            "tool_usage": dict(self.tool_usage),
+            "cache": {"hits": self.cache_hits, "misses": self.cache_misses},
+            "llm_shed": self.llm_shed,
+            "latency": {
+                "turn": self.turn_latency.summary(),
+                "nodes": {node: hist.summary() for node, hist in list(self.node_latency.items())},
+            },
+        }
+
+    def sessions_page(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Most recently active sessions first."""
+        self.evict_idle()
+        page = islice(reversed(self.sessions.items()), offset, offset + limit)
+        return {
+            "total": len(self.sessions),
+            "offset": offset,
+            "limit": limit,
+            "sessions": [
+                {
+                    "session_id": session_id,
+                    "message_count": session.message_count,
+                    "last_message_at": _iso(session.last_message_at),
+                }
+                for session_id, session in page
+            ],
+        }
+
+    def render_prometheus(self, gauges: Optional[Mapping[str, float]] = None) -> str:
+        """Prometheus text exposition (format 0.0.4); ``gauges`` adds extra unlabeled gauges."""
+        self.evict_idle()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+        def labelled(label: str, counts: Mapping[str, int]) -> List[Tuple[str, float]]:
+            return [(f'{{{label}="{_label(key)}"}}', value) for key, value in sorted(counts.items())]
+
+        def histogram(name: str, help_text: str, series: Mapping[str, LatencyHistogram], label: str = "") -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in sorted(series.items()):
+                prefix = f'{label}="{_label(key)}",' if label else ""
+                for bound, running in hist.cumulative():
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {running}')
+                suffix = f"{{{prefix[:-1]}}}" if prefix else ""
+                lines.append(f"{name}_sum{suffix} {hist.total}")
+                lines.append(f"{name}_count{suffix} {hist.count}")
+
+        metric("webchat_uptime_seconds", "gauge", "Seconds since the process started.",
+               [("", self._clock() - self.started_at)])
+        metric("webchat_messages_total", "counter", "Answered chat turns.", [("", self.total_messages)])
+        metric("webchat_intent_messages_total", "counter", "Answered turns by detected intent.",
+               labelled("intent", self.intents))
+        metric("webchat_tool_calls_total", "counter", "Tool invocations by tool.",
+               labelled("tool", self.tool_usage))
+        metric("webchat_response_cache_total", "counter", "Response cache lookups by result.",
+               [('{result="hit"}', self.cache_hits), ('{result="miss"}', self.cache_misses)])
+        metric("webchat_llm_shed_total", "counter", "Turns answered without the LLM due to admission control.",
+               [("", self.llm_shed)])
+        metric("webchat_active_sessions", "gauge", "Sessions active within the idle timeout.",
+               [("", self._active_sessions())])
+        metric("webchat_workers", "gauge", "Worker processes included in these metrics.", [("", self.workers)])
+        metric("webchat_websocket_connections", "gauge", "Open WebSocket connections.",
+               [("", self.websocket_connections)])
+        metric("webchat_sessions_evicted_total", "counter", "Sessions evicted after idling.",
+               [("", self.evicted_sessions)])
+        histogram("webchat_turn_duration_seconds", "End-to-end turn latency.", {"": self.turn_latency})
+        histogram("webchat_node_duration_seconds", "Graph node latency.", dict(self.node_latency), "node")
+        for name, value in sorted((gauges or {}).items()):
+            metric(name, "gauge", name.replace("_", " ") + ".", [("", value)])
+        return "\n".join(lines) + "\n"
+
+
+metrics_state = MetricsState(
+    idle_timeout=settings.METRICS_SESSION_IDLE_SECONDS,
+    max_sessions=settings.METRICS_MAX_SESSIONS,
+)
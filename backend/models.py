@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, JSON, String, Text
+from sqlalchemy import DDL, Column, DateTime, ForeignKey, Index, JSON, String, Text, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -24,12 +24,35 @@ class Message(Base):
     (id, conversation_id, sender, content, metadata, created_at)
     """
     __tablename__ = "messages"
+    # Transcript reads are range scans on (conversation_id, created_at, id);
+    # see backend/history.py for the keyset pagination that relies on it.
+    # On PostgreSQL the table is range-partitioned by month (backend/retention.py),
+    # which is why created_at is part of the primary key.
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at", "id"),
+        Index("ix_messages_created_at", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False)
     sender = Column(String(50), nullable=False)  # 'user' veya 'assistant'
     content = Column(Text, nullable=False)
     metadata_json = Column("metadata", JSON, default=dict)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, primary_key=True)
 
     conversation = relationship("Conversation", back_populates="messages")
+
+
+# A partitioned table accepts no rows until it has a partition. Give it the
+# catch-all one as soon as it exists, so any process that only runs init_db
+# (tests, the batch CLI, a worker started before retention) can write.
+# Monthly partitions are added by backend/retention.py.
+DEFAULT_PARTITION = "messages_default"
+event.listen(
+    Message.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF messages DEFAULT").execute_if(
+        dialect="postgresql"
+    ),
+)
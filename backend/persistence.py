@@ -0,0 +1,298 @@
+"""Write-behind persistence of chat turns.
+
+Turns are queued in-process and a background thread writes them to the
+database in batches, so request handlers never wait on a DB round-trip.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.orm import Session
+
+from backend.cache import TTLCache
+from backend.config import settings
+from backend.database import AsyncSessionLocal, SessionLocal
+from backend.models import Conversation, Message as MessageModel
+
+logger = logging.getLogger(__name__)
+
+# session_id -> Conversation.id; the mapping never changes once created
+conversation_ids: TTLCache[str, uuid.UUID] = TTLCache(
+    maxsize=settings.CONVERSATION_CACHE_SIZE,
+    ttl=settings.CONVERSATION_CACHE_TTL_SECONDS,
+)
+
+
+@dataclass
+class PendingTurn:
+    """One user/assistant exchange waiting to be written."""
+
+    session_id: str
+    user_message: str
+    ai_message: str
+    metadata: Dict[str, object]
+    received_at: datetime = field(default_factory=datetime.utcnow)
+    answered_at: datetime = field(default_factory=datetime.utcnow)
+
+
+def _message_rows(conversation_id, turn: PendingTurn) -> List[Dict[str, object]]:
+    return [
+        {
+            "conversation_id": conversation_id,
+            "sender": "user",
+            "content": turn.user_message,
+            "metadata_json": {"intent": turn.metadata.get("intent")},
+            "created_at": turn.received_at,
+        },
+        {
+            "conversation_id": conversation_id,
+            "sender": "assistant",
+            "content": turn.ai_message,
+            "metadata_json": turn.metadata,
+            "created_at": turn.answered_at,
+        },
+    ]
+
+
+def _upsert_conversations(db: Session, session_ids: Sequence[str]) -> None:
+    """Create missing conversations without racing concurrent writers."""
+    table = Conversation.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql_insert(table).on_conflict_do_nothing(index_elements=["session_id"])
+    elif dialect == "sqlite":
+        statement = insert(table).prefix_with("OR IGNORE")
+    else:
+        existing = set(
+            db.scalars(select(Conversation.session_id).where(Conversation.session_id.in_(session_ids)))
+        )
+        session_ids = [sid for sid in session_ids if sid not in existing]
+        statement = insert(table)
+    if not session_ids:
+        return
+
+    now = datetime.utcnow()
+    db.execute(
+        statement,
+        [{"id": uuid.uuid4(), "session_id": sid, "created_at": now} for sid in session_ids],
+    )
+
+
+def resolve_conversation_ids(db: Session, session_ids: Iterable[str]) -> Dict[str, uuid.UUID]:
+    """Map session ids to conversation ids, creating conversations as needed.
+
+    Cached sessions cost no query at all; unknown ones are resolved with one
+    upsert plus one ``SELECT ... IN`` for the whole batch. Callers must add
+    the result to :data:`conversation_ids` only after their transaction
+    commits, so a rollback never leaves a dangling id in the cache.
+    """
+    resolved: Dict[str, uuid.UUID] = {}
+    missing: List[str] = []
+    for session_id in set(session_ids):
+        conversation_id = conversation_ids.get(session_id)
+        if conversation_id is None:
+            missing.append(session_id)
+        else:
+            resolved[session_id] = conversation_id
+
+    if missing:
+        _upsert_conversations(db, missing)
+        resolved.update(
+            db.execute(
+                select(Conversation.session_id, Conversation.id).where(
+                    Conversation.session_id.in_(missing)
+                )
+            ).all()
+        )
+    return resolved
+
+
+def _message_batch(
+    conversation_map: Dict[str, uuid.UUID], turns: Sequence[PendingTurn]
+) -> List[Dict[str, object]]:
+    rows: List[Dict[str, object]] = []
+    for turn in turns:
+        rows.extend(_message_rows(conversation_map[turn.session_id], turn))
+    return rows
+
+
+def persist_turns(turns: Sequence[PendingTurn]) -> None:
+    """Write a batch of turns in a single transaction.
+
+    Conversation ids come from :func:`resolve_conversation_ids` and all
+    message rows go out as one bulk insert.
+    """
+    if not turns:
+        return
+
+    db = SessionLocal()
+    try:
+        conversation_map = resolve_conversation_ids(db, (turn.session_id for turn in turns))
+        db.execute(insert(MessageModel), _message_batch(conversation_map, turns))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    conversation_ids.update(conversation_map)
+
+
+async def apersist_turns(turns: Sequence[PendingTurn]) -> None:
+    """Async variant of :func:`persist_turns` using ``AsyncSessionLocal``."""
+    if not turns:
+        return
+
+    async with AsyncSessionLocal() as db:
+        try:
+            conversation_map = await db.run_sync(
+                resolve_conversation_ids, [turn.session_id for turn in turns]
+            )
+            await db.execute(insert(MessageModel), _message_batch(conversation_map, turns))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    conversation_ids.update(conversation_map)
+
+
+class _FlushRequest:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Bounded queue drained by a daemon thread in size/time-bounded batches."""
+
+    def __init__(
+        self,
+        writer: Callable[[Sequence[PendingTurn]], None],
+        max_batch_size: int = 200,
+        max_delay: float = 0.05,
+        max_queue_size: int = 10_000,
+    ) -> None:
+        self._writer = writer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max(0.0, max_delay)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="persistence-writer", daemon=True
+            )
+            self._thread.start()
+
+    def enqueue(self, turn: PendingTurn) -> bool:
+        """Queue a turn without blocking; returns ``False`` when it was dropped."""
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put_nowait(turn)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Kalıcılık kuyruğu dolu, mesaj düşürüldü: %s", turn.session_id)
+            return False
+        self.enqueued += 1
+        return True
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Block until everything queued before this call has been written."""
+        if not self.running:
+            return self._queue.empty()
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Flush pending turns and stop the worker thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _write(self, batch: List[PendingTurn]) -> None:
+        if not batch:
+            return
+        try:
+            self._writer(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Kalıcılık yazımı başarısız (%d tur)", len(batch))
+        else:
+            self.written += len(batch)
+            self.batches += 1
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[PendingTurn] = []
+            deadline = time.monotonic() + self.max_delay
+            while True:
+                if item is _STOP:
+                    self._write(batch)
+                    return
+                if isinstance(item, _FlushRequest):
+                    self._write(batch)
+                    batch = []
+                    item.done.set()
+                else:
+                    batch.append(item)
+                    if len(batch) >= self.max_batch_size:
+                        break
+
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+
+write_behind = WriteBehindQueue(
+    persist_turns,
+    max_batch_size=settings.PERSISTENCE_MAX_BATCH_SIZE,
+    max_delay=settings.PERSISTENCE_MAX_DELAY_SECONDS,
+    max_queue_size=settings.PERSISTENCE_QUEUE_SIZE,
+)
+atexit.register(write_behind.stop)
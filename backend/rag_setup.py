@@ -2,45 +2,287 @@
 
 from __future__ import annotations
 
+import heapq
 import json
+import math
+from collections import Counter, defaultdict
 from pathlib import Path
-from typing import Iterable, List, Sequence
-import unicodedata
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
 
+from backend.text import tokenize, tokenize_batch
 
-def _normalize(text: str) -> str:
-    folded = unicodedata.normalize("NFKD", text.casefold())
-    return "".join(ch for ch in folded if not unicodedata.combining(ch))
 
+# Fallback FAQ items (matches technical brief)
+DEFAULT_KNOWLEDGE_BASE = [
+    "İade politikası: 14 gün içinde iade hakkınız bulunmaktadır.",
+    "Kargo süresi: Ortalama teslimat 2-4 iş günüdür.",
+    "Ödeme seçenekleri: Kredi kartı, banka kartı veya kapıda ödeme.",
+    "Politikalarımız müşteri memnuniyeti odaklıdır.",
+]
 
-def load_knowledge_base(path: Path | str) -> List[str]:
-    """Load mini FAQ data from JSON; fallback to defaults when missing."""
+
+STREAMING_SUFFIXES = {".jsonl", ".ndjson"}
+SHARD_SUFFIXES = {".json", *STREAMING_SUFFIXES}
+
+
+def _entries_from_json(data: object) -> Iterator[Tuple[str, str]]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield str(key), f"{key}: {value}"
+    elif isinstance(data, list):
+        for item in data:
+            yield str(item), str(item)
+
+
+def _entry_from_record(record: object) -> Tuple[str, str] | None:
+    if isinstance(record, str):
+        return record, record
+    if isinstance(record, dict):
+        if "text" in record:
+            text = str(record["text"])
+            return str(record.get("key") or record.get("id") or text), text
+        if len(record) == 1:
+            key, value = next(iter(record.items()))
+            return str(key), f"{key}: {value}"
+    return None
+
+
+def _iter_jsonl(path: Path) -> Iterator[Tuple[str, str]]:
+    with path.open("r", encoding="utf-8") as handler:
+        for line in handler:
+            line = line.strip()
+            if not line:
+                continue
+            entry = _entry_from_record(json.loads(line))
+            if entry is not None:
+                yield entry
+
+
+def iter_knowledge_entries(path: Path | str) -> Iterator[Tuple[str, str]]:
+    """Stream ``(key, text)`` pairs from a JSON file, a JSONL file or a directory of shards.
+
+    JSONL lines may be plain strings, ``{"key": ..., "text": ...}`` records or
+    single-pair objects. Shard directories are read in file-name order.
+    """
     kb_path = Path(path)
+    if kb_path.is_dir():
+        for shard in sorted(kb_path.iterdir()):
+            if shard.is_file() and shard.suffix in SHARD_SUFFIXES:
+                yield from iter_knowledge_entries(shard)
+    elif kb_path.suffix in STREAMING_SUFFIXES:
+        yield from _iter_jsonl(kb_path)
+    else:
+        with kb_path.open("r", encoding="utf-8") as handler:
+            yield from _entries_from_json(json.load(handler))
+
+
+def load_knowledge_entries(path: Path | str) -> Dict[str, str]:
+    """Load FAQ entries keyed by a stable id; fallback to defaults when missing.
+
+    Object-shaped files are keyed by their keys, list-shaped files by the
+    entry text itself, so edits can be diffed entry by entry. JSONL files and
+    shard directories are accepted as well (see :func:`iter_knowledge_entries`).
+    """
+    kb_path = Path(path)
+    if kb_path.is_dir() or (kb_path.exists() and kb_path.suffix in STREAMING_SUFFIXES):
+        return dict(iter_knowledge_entries(kb_path))
     if kb_path.exists():
         with kb_path.open("r", encoding="utf-8") as handler:
             data = json.load(handler)
-        if isinstance(data, dict):
-            return [f"{key}: {value}" for key, value in data.items()]
-        if isinstance(data, list):
-            return [str(item) for item in data]
+        if isinstance(data, (dict, list)):
+            return dict(_entries_from_json(data))
+
+    return {item: item for item in DEFAULT_KNOWLEDGE_BASE}
+
+
+def load_knowledge_base(path: Path | str) -> List[str]:
+    """Load mini FAQ data from JSON; fallback to defaults when missing."""
+    return list(load_knowledge_entries(path).values())
+
+
+def bm25_idf(total_documents: int, document_frequency: int) -> float:
+    """Non-negative BM25 inverse document frequency."""
+    return math.log(1 + (total_documents - document_frequency + 0.5) / (document_frequency + 0.5))
 
-    # Fallback FAQ items (matches technical brief)
-    return [
-        "İade politikası: 14 gün içinde iade hakkınız bulunmaktadır.",
-        "Kargo süresi: Ortalama teslimat 2-4 iş günüdür.",
-        "Ödeme seçenekleri: Kredi kartı, banka kartı veya kapıda ödeme.",
-        "Politikalarımız müşteri memnuniyeti odaklıdır.",
-    ]
 
+class BM25Retriever(Sequence[str]):
+    """Okapi BM25 ranking over an inverted index built once at load time.
 
-def _score_document(query_tokens: Iterable[str], document: str) -> int:
-    tokens = _normalize(document).split()
-    return sum(1 for token in query_tokens if token in tokens)
+    The retriever is itself a read-only sequence of the indexed documents, so
+    it can be passed anywhere a knowledge base list is expected. Instances
+    are never mutated after construction; :meth:`with_changes` derives a new
+    snapshot that shares every untouched posting list with its parent.
+    """
+
+    def __init__(
+        self,
+        documents: Iterable[str],
+        keys: Iterable[str] | None = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        documents = list(documents)
+        keys = list(keys) if keys is not None else [str(index) for index in range(len(documents))]
+        if len(keys) != len(documents):
+            raise ValueError("keys and documents must have the same length")
+
+        # Slot-indexed storage; removed documents leave a ``None`` tombstone.
+        self._documents: List[str | None] = []
+        self._terms: List[Counter[str] | None] = []
+        self._lengths: List[int] = []
+        self._key_to_id: Dict[str, int] = {}
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._total_length = 0
+
+        for key, document, tokens in zip(keys, documents, tokenize_batch(documents)):
+            if key in self._key_to_id:
+                continue
+            doc_id = self._append(key, document, tokens)
+            for token, frequency in self._terms[doc_id].items():
+                self._postings[token].append((doc_id, frequency))
+        self._postings = dict(self._postings)
+        self._finalize()
+
+    def _append(self, key: str, document: str, tokens: List[str]) -> int:
+        doc_id = len(self._documents)
+        terms = Counter(tokens)
+        self._documents.append(document)
+        self._terms.append(terms)
+        self._lengths.append(sum(terms.values()))
+        self._key_to_id[key] = doc_id
+        self._total_length += self._lengths[doc_id]
+        return doc_id
+
+    def _finalize(self) -> None:
+        self._live = [doc for doc in self._documents if doc is not None]
+        # slot -> position in the live sequence (-1 for tombstones)
+        self._positions: List[int] = []
+        position = 0
+        for doc in self._documents:
+            self._positions.append(position if doc is not None else -1)
+            position += doc is not None
+        avg_length = self._total_length / len(self._live) if self._live else 0.0
+        self._length_norms = [
+            self.k1 * (1 - self.b + self.b * (length / avg_length if avg_length else 0.0))
+            for length in self._lengths
+        ]
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        return self._live[index]
+
+    def keys(self) -> List[str]:
+        return list(self._key_to_id)
+
+    def get(self, key: str) -> str | None:
+        doc_id = self._key_to_id.get(key)
+        return self._documents[doc_id] if doc_id is not None else None
+
+    def with_changes(
+        self, upserts: Dict[str, str], deletions: Iterable[str] = ()
+    ) -> "BM25Retriever":
+        """Return a new snapshot with ``upserts`` applied and ``deletions`` removed.
+
+        Only the changed documents are tokenized and only the posting lists of
+        their tokens are rebuilt; this snapshot stays valid for readers.
+        """
+        if self._tombstones() > len(self._live):
+            return self._compacted().with_changes(upserts, deletions)
+
+        clone = object.__new__(BM25Retriever)
+        clone.k1, clone.b = self.k1, self.b
+        clone._documents = list(self._documents)
+        clone._terms = list(self._terms)
+        clone._lengths = list(self._lengths)
+        clone._key_to_id = dict(self._key_to_id)
+        clone._postings = dict(self._postings)
+        clone._total_length = self._total_length
+
+        removed: Dict[int, Counter[str]] = {}
+        for key in {*deletions, *upserts}:
+            doc_id = clone._key_to_id.pop(key, None)
+            if doc_id is None:
+                continue
+            terms = clone._terms[doc_id]
+            removed[doc_id] = terms
+            clone._total_length -= clone._lengths[doc_id]
+            clone._documents[doc_id] = None
+            clone._terms[doc_id] = None
+            clone._lengths[doc_id] = 0
+
+        added: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for (key, document), tokens in zip(upserts.items(), tokenize_batch(upserts.values())):
+            doc_id = clone._append(key, document, tokens)
+            for token, frequency in clone._terms[doc_id].items():
+                added[token].append((doc_id, frequency))
+
+        touched = {token for terms in removed.values() for token in terms} | set(added)
+        for token in touched:
+            postings = [entry for entry in clone._postings.get(token, ()) if entry[0] not in removed]
+            postings.extend(added.get(token, ()))
+            if postings:
+                clone._postings[token] = postings
+            else:
+                clone._postings.pop(token, None)
+
+        clone._finalize()
+        return clone
+
+    def _tombstones(self) -> int:
+        return len(self._documents) - len(self._live)
+
+    def _compacted(self) -> "BM25Retriever":
+        keys = sorted(self._key_to_id, key=self._key_to_id.__getitem__)
+        return BM25Retriever(
+            [self._documents[self._key_to_id[key]] for key in keys], keys, self.k1, self.b
+        )
+
+    def _slot_scores(self, query: str) -> Dict[int, float]:
+        total = len(self._live)
+        scores: Dict[int, float] = defaultdict(float)
+        for token, query_frequency in Counter(tokenize(query)).items():
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            weight = bm25_idf(total, len(postings)) * query_frequency
+            for doc_id, frequency in postings:
+                scores[doc_id] += weight * frequency * (self.k1 + 1) / (
+                    frequency + self._length_norms[doc_id]
+                )
+        return scores
+
+    def score_ceiling(self, query: str) -> float:
+        """Upper bound of any document's score for ``query`` (unknown tokens included)."""
+        total = len(self._live)
+        return sum(
+            bm25_idf(total, len(self._postings.get(token, ()))) * query_frequency * (self.k1 + 1)
+            for token, query_frequency in Counter(tokenize(query)).items()
+        )
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """Return BM25 scores keyed by sequence position for documents sharing a query token."""
+        positions = self._positions
+        return {positions[slot]: score for slot, score in self._slot_scores(query).items()}
+
+    def search(self, query: str, k: int = 2) -> List[str]:
+        """Return up to ``k`` matching documents, best first."""
+        scores = self._slot_scores(query)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [self._documents[doc_id] for doc_id, _ in top]
 
 
 def mini_rag_search(query: str, knowledge_base: Sequence[str], k: int = 2) -> List[str]:
-    """Return the top-k FAQ entries that roughly match the query."""
-    normalized = _normalize(query).split()
-    ranked = [(_score_document(normalized, doc), doc) for doc in knowledge_base]
-    ranked.sort(key=lambda item: item[0], reverse=True)
-    return [doc for score, doc in ranked[:k] if score > 0]
+    """Return the top-k FAQ entries that roughly match the query.
+
+    Pass a :class:`BM25Retriever` (or any sequence with a ``search(query, k)``
+    method, such as ``KNOWLEDGE_BASE.retriever`` or the memory-mapped index)
+    to reuse an index across queries. A plain sequence is indexed on every
+    call, which always reflects its current contents but costs O(N).
+    """
+    if not hasattr(knowledge_base, "search"):
+        knowledge_base = BM25Retriever(knowledge_base)
+    return knowledge_base.search(query, k)
@@ -0,0 +1,203 @@
+"""Response cache placed in front of the LLM call.
+
+Keys combine the normalized user text, a fingerprint of the retrieved
+context (KB snippets, tool output) and a namespace such as the knowledge
+base fingerprint, so answers are invalidated automatically when the KB or
+tool data behind them changes. Storage is pluggable: an in-process LRU by
+default, a SQLite file shared by workers on one host, or anything that
+implements :class:`CacheBackend` (e.g. a Redis adapter).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Protocol
+
+from backend.cache import TTLCache
+from backend.text import tokenize
+
+
+class CacheBackend(Protocol):
+    #: ``True`` when calls do I/O and should stay off the event loop
+    blocking: bool
+
+    def get(self, key: str) -> Optional[str]: ...
+
+    def set(self, key: str, value: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int: ...
+
+
+class MemoryCacheBackend:
+    """Per-process LRU + TTL storage."""
+
+    blocking = False
+
+    def __init__(self, maxsize: int, ttl: Optional[float]) -> None:
+        self._cache: TTLCache[str, str] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self._cache.set(key, value)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class SQLiteCacheBackend:
+    """LRU + TTL storage in a SQLite file that several workers can share."""
+
+    blocking = True
+
+    def __init__(self, path: Path | str, maxsize: int, ttl: Optional[float]) -> None:
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+        self._writes_since_trim = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed_at)"
+        )
+        return connection
+
+    def reopen(self) -> None:
+        """Replace the connection; SQLite connections must not be used across ``fork``."""
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._connection.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                return None
+            self._connection.execute(
+                "UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            self._writes_since_trim += 1
+            # Trimming scans the table, so only do it every few writes.
+            if self._writes_since_trim >= max(1, self.maxsize // 10):
+                self._writes_since_trim = 0
+                self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        self._connection.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,))
+        self._connection.execute(
+            "DELETE FROM response_cache WHERE key IN ("
+            "SELECT key FROM response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM response_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+def normalize_query(text: str) -> str:
+    """Case/diacritic/punctuation-insensitive form of a user message."""
+    return " ".join(tokenize(text))
+
+
+def context_fingerprint(context: Mapping[str, Any]) -> str:
+    payload = json.dumps(
+        {key: context.get(key) for key in ("kb", "tool_name", "tool_result")},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Front door for cached LLM answers with hit/miss accounting."""
+
+    def __init__(self, backend: CacheBackend, max_value_chars: int = 8000) -> None:
+        self.backend = backend
+        self.max_value_chars = max_value_chars
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def key_for(query: str, context: Mapping[str, Any], namespace: str = "") -> str:
+        raw = "\x1f".join([namespace, normalize_query(query), context_fingerprint(context)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        if not value or len(value) > self.max_value_chars:
+            return
+        self.backend.set(key, value)
+        self.stores += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def build_response_cache(
+    backend: str, maxsize: int, ttl: Optional[float], path: Path | str, max_value_chars: int
+) -> ResponseCache:
+    if backend == "sqlite":
+        return ResponseCache(SQLiteCacheBackend(path, maxsize, ttl), max_value_chars)
+    return ResponseCache(MemoryCacheBackend(maxsize, ttl), max_value_chars)
@@ -0,0 +1,381 @@
+"""Retention and archival of stored transcripts (KVKK).
+
+Messages are grouped into monthly buckets on ``created_at``. On PostgreSQL
+each bucket is a real partition of ``messages`` (``messages_pYYYY_MM``)
+created ahead of time by :meth:`RetentionManager.prepare` (the catch-all
+``messages_default`` comes with the table, see ``backend/models.py``); an expired
+partition is detached and dropped in one step, whatever its size, and
+leaves no dead tuples to vacuum. SQLite has no partitions, so there a
+bucket is a ``created_at`` range removed with a single ``DELETE`` over
+``ix_messages_created_at``.
+
+Before a bucket goes, its rows are streamed (``yield_per``) into
+``<archive_dir>/<bucket>.jsonl.gz``, or ``.parquet`` when ``pyarrow`` is
+installed. Conversations left without messages are then deleted together
+with their LangGraph checkpoints and cached ids, and checkpoints of other
+threads taken before the cutoff are pruned.
+
+A bucket expires once all of it is older than the retention window, so a
+message outlives the window by at most one month. Other workers may keep a
+deleted session's conversation id cached for up to
+``CONVERSATION_CACHE_TTL_SECONDS``, which must stay well below the window.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import delete, exists, func, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from backend.memory import CachedCheckpointSaver
+from backend.models import DEFAULT_PARTITION, Conversation, Message
+from backend.persistence import conversation_ids
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "messages_p"
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})_(\d{{2}})$")
+# Arbitrary key for pg_try_advisory_lock so only one worker runs retention at a time
+_ADVISORY_LOCK_KEY = 0x7765626368
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """One calendar month of messages: ``[start, end)``."""
+
+    start: datetime
+
+    @property
+    def end(self) -> datetime:
+        return add_months(self.start, 1)
+
+    @property
+    def name(self) -> str:
+        return f"{PARTITION_PREFIX}{self.start:%Y_%m}"
+
+    @classmethod
+    def from_name(cls, name: str) -> Optional["Bucket"]:
+        match = _PARTITION_NAME.match(name)
+        if match is None:
+            return None
+        return cls(datetime(int(match.group(1)), int(match.group(2)), 1))
+
+
+# -- archive writers -----------------------------------------------------------
+
+_ARCHIVE_COLUMNS = (
+    Message.id,
+    Conversation.session_id,
+    Message.sender,
+    Message.content,
+    Message.metadata_json.label("metadata_json"),
+    Message.created_at,
+)
+
+
+def _write_jsonl_gz(path: Path, batches: Iterable[Sequence[Any]]) -> int:
+    written = 0
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        for batch in batches:
+            for row in batch:
+                handle.write(
+                    json.dumps(
+                        {
+                            "id": str(row.id),
+                            "session_id": row.session_id,
+                            "sender": row.sender,
+                            "content": row.content,
+                            "metadata": row.metadata_json or {},
+                            "created_at": row.created_at.isoformat(),
+                        },
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+            written += len(batch)
+    return written
+
+
+def _write_parquet(path: Path, batches: Iterable[Sequence[Any]]) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("id", pa.string()),
+            ("session_id", pa.string()),
+            ("sender", pa.string()),
+            ("content", pa.string()),
+            ("metadata", pa.string()),
+            ("created_at", pa.timestamp("us")),
+        ]
+    )
+    written = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_table(
+                pa.table(
+                    {
+                        "id": [str(row.id) for row in batch],
+                        "session_id": [row.session_id for row in batch],
+                        "sender": [row.sender for row in batch],
+                        "content": [row.content for row in batch],
+                        "metadata": [json.dumps(row.metadata_json or {}, ensure_ascii=False) for row in batch],
+                        "created_at": [row.created_at for row in batch],
+                    },
+                    schema=schema,
+                )
+            )
+            written += len(batch)
+    return written
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+ARCHIVE_WRITERS: Dict[str, Callable[[Path, Iterable[Sequence[Any]]], int]] = {
+    "jsonl.gz": _write_jsonl_gz,
+    "parquet": _write_parquet,
+}
+
+
+# -- manager -------------------------------------------------------------------
+
+
+class RetentionManager:
+    """Creates message partitions ahead of time and archives/drops expired buckets."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        retention_days: Optional[float] = None,
+        archive_dir: Optional[Path] = None,
+        archive_format: str = "jsonl.gz",
+        partitions_ahead: int = 2,
+        batch_size: int = 5_000,
+        checkpointer: Optional[CachedCheckpointSaver] = None,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        if archive_format == "parquet" and not _parquet_available():
+            logger.warning("⚠️ pyarrow kullanılamıyor, arşivler jsonl.gz olarak yazılacak")
+            archive_format = "jsonl.gz"
+        self.engine = engine
+        self.retention_days = retention_days
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.archive_format = archive_format
+        self.partitions_ahead = max(0, partitions_ahead)
+        self.batch_size = batch_size
+        self.checkpointer = checkpointer
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.archived_rows = 0
+        self.dropped_buckets = 0
+        self.deleted_conversations = 0
+        self.pruned_checkpoints = 0
+        self.last_run_at: Optional[datetime] = None
+
+    # -- partitions ----------------------------------------------------------
+
+    def _partitioned(self, connection: Connection) -> bool:
+        if connection.dialect.name != "postgresql":
+            return False
+        return bool(
+            connection.scalar(
+                text(
+                    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                    "WHERE partrelid = to_regclass('messages'))"
+                )
+            )
+        )
+
+    def _partitions(self, connection: Connection) -> List[Bucket]:
+        names = connection.scalars(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = to_regclass('messages')"
+            )
+        )
+        return [bucket for bucket in map(Bucket.from_name, names) if bucket is not None]
+
+    def prepare(self) -> None:
+        """Create this month's and the next ``partitions_ahead`` partitions (PostgreSQL only)."""
+        with self.engine.begin() as connection:
+            if not self._partitioned(connection):
+                return
+            current = month_start(self._clock())
+            for offset in range(self.partitions_ahead + 1):
+                bucket = Bucket(add_months(current, offset))
+                # Bounds are formatted from datetimes, never user input; DDL takes no bind parameters.
+                connection.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {bucket.name} PARTITION OF messages "
+                        f"FOR VALUES FROM ('{bucket.start.isoformat()}') TO ('{bucket.end.isoformat()}')"
+                    )
+                )
+            connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF messages DEFAULT"))
+
+    # -- expiry --------------------------------------------------------------
+
+    def expired_buckets(self, connection: Connection, cutoff: datetime) -> List[Bucket]:
+        """Buckets entirely older than ``cutoff``, oldest first."""
+        starts = set()
+        oldest = connection.scalar(select(func.min(Message.created_at)))
+        if oldest is not None:
+            start = month_start(oldest)
+            while add_months(start, 1) <= cutoff:
+                starts.add(start)
+                start = add_months(start, 1)
+        if self._partitioned(connection):
+            starts.update(bucket.start for bucket in self._partitions(connection) if bucket.end <= cutoff)
+        return [Bucket(start) for start in sorted(starts)]
+
+    def _archive(self, connection: Connection, bucket: Bucket) -> int:
+        if self.archive_dir is None:
+            return 0
+        statement = (
+            select(*_ARCHIVE_COLUMNS)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Message.created_at >= bucket.start, Message.created_at < bucket.end)
+            .order_by(Message.created_at)
+            .execution_options(yield_per=self.batch_size)
+        )
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{bucket.name}.{self.archive_format}"
+        partial = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        result = connection.execute(statement)
+        try:
+            written = ARCHIVE_WRITERS[self.archive_format](partial, result.partitions())
+            if written:
+                # Make sure the archive is on disk before the rows are gone.
+                with open(partial, "rb") as handle:
+                    os.fsync(handle.fileno())
+                os.replace(partial, path)
+        finally:
+            result.close()
+            partial.unlink(missing_ok=True)
+        return written
+
+    def _drop(self, connection: Connection, bucket: Bucket, partitions: Sequence[Bucket]) -> None:
+        if bucket in partitions:
+            connection.execute(text(f"ALTER TABLE messages DETACH PARTITION {bucket.name}"))
+            connection.execute(text(f"DROP TABLE {bucket.name}"))
+        # The only statement on SQLite; on PostgreSQL it just clears the default partition.
+        connection.execute(
+            delete(Message).where(Message.created_at >= bucket.start, Message.created_at < bucket.end)
+        )
+
+    def _delete_orphans(self, connection: Connection, cutoff: datetime) -> List[str]:
+        statement = (
+            delete(Conversation)
+            .where(
+                Conversation.created_at < cutoff,
+                ~exists().where(Message.conversation_id == Conversation.id),
+            )
+            .returning(Conversation.session_id)
+        )
+        return list(connection.scalars(statement))
+
+    def _forget_sessions(self, session_ids: Sequence[str]) -> None:
+        for session_id in session_ids:
+            conversation_ids.pop(session_id)
+        if self.checkpointer is not None:
+            self.checkpointer.delete_threads(session_ids)
+
+    def run_once(self) -> Dict[str, Any]:
+        """Create upcoming partitions, then archive and drop every expired bucket."""
+        summary: Dict[str, Any] = {
+            "buckets": [],
+            "archived_rows": 0,
+            "deleted_conversations": 0,
+            "pruned_checkpoints": 0,
+        }
+        if not self._lock.acquire(blocking=False):
+            return {**summary, "skipped": "running"}
+        try:
+            self.prepare()
+            if self.retention_days is None:
+                return summary
+            cutoff = self._clock() - timedelta(days=self.retention_days)
+            with self.engine.connect() as connection:
+                postgres = connection.dialect.name == "postgresql"
+                if postgres and not connection.scalar(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}
+                ):
+                    return {**summary, "skipped": "locked"}
+                try:
+                    partitions = self._partitions(connection) if self._partitioned(connection) else []
+                    for bucket in self.expired_buckets(connection, cutoff):
+                        archived = self._archive(connection, bucket)
+                        connection.commit()
+                        with connection.begin():
+                            self._drop(connection, bucket, partitions)
+                        summary["buckets"].append(bucket.name)
+                        summary["archived_rows"] += archived
+                        logger.info("🗄️ Süresi dolan mesajlar silindi: %s (%d satır arşivlendi)", bucket.name, archived)
+                    connection.commit()
+                    with connection.begin():
+                        session_ids = self._delete_orphans(connection, cutoff)
+                finally:
+                    if postgres:
+                        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+                        connection.commit()
+            self._forget_sessions(session_ids)
+            summary["deleted_conversations"] = len(session_ids)
+            if self.checkpointer is not None:
+                summary["pruned_checkpoints"] = self.checkpointer.prune(cutoff)
+            self.archived_rows += summary["archived_rows"]
+            self.dropped_buckets += len(summary["buckets"])
+            self.deleted_conversations += len(session_ids)
+            self.pruned_checkpoints += summary["pruned_checkpoints"]
+            return summary
+        finally:
+            self.runs += 1
+            self.last_run_at = self._clock()
+            self._lock.release()
+
+    async def run_periodically(self, interval: float) -> None:
+        """Run :meth:`run_once` now and then every ``interval`` seconds in a worker thread."""
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception:  # pragma: no cover - defensive
+                logger.exception("Saklama süresi işi başarısız")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retention_days": self.retention_days,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "dropped_buckets": self.dropped_buckets,
+            "archived_rows": self.archived_rows,
+            "deleted_conversations": self.deleted_conversations,
+            "pruned_checkpoints": self.pruned_checkpoints,
+        }
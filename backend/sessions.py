@@ -0,0 +1,106 @@
+"""Per-session turn ordering and idempotent retries.
+
+The widget can reach the agent over the WebSocket and the HTTP fallback at
+the same time, and a reconnecting widget resends its last message. The
+:class:`SessionCoordinator` serializes turns of one session behind an
+``asyncio.Lock`` (other sessions keep running in parallel) and remembers the
+result of every client message id for a short window, so a retry attaches
+to the in-flight or finished turn instead of calling the agent again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from backend.cache import TTLCache
+
+T = TypeVar("T")
+
+
+class _SessionSlot:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class SessionCoordinator:
+    """Serialize turns per session and coalesce retries by client message id."""
+
+    def __init__(self, dedup_window: float = 300.0, dedup_size: int = 10_000) -> None:
+        self._slots: Dict[str, _SessionSlot] = {}
+        self._turns: TTLCache[Tuple[str, str], asyncio.Future] = TTLCache(
+            maxsize=dedup_size, ttl=dedup_window
+        )
+        self.coalesced = 0
+        self.waited = 0
+
+    @asynccontextmanager
+    async def session(self, session_id: str) -> AsyncIterator[None]:
+        """Hold the session's lock; slots are dropped once nobody uses them."""
+        slot = self._slots.get(session_id)
+        if slot is None:
+            slot = self._slots[session_id] = _SessionSlot()
+        if slot.lock.locked():
+            self.waited += 1
+        slot.users += 1
+        try:
+            async with slot.lock:
+                yield
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                self._slots.pop(session_id, None)
+
+    async def run(
+        self,
+        session_id: str,
+        message_id: Optional[str],
+        turn: Callable[[], Awaitable[T]],
+    ) -> Tuple[T, bool]:
+        """Run ``turn`` under the session lock; returns ``(result, coalesced)``.
+
+        A ``message_id`` seen within the dedup window returns the earlier
+        turn's result (waiting for it if still running). Failed or cancelled
+        turns are forgotten so the client can retry them.
+        """
+        if not message_id:
+            async with self.session(session_id):
+                return await turn(), False
+
+        key = (session_id, message_id)
+        existing = self._turns.get(key)
+        if existing is not None:
+            self.coalesced += 1
+            if existing.done():
+                return existing.result(), True
+            return await asyncio.shield(existing), True
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._turns.set(key, future)
+        try:
+            async with self.session(session_id):
+                result = await turn()
+        except BaseException as exc:
+            self._turns.pop(key)
+            if isinstance(exc, Exception):
+                future.set_exception(exc)
+                # Mark as retrieved when no retry is waiting on it.
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        future.set_result(result)
+        return result, False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_sessions": len(self._slots),
+            "waiting_turns": sum(max(slot.users - 1, 0) for slot in self._slots.values()),
+            "serialized_waits": self.waited,
+            "coalesced_retries": self.coalesced,
+            "tracked_message_ids": len(self._turns),
+        }
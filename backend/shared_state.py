@@ -0,0 +1,124 @@
+"""State shared between worker processes.
+
+Each worker periodically publishes small JSON documents (its metrics
+export, for instance) under ``(namespace, worker_id)``; any worker can
+collect every live worker's document and aggregate them. Entries that have
+not been refreshed within ``ttl`` seconds belong to dead workers and are
+ignored.
+
+Storage is pluggable like the response cache: an in-process dict for a
+single worker, a SQLite file for workers on one host (point
+``SHARED_STATE_PATH`` at ``/dev/shm`` to keep it in memory), or anything
+implementing :class:`SharedStateBackend` (e.g. a Redis hash per namespace
+with per-field expiry).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Protocol
+
+
+def worker_id() -> str:
+    """Stable id of the current process; changes after ``fork``."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SharedStateBackend(Protocol):
+    #: ``True`` when calls do I/O and should stay off the event loop
+    blocking: bool
+
+    def publish(self, namespace: str, worker: str, payload: Dict[str, Any]) -> None: ...
+
+    def collect(self, namespace: str, ttl: Optional[float] = None) -> Dict[str, Dict[str, Any]]: ...
+
+    def remove(self, namespace: str, worker: str) -> None: ...
+
+
+class MemorySharedState:
+    """Single-process storage; ``collect`` only ever sees this worker."""
+
+    blocking = False
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Dict[str, tuple]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, namespace: str, worker: str, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.setdefault(namespace, {})[worker] = (time.time(), payload)
+
+    def collect(self, namespace: str, ttl: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entries = dict(self._entries.get(namespace, {}))
+        return {
+            worker: payload
+            for worker, (updated_at, payload) in entries.items()
+            if ttl is None or now - updated_at <= ttl
+        }
+
+    def remove(self, namespace: str, worker: str) -> None:
+        with self._lock:
+            self._entries.get(namespace, {}).pop(worker, None)
+
+
+class SQLiteSharedState:
+    """Storage in a SQLite file shared by the workers of one host."""
+
+    blocking = True
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross fork(); reopen in every new process.
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state ("
+                "namespace TEXT NOT NULL, worker TEXT NOT NULL, payload TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (namespace, worker))"
+            )
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def publish(self, namespace: str, worker: str, payload: Dict[str, Any]) -> None:
+        document = json.dumps(payload, ensure_ascii=False)
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO shared_state (namespace, worker, payload, updated_at) VALUES (?, ?, ?, ?)",
+                (namespace, worker, document, time.time()),
+            )
+
+    def collect(self, namespace: str, ttl: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        oldest = time.time() - ttl if ttl is not None else 0.0
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT worker, payload FROM shared_state WHERE namespace = ? AND updated_at >= ?",
+                (namespace, oldest),
+            ).fetchall()
+        return {worker: json.loads(payload) for worker, payload in rows}
+
+    def remove(self, namespace: str, worker: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                "DELETE FROM shared_state WHERE namespace = ? AND worker = ?", (namespace, worker)
+            )
+
+
+def build_shared_state(backend: str, path: Path | str) -> SharedStateBackend:
+    if backend == "sqlite":
+        return SQLiteSharedState(path)
+    return MemorySharedState()
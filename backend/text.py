@@ -0,0 +1,77 @@
+"""Shared text normalization and tokenization.
+
+Every lookup in the backend (intent keywords, BM25 and vector indexes, the
+response cache, tool arguments) compares text in the same folded form:
+casefolded with diacritics removed, Turkish letters mapped to their ASCII
+base ("ŞİŞLİ" -> "sisli", "kapıda" -> "kapida"). Folding avoids Python-level
+per-character work on the common paths:
+
+1. pure ASCII text only needs ``str.lower``;
+2. Turkish/Latin text is casefolded, NFKD-decomposed and its combining
+   marks dropped with a single ASCII encode;
+3. a per-character filter runs only for other scripts and symbols.
+
+Short strings such as tool arguments and city names are memoized.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List
+
+# Anything outside ASCII and the Latin combining marks block.
+_NON_LATIN = re.compile("[^\x00-\x7f\u0300-\u036f]")
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Separator for batch folding; folding never creates or removes it.
+_BATCH_SEPARATOR = "\x00"
+
+CACHED_MAX_LENGTH = 64
+CACHE_SIZE = 8192
+# Bump whenever folding or tokenization output changes; prebuilt indexes
+# record it and are rejected when it no longer matches (backend/kb_index.py).
+NORMALIZATION_VERSION = 2
+
+
+def _fold(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    # "ı" is the only Turkish letter without a decomposition; "İ", "ş", "ğ",
+    # "ç", "ö", "ü" and circumflexes split into an ASCII base plus a mark.
+    folded = unicodedata.normalize("NFKD", text.casefold().replace("ı", "i"))
+    if _NON_LATIN.search(folded) is None:
+        return folded.encode("ascii", "ignore").decode("ascii")
+    return "".join(char for char in folded if not unicodedata.combining(char))
+
+
+_fold_cached = lru_cache(maxsize=CACHE_SIZE)(_fold)
+
+
+def normalize(text: str) -> str:
+    """Casefold ``text`` and strip diacritics; short strings are memoized."""
+    if len(text) <= CACHED_MAX_LENGTH:
+        return _fold_cached(text)
+    return _fold(text)
+
+
+def tokenize(text: str) -> List[str]:
+    """Word tokens of the normalized ``text``."""
+    return _TOKEN_PATTERN.findall(normalize(text))
+
+
+def normalize_batch(texts: Iterable[str]) -> List[str]:
+    """Normalize many texts with one pass of each folding step (for index building)."""
+    texts = list(texts)
+    if not texts:
+        return []
+    joined = _BATCH_SEPARATOR.join(texts)
+    if joined.count(_BATCH_SEPARATOR) != len(texts) - 1:
+        return [_fold(text) for text in texts]
+    return _fold(joined).split(_BATCH_SEPARATOR)
+
+
+def tokenize_batch(texts: Iterable[str]) -> List[List[str]]:
+    """Word tokens for each of ``texts``."""
+    findall = _TOKEN_PATTERN.findall
+    return [findall(text) for text in normalize_batch(texts)]
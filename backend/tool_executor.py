@@ -0,0 +1,341 @@
+"""Async execution layer for the agent's tools.
+
+Tools in ``TOOL_REGISTRY`` front order and shipping services whose latency
+ranges from ~100 ms to seconds. :class:`ToolExecutor` runs them as async
+callables and fans out several calls of one turn in parallel. Each tool has
+its own timeout, a circuit breaker that fails fast while the service keeps
+erroring, and a TTL cache sized to how quickly its answer goes stale
+(policy text for hours, order status for seconds). Failures never raise
+into the graph: the caller gets a :class:`ToolResult` with a Turkish
+fallback message and ``ok=False``. Arguments are validated against the
+tool's schema first; a malformed call from the model is reported as
+``invalid_arguments`` and never counts against the service's breaker.
+
+``TOOL_BACKEND=mock`` wraps every registered tool with
+:class:`MockToolService`, which adds configurable latency and failures so
+the layer can be load-tested.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from langchain_core.tools import BaseTool
+
+from backend.cache import TTLCache
+from backend.text import normalize
+from backend.tools import TOOL_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TOOL_UNAVAILABLE_MESSAGE = "Şu anda bu bilgiye ulaşamıyorum, lütfen biraz sonra tekrar deneyin."
+
+
+@dataclass
+class ToolSpec:
+    """A registered tool and its execution policy."""
+
+    name: str
+    func: Callable[..., Any]
+    timeout: float = 2.5
+    cache_ttl: Optional[float] = None
+    # Sync callables that do I/O run on a worker thread; fast ones run inline.
+    blocking: bool = False
+    # Pydantic model for the arguments (``BaseTool.args_schema``); without one
+    # the arguments are only checked against the function signature.
+    args_schema: Optional[type] = None
+
+    def validate(self, args: Mapping[str, Any]) -> Dict[str, Any]:
+        """Coerced arguments; raises ``TypeError``/``ValueError`` for a malformed call."""
+        if self.args_schema is not None:
+            parse = getattr(self.args_schema, "model_validate", None) or self.args_schema.parse_obj
+            model = parse(dict(args))
+            args = model.model_dump() if hasattr(model, "model_dump") else model.dict()
+        inspect.signature(self.func).bind(**args)
+        return dict(args)
+
+
+@dataclass
+class ToolCall:
+    name: str
+    args: Dict[str, Any]
+    id: Optional[str] = None
+
+
+@dataclass
+class ToolResult:
+    name: str
+    args: Dict[str, Any]
+    content: str
+    ok: bool = True
+    error: Optional[str] = None
+    cached: bool = False
+    duration: float = 0.0
+    id: Optional[str] = None
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; one probe is let through after ``reset_timeout``."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and self._clock() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._probing = False
+
+
+@dataclass
+class _ToolState:
+    spec: ToolSpec
+    breaker: CircuitBreaker
+    cache: Optional[TTLCache[str, str]]
+    calls: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    invalid: int = 0
+    latency: float = field(default=0.0)
+
+
+def _cache_key(args: Mapping[str, Any]) -> str:
+    return json.dumps(
+        {key: normalize(value) if isinstance(value, str) else value for key, value in args.items()},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+
+
+class ToolExecutor:
+    """Runs tool calls concurrently with per-tool timeouts, breakers and caches."""
+
+    def __init__(
+        self,
+        specs: Sequence[ToolSpec],
+        cache_size: int = 1_024,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._tools: Dict[str, _ToolState] = {
+            spec.name: _ToolState(
+                spec=spec,
+                breaker=CircuitBreaker(failure_threshold, reset_timeout, clock),
+                cache=TTLCache(maxsize=cache_size, ttl=spec.cache_ttl, clock=clock) if spec.cache_ttl else None,
+            )
+            for spec in specs
+        }
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._tools
+
+    async def _invoke(self, spec: ToolSpec, args: Dict[str, Any]) -> str:
+        if inspect.iscoroutinefunction(spec.func):
+            result = await asyncio.wait_for(spec.func(**args), spec.timeout)
+        elif spec.blocking:
+            result = await asyncio.wait_for(asyncio.to_thread(spec.func, **args), spec.timeout)
+        else:
+            result = spec.func(**args)
+        return str(result)
+
+    async def execute(self, call: ToolCall) -> ToolResult:
+        tool = self._tools.get(call.name)
+        if tool is None:
+            return ToolResult(call.name, call.args, TOOL_UNAVAILABLE_MESSAGE, ok=False, error="unknown_tool", id=call.id)
+
+        try:
+            args = tool.spec.validate(call.args)
+        except (TypeError, ValueError) as exc:
+            # The model's mistake, not the service's: leave the breaker alone.
+            tool.invalid += 1
+            logger.warning("⚠️ Geçersiz araç argümanları (%s): %s", call.name, exc)
+            return ToolResult(
+                call.name, call.args, TOOL_UNAVAILABLE_MESSAGE, ok=False, error="invalid_arguments", id=call.id
+            )
+
+        key = _cache_key(args) if tool.cache is not None else None
+        if key is not None:
+            cached = tool.cache.get(key)
+            if cached is not None:
+                return ToolResult(call.name, call.args, cached, cached=True, id=call.id)
+
+        if not tool.breaker.allow():
+            return ToolResult(call.name, call.args, TOOL_UNAVAILABLE_MESSAGE, ok=False, error="circuit_open", id=call.id)
+
+        tool.calls += 1
+        started = time.perf_counter()
+        try:
+            content = await self._invoke(tool.spec, args)
+        except asyncio.TimeoutError:
+            error = "timeout"
+            tool.timeouts += 1
+        except Exception as exc:
+            error = type(exc).__name__
+            logger.warning("⚠️ Araç çağrısı başarısız (%s): %s", call.name, exc)
+        else:
+            duration = time.perf_counter() - started
+            tool.latency += duration
+            tool.breaker.record_success()
+            if key is not None:
+                tool.cache.set(key, content)
+            return ToolResult(call.name, call.args, content, duration=duration, id=call.id)
+
+        tool.failures += 1
+        tool.breaker.record_failure()
+        return ToolResult(
+            call.name,
+            call.args,
+            TOOL_UNAVAILABLE_MESSAGE,
+            ok=False,
+            error=error,
+            duration=time.perf_counter() - started,
+            id=call.id,
+        )
+
+    async def execute_many(self, calls: Sequence[ToolCall]) -> List[ToolResult]:
+        """Run all calls concurrently; results keep the order of ``calls``."""
+        if len(calls) == 1:
+            return [await self.execute(calls[0])]
+        return list(await asyncio.gather(*(self.execute(call) for call in calls)))
+
+    def run(self, call: ToolCall) -> ToolResult:
+        """Blocking variant for sync graph nodes (called without a running loop)."""
+        return asyncio.run(self.execute(call))
+
+    def run_many(self, calls: Sequence[ToolCall]) -> List[ToolResult]:
+        return asyncio.run(self.execute_many(calls))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "calls": tool.calls,
+                "failures": tool.failures,
+                "timeouts": tool.timeouts,
+                "invalid_arguments": tool.invalid,
+                "circuit": tool.breaker.state,
+                "rejected": tool.breaker.rejected,
+                "mean_latency_ms": round(tool.latency * 1000 / (tool.calls - tool.failures), 2)
+                if tool.calls > tool.failures
+                else 0.0,
+                "cache": tool.cache.stats() if tool.cache is not None else None,
+            }
+            for name, tool in self._tools.items()
+        }
+
+
+class MockToolService:
+    """Stand-in for the remote services behind the tools, with latency and failures."""
+
+    def __init__(
+        self,
+        min_latency: float = 0.1,
+        max_latency: float = 2.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    async def _respond(self, func: Callable[..., str], **kwargs: Any) -> str:
+        await asyncio.sleep(self._rng.uniform(self.min_latency, self.max_latency))
+        if self._rng.random() < self.failure_rate:
+            raise ConnectionError("mock servis hatası")
+        result = func(**kwargs)
+        return await result if inspect.isawaitable(result) else result
+
+    def wrap(self, func: Callable[..., str]) -> Callable[..., Any]:
+        """Async version of ``func`` served through the mock service (same signature)."""
+
+        @functools.wraps(func)
+        async def call(**kwargs: Any) -> str:
+            return await self._respond(func, **kwargs)
+
+        return call
+
+
+def build_tool_executor(
+    backend: str = "local",
+    tools: Optional[Sequence[BaseTool]] = None,
+    timeout: float = 2.5,
+    cache_ttls: Optional[Mapping[str, float]] = None,
+    cache_size: int = 1_024,
+    failure_threshold: int = 5,
+    reset_timeout: float = 30.0,
+    mock_service: Optional[MockToolService] = None,
+) -> ToolExecutor:
+    """Register ``tools`` (default :data:`TOOL_REGISTRY`, the set bound to the LLM).
+
+    Every tool the model is offered is executable, with its own argument
+    schema; the mock backend wraps the same functions.
+    """
+    service = (mock_service or MockToolService()) if backend == "mock" else None
+    cache_ttls = cache_ttls or {}
+    specs = []
+    for tool in TOOL_REGISTRY if tools is None else tools:
+        func = tool.coroutine or tool.func
+        if service is not None:
+            func = service.wrap(func)
+        specs.append(
+            ToolSpec(
+                name=tool.name,
+                func=func,
+                timeout=timeout,
+                cache_ttl=cache_ttls.get(tool.name),
+                args_schema=tool.args_schema,
+            )
+        )
+    return ToolExecutor(
+        specs,
+        cache_size=cache_size,
+        failure_threshold=failure_threshold,
+        reset_timeout=reset_timeout,
+    )
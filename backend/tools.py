@@ -2,13 +2,9 @@
 
 from __future__ import annotations
 
-import unicodedata
 from langchain_core.tools import StructuredTool
 
-
-def _normalize_token(value: str) -> str:
-    folded = unicodedata.normalize("NFKD", value.casefold())
-    return "".join(ch for ch in folded if not unicodedata.combining(ch))
+from backend.text import normalize
 
 ORDER_STATUS = {
     "12345": "Siparişiniz kargoya verildi.",
@@ -35,7 +31,7 @@ RAW_POLICY_TEXTS = {
     "kargo": "Kargo politikası: 2-4 iş günü içinde teslimat yapılır.",
     "ödeme": "Ödeme politikası: Kredi kartı, banka kartı veya kapıda ödeme kabul edilir.",
 }
-POLICY_TEXTS = {_normalize_token(key): text for key, text in RAW_POLICY_TEXTS.items()}
+POLICY_TEXTS = {normalize(key): text for key, text in RAW_POLICY_TEXTS.items()}
 
 
 def check_order_status(order_id: str) -> str:
@@ -46,7 +42,7 @@ def check_order_status(order_id: str) -> str:
 
 def calculate_shipping(city: str) -> str:
     """Return a mock shipping price."""
-    key = _normalize_token(city)
+    key = normalize(city)
     price = SHIPPING_PRICES.get(key, 40)
     display = CITY_DISPLAY.get(key, city.title())
     return f"{display} için tahmini kargo ücreti: {price} TL"
@@ -54,7 +50,7 @@ def calculate_shipping(city: str) -> str:
 
 def policy_lookup(topic: str) -> str:
     """Return a short FAQ/policy snippet."""
-    normalized = _normalize_token(topic)
+    normalized = normalize(topic)
     return POLICY_TEXTS.get(normalized, "Bu konu hakkında kayıtlı politikamız bulunamadı.")
 
 
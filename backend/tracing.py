@@ -0,0 +1,297 @@
+"""Per-turn tracing of the agent graph.
+
+Every turn gets a trace id (returned in the response metadata). A sampled
+share of turns also records spans for the turn itself, each graph node, LLM
+calls and persistence: monotonic timings, attributes, and exceptions as
+span events. A smaller share additionally runs sync node bodies under
+``cProfile`` and ``tracemalloc``; one profiled span runs at a time because
+both tools are thread/process global.
+
+Finished traces are kept in a ring buffer for ``/api/admin/traces`` and can
+be appended to a JSON-lines file. Both use the OTLP/JSON span layout
+(``resourceSpans`` → ``scopeSpans`` → ``spans``), so they can be replayed into
+an OpenTelemetry collector.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOP_FUNCTIONS = 15
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """One timed operation; timestamps are derived from the trace's monotonic clock."""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "events", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = trace.now_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+        self.events.append(
+            {
+                "name": "exception",
+                "timeUnixNano": str(self.trace.now_ns()),
+                "attributes": [
+                    _attribute("exception.type", type(exc).__name__),
+                    _attribute("exception.message", str(exc)),
+                    _attribute("exception.stacktrace", "".join(traceback.format_exception(exc))),
+                ],
+            }
+        )
+
+    def end(self) -> None:
+        self.end_ns = self.trace.now_ns()
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "events": self.events,
+            "status": (
+                {"code": "STATUS_CODE_ERROR", "message": self.error}
+                if self.error
+                else {"code": "STATUS_CODE_OK"}
+            ),
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Stands in for spans of unsampled turns so call sites need no checks."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    __slots__ = ("trace_id", "sampled", "profiled", "spans", "_epoch_ns", "_perf_ns")
+
+    def __init__(self, sampled: bool, profiled: bool) -> None:
+        self.trace_id = os.urandom(16).hex()
+        self.sampled = sampled
+        self.profiled = profiled
+        self.spans: List[Span] = []
+        self._epoch_ns = time.time_ns()
+        self._perf_ns = time.perf_counter_ns()
+
+    def now_ns(self) -> int:
+        return self._epoch_ns + time.perf_counter_ns() - self._perf_ns
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("webchat_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("webchat_span", default=None)
+
+
+def _reset(var: ContextVar, token: Any) -> None:
+    try:
+        var.reset(token)
+    except ValueError:
+        # Async generators may be finalized from another context.
+        pass
+
+
+class Tracer:
+    """Samples turns, collects their spans and exports finished traces."""
+
+    def __init__(
+        self,
+        service_name: str = "webchat-ai",
+        sample_rate: float = 1.0,
+        profile_rate: float = 0.0,
+        buffer_size: int = 200,
+        export_path: Optional[Path] = None,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.profile_rate = profile_rate
+        self.export_path = export_path
+        self._rng = rng
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._profile_lock = threading.Lock()
+        self._exporter: Optional[ThreadPoolExecutor] = None
+        self._export_lock = threading.Lock()
+        self.traces = 0
+        self.sampled = 0
+        self.profiled = 0
+
+    # -- recording -----------------------------------------------------------
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Open a turn; yields its root span (a no-op span when not sampled)."""
+        sampled = self._rng() < self.sample_rate
+        trace = Trace(sampled, sampled and self._rng() < self.profile_rate)
+        self.traces += 1
+        trace_token = _current_trace.set(trace)
+        if not sampled:
+            try:
+                yield NOOP_SPAN
+            finally:
+                _reset(_current_trace, trace_token)
+            return
+
+        self.sampled += 1
+        root = Span(trace, name, None, dict(attributes))
+        span_token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as exc:
+            root.record_exception(exc)
+            raise
+        finally:
+            root.end()
+            _reset(_current_span, span_token)
+            _reset(_current_trace, trace_token)
+            trace.spans.append(root)
+            self._finish(trace)
+
+    @contextmanager
+    def span(self, name: str, profile: bool = False, **attributes: Any) -> Iterator[Any]:
+        """Child span of the current one; ``profile`` enables sampled cProfile/tracemalloc."""
+        trace = _current_trace.get()
+        if trace is None or not trace.sampled:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        span = Span(trace, name, parent.span_id if parent else None, dict(attributes))
+        token = _current_span.set(span)
+        profiling = profile and trace.profiled and self._profile_lock.acquire(blocking=False)
+        profiler: Optional[cProfile.Profile] = None
+        started_tracemalloc = False
+        if profiling:
+            self.profiled += 1
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            if profiling:
+                profiler.disable()
+                _, peak = tracemalloc.get_traced_memory()
+                if started_tracemalloc:
+                    tracemalloc.stop()
+                self._profile_lock.release()
+                span.set_attribute("memory.peak_bytes", peak)
+                span.set_attribute("profile.cumulative", _profile_report(profiler))
+            span.end()
+            _reset(_current_span, token)
+            trace.spans.append(span)
+
+    def current_trace_id(self) -> Optional[str]:
+        trace = _current_trace.get()
+        return trace.trace_id if trace is not None else None
+
+    # -- export --------------------------------------------------------------
+
+    def _resource_spans(self, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }
+
+    def _finish(self, trace: Trace) -> None:
+        spans = sorted((span.to_otlp() for span in trace.spans), key=lambda span: int(span["startTimeUnixNano"]))
+        resource_spans = self._resource_spans(spans)
+        self._buffer.append(resource_spans)
+        if self.export_path is not None:
+            if self._exporter is None:
+                self._exporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-export")
+            self._exporter.submit(self._write, resource_spans)
+
+    def _write(self, resource_spans: Dict[str, Any]) -> None:
+        line = json.dumps({"resourceSpans": [resource_spans]}, ensure_ascii=False)
+        try:
+            with self._export_lock, open(self.export_path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+        except OSError:
+            logger.exception("❌ Trace dosyasına yazılamadı: %s", self.export_path)
+
+    def dump(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Buffered traces, newest last, as one OTLP/JSON document."""
+        traces = list(self._buffer)
+        if limit is not None:
+            traces = traces[-limit:] if limit else []
+        return {"resourceSpans": traces}
+
+    def flush(self) -> None:
+        if self._exporter is not None:
+            self._exporter.shutdown(wait=True)
+            self._exporter = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "traces": self.traces,
+            "sampled": self.sampled,
+            "profiled_spans": self.profiled,
+            "buffered": len(self._buffer),
+        }
+
+
+def _profile_report(profiler: cProfile.Profile) -> str:
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return stream.getvalue().strip()
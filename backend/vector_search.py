@@ -0,0 +1,217 @@
+"""Offline dense-vector retrieval for the knowledge base.
+
+Documents are embedded into one contiguous float32 matrix; a query costs a
+single matrix-vector product (or one matrix-matrix product for a batch) and
+``argpartition`` picks the top-k. The default :class:`HashingEmbedder` hashes
+character n-grams, so Turkish inflections such as "iadem"/"iadesi" land near
+"iade" without downloading a model.
+"""
+
+from __future__ import annotations
+
+import math
+import zlib
+from typing import Dict, List, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from backend.text import tokenize_batch
+
+
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return an L2-normalized ``(len(texts), dim)`` float32 matrix."""
+
+
+class HashingEmbedder:
+    """Signed feature hashing of character n-grams with sublinear TF-IDF token weights.
+
+    Call :meth:`fit` once with the corpus to learn token IDF weights; tokens
+    never seen during fitting (typically inflected query words) get the
+    maximum weight. Unfitted embedders weight every token equally.
+    """
+
+    def __init__(self, dim: int = 256, min_n: int = 3, max_n: int = 5, cache_size: int = 50_000) -> None:
+        self.dim = dim
+        self.min_n = min_n
+        self.max_n = max_n
+        self._cache_size = cache_size
+        self._token_cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._idf: Dict[str, float] = {}
+        self._default_idf = 1.0
+
+    @property
+    def fitted(self) -> bool:
+        return bool(self._idf)
+
+    def fit(self, documents: Sequence[str]) -> "HashingEmbedder":
+        frequencies: Dict[str, int] = {}
+        for tokens in tokenize_batch(documents):
+            for token in set(tokens):
+                frequencies[token] = frequencies.get(token, 0) + 1
+        total = len(documents)
+        self._idf = {token: math.log((1 + total) / (1 + count)) + 1 for token, count in frequencies.items()}
+        self._default_idf = math.log(1 + total) + 1
+        return self
+
+    def _token_features(self, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        padded = f"<{token}>"
+        grams = [padded]
+        for size in range(self.min_n, self.max_n + 1):
+            grams.extend(padded[start : start + size] for start in range(len(padded) - size + 1))
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams)
+        )
+        features = (
+            (hashes % self.dim).astype(np.intp),
+            np.where(hashes & (1 << 31), -1.0, 1.0) / np.sqrt(len(grams)),
+        )
+        if len(self._token_cache) < self._cache_size:
+            self._token_cache[token] = features
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, tokens in enumerate(tokenize_batch(texts)):
+            if not tokens:
+                continue
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            indices, values = [], []
+            for token, count in counts.items():
+                token_indices, token_values = self._token_features(token)
+                indices.append(token_indices)
+                weight = (1.0 + math.log(count)) * self._idf.get(token, self._default_idf)
+                values.append(token_values * weight)
+            matrix[row] = np.bincount(
+                np.concatenate(indices), weights=np.concatenate(values), minlength=self.dim
+            )
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest scores, best first, via ``argpartition``."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class VectorIndex(Sequence[str]):
+    """Cosine-similarity search over a contiguous float32 document matrix."""
+
+    def __init__(
+        self, documents: Sequence[str], embedder: Embedder, vectors: np.ndarray | None = None
+    ) -> None:
+        self._documents = list(documents)
+        self.embedder = embedder
+        if vectors is None:
+            if isinstance(embedder, HashingEmbedder) and not embedder.fitted:
+                embedder.fit(self._documents)
+            vectors = embedder.embed(self._documents)
+        self.matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        return self._documents[index]
+
+    def with_documents(self, documents: Sequence[str]) -> "VectorIndex":
+        """New index over ``documents`` that only embeds texts this index lacks.
+
+        Embedder weights are not refitted, so existing rows stay comparable.
+        """
+        documents = list(documents)
+        rows = {text: row for row, text in enumerate(self._documents)}
+        missing = [text for text in documents if text not in rows]
+        fresh = self.embedder.embed(missing) if missing else None
+        fresh_rows = {text: row for row, text in enumerate(missing)}
+
+        vectors = np.empty((len(documents), self.embedder.dim), dtype=np.float32)
+        for row, text in enumerate(documents):
+            if text in rows:
+                vectors[row] = self.matrix[rows[text]]
+            else:
+                vectors[row] = fresh[fresh_rows[text]]
+        return VectorIndex(documents, self.embedder, vectors)
+
+    def similarities(self, query: str) -> np.ndarray:
+        return self.matrix @ self.embedder.embed([query])[0]
+
+    def search(self, query: str, k: int = 2, min_score: float = 0.0) -> List[str]:
+        scores = self.similarities(query)
+        return [self._documents[i] for i in top_k_indices(scores, k) if scores[i] > min_score]
+
+    def search_batch(self, queries: Sequence[str], k: int = 2, min_score: float = 0.0) -> List[List[str]]:
+        """Answer many queries with one matrix-matrix product."""
+        scores = self.embedder.embed(queries) @ self.matrix.T
+        return [
+            [self._documents[i] for i in top_k_indices(row, k) if row[i] > min_score]
+            for row in scores
+        ]
+
+
+class HybridRetriever(Sequence[str]):
+    """Blend lexical scores with vector similarities.
+
+    Lexical scores are divided by the query's score ceiling rather than the
+    best hit, so a match on one common word cannot outrank a strong vector
+    match. ``lexical_weight=0`` gives pure vector search. Documents qualify when
+    they clear ``min_vector_score`` or, with a lexical weight, share a token.
+    """
+
+    def __init__(
+        self,
+        lexical: Sequence[str],
+        vector: VectorIndex,
+        lexical_weight: float = 0.5,
+        min_vector_score: float = 0.15,
+    ) -> None:
+        if len(lexical) != len(vector):
+            raise ValueError("lexical and vector indexes must cover the same documents")
+        self.lexical = lexical
+        self.vector = vector
+        self.lexical_weight = lexical_weight
+        self.min_vector_score = min_vector_score
+
+    def __len__(self) -> int:
+        return len(self.vector)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        return self.vector[index]
+
+    def search(self, query: str, k: int = 2) -> List[str]:
+        return self._rank(query, self.vector.similarities(query), k)
+
+    def search_batch(self, queries: Sequence[str], k: int = 2) -> List[List[str]]:
+        """Like :meth:`search` for many queries, embedding them in one matrix product."""
+        similarities = self.vector.embedder.embed(queries) @ self.vector.matrix.T
+        return [self._rank(query, row, k) for query, row in zip(queries, similarities)]
+
+    def _rank(self, query: str, similarities: np.ndarray, k: int) -> List[str]:
+        eligible = similarities >= self.min_vector_score
+        combined = (1.0 - self.lexical_weight) * similarities
+
+        if self.lexical_weight > 0:
+            lexical_scores = self.lexical.scores(query)
+            if lexical_scores:
+                positions = np.fromiter(lexical_scores.keys(), dtype=np.intp, count=len(lexical_scores))
+                values = np.fromiter(lexical_scores.values(), dtype=np.float32, count=len(lexical_scores))
+                ceiling = self.lexical.score_ceiling(query) or float(values.max())
+                combined[positions] += self.lexical_weight * values / ceiling
+                eligible[positions] = True
+
+        combined[~eligible] = -np.inf
+        return [self.vector[i] for i in top_k_indices(combined, k) if np.isfinite(combined[i])]
@@ -0,0 +1,81 @@
+"""Support for running the app in several worker processes.
+
+``gunicorn.conf.py`` imports the app once in the master (``preload_app``),
+so the knowledge base, its BM25/vector indexes, the intent classifier and
+the compiled graph are built before ``fork`` and shared copy-on-write by
+every worker. :func:`after_fork` then replaces what must not cross a fork:
+SQLite connections and pooled database connections.
+
+Each worker keeps its own in-process state. Metrics are published to
+:data:`SHARED_STATE` every ``METRICS_PUBLISH_INTERVAL_SECONDS`` and merged
+on read, so ``/api/metrics`` and ``/metrics`` describe the whole
+deployment whichever worker answers. The response cache is shared through
+its SQLite backend. Session turn ordering and retry deduplication are not
+shared: they only hold for turns that reach the same worker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from backend.config import settings
+from backend.memory import sqlite_saver
+from backend.metrics import MetricsState, metrics_state
+from backend.shared_state import build_shared_state, worker_id
+
+logger = logging.getLogger(__name__)
+
+METRICS_NAMESPACE = "metrics"
+
+SHARED_STATE = build_shared_state(settings.SHARED_STATE_BACKEND, settings.SHARED_STATE_PATH)
+
+
+def after_fork() -> None:
+    """Reopen fork-unsafe resources inherited from the preloading master."""
+    from backend.database import async_engine, sync_engine
+    from backend.graph import CHECKPOINTER, RESPONSE_CACHE
+
+    # Leave the parent's pooled connections alone; the child opens its own.
+    sync_engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    if isinstance(CHECKPOINTER.saver, SqliteSaver):
+        CHECKPOINTER.saver = sqlite_saver(settings.CHECKPOINT_PATH)
+    reopen = getattr(RESPONSE_CACHE.backend, "reopen", None) if RESPONSE_CACHE else None
+    if reopen is not None:
+        reopen()
+    logger.info("🧬 Worker başlatıldı: %s", worker_id())
+
+
+def publish_metrics() -> None:
+    SHARED_STATE.publish(METRICS_NAMESPACE, worker_id(), metrics_state.export())
+
+
+def retire_worker() -> None:
+    SHARED_STATE.remove(METRICS_NAMESPACE, worker_id())
+
+
+def cluster_metrics() -> MetricsState:
+    """Metrics of every live worker, with this worker's counters up to date."""
+    # Workers that missed three publications are treated as gone.
+    exports = SHARED_STATE.collect(METRICS_NAMESPACE, ttl=settings.METRICS_PUBLISH_INTERVAL_SECONDS * 3)
+    exports[worker_id()] = metrics_state.export()
+    return metrics_state.merge(exports.values())
+
+
+async def acluster_metrics() -> MetricsState:
+    if SHARED_STATE.blocking:
+        return await asyncio.to_thread(cluster_metrics)
+    return cluster_metrics()
+
+
+async def publish_periodically(interval: float) -> None:
+    """Publish this worker's metrics every ``interval`` seconds."""
+    while True:
+        try:
+            await asyncio.to_thread(publish_metrics)
+        except Exception:  # pragma: no cover - defensive
+            logger.exception("Paylaşılan metrik yayını başarısız")
+        await asyncio.sleep(interval)
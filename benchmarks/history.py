@@ -0,0 +1,172 @@
+"""Per-page latency of the transcript API at increasing page depths.
+
+Seeds a temporary SQLite database with ``--rows`` messages spread over
+``--conversations`` conversations, then reads pages of the largest one at
+several depths with keyset pagination (``backend.history``) and, for
+comparison, with ``OFFSET``::
+
+    python -m benchmarks.history --rows 2000000 --conversations 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.history import _COLUMNS, _conversation_id, encode_cursor, fetch_messages_page
+from backend.models import Conversation, Message
+
+INSERT_CHUNK = 50_000
+DEPTHS = (0.0, 0.1, 0.5, 0.9, 1.0)
+
+
+def seed(url: str, rows: int, conversations: int) -> List[str]:
+    """Insert ``rows`` messages round-robin over the conversations; returns session ids."""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    session_ids = [f"bench-{index}" for index in range(conversations)]
+    conversation_ids = [uuid.uuid4() for _ in session_ids]
+    started_at = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Conversation),
+            [
+                {"id": cid, "session_id": sid, "created_at": started_at}
+                for sid, cid in zip(session_ids, conversation_ids)
+            ],
+        )
+        for offset in range(0, rows, INSERT_CHUNK):
+            connection.execute(
+                insert(Message),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "conversation_id": conversation_ids[index % conversations],
+                        "sender": "user" if index % 2 == 0 else "assistant",
+                        "content": f"mesaj {index}",
+                        "metadata": {},
+                        # Coarse timestamps so (created_at, id) ties are exercised.
+                        "created_at": started_at + timedelta(seconds=index // 4),
+                    }
+                    for index in range(offset, min(offset + INSERT_CHUNK, rows))
+                ],
+            )
+        plan = connection.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM messages WHERE conversation_id = :cid "
+                "AND (created_at, id) > (:created_at, :id) ORDER BY created_at, id LIMIT 51"
+            ),
+            {"cid": conversation_ids[0].hex, "created_at": str(started_at), "id": ""},
+        ).all()
+    engine.dispose()
+    print("query plan:", " | ".join(row[-1] for row in plan))
+    return session_ids
+
+
+async def _offset_page(session_factory: sessionmaker, session_id: str, offset: int, limit: int) -> int:
+    async with session_factory() as db:
+        conversation_id = await _conversation_id(db, session_id)
+        statement = (
+            select(*_COLUMNS)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at, Message.id)
+            .offset(offset)
+            .limit(limit)
+        )
+        return len((await db.execute(statement)).all())
+
+
+async def _cursor_at(session_factory: sessionmaker, session_id: str, offset: int) -> str | None:
+    """Cursor pointing just before row ``offset`` (built once, outside the timing)."""
+    if offset == 0:
+        return None
+    async with session_factory() as db:
+        conversation_id = await _conversation_id(db, session_id)
+        row = (
+            await db.execute(
+                select(Message.created_at, Message.id)
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.created_at, Message.id)
+                .offset(offset - 1)
+                .limit(1)
+            )
+        ).one()
+    return encode_cursor(row.created_at, row.id)
+
+
+async def measure(url: str, session_id: str, messages: int, page_size: int, repeats: int) -> List[Dict[str, Any]]:
+    engine = create_async_engine(url)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    results = []
+    for depth in DEPTHS:
+        offset = min(int(messages * depth), max(messages - page_size, 0))
+        cursor = await _cursor_at(session_factory, session_id, offset)
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            page = await fetch_messages_page(session_id, page_size, cursor, session_factory=session_factory)
+        keyset_ms = (time.perf_counter() - started) * 1000 / repeats
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            await _offset_page(session_factory, session_id, offset, page_size)
+        offset_ms = (time.perf_counter() - started) * 1000 / repeats
+
+        results.append(
+            {
+                "offset": offset,
+                "rows": len(page["messages"]),
+                "keyset_ms": round(keyset_ms, 3),
+                "offset_ms": round(offset_ms, 3),
+            }
+        )
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="webchat-history-") as directory:
+        path = Path(directory) / "history.db"
+        started = time.perf_counter()
+        session_ids = seed(f"sqlite:///{path}", args.rows, args.conversations)
+        seed_seconds = time.perf_counter() - started
+        # Round-robin seeding puts the remainder in the first conversation.
+        messages = -(-args.rows // args.conversations)
+        pages = asyncio.run(
+            measure(f"sqlite+aiosqlite:///{path}", session_ids[0], messages, args.page_size, args.repeats)
+        )
+    print(
+        json.dumps(
+            {
+                "rows": args.rows,
+                "conversation_messages": messages,
+                "page_size": args.page_size,
+                "seed_seconds": round(seed_seconds, 1),
+                "pages": pages,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Per-message cost of intent detection as the number of intents grows.
+
+Compares the old approach (normalize, then ``any(keyword in text)`` per
+intent) with the compiled :class:`IntentClassifier`::
+
+    python -m benchmarks.intents --intents 10 100 1000 --messages 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from backend.intents import IntentClassifier, IntentSpec
+from backend.text import normalize
+
+SYLLABLES = "ka ba la ma ta se de re ni lo mu ki po ya zu ge fi ho".split()
+FILLER = "merhaba lütfen siparişim için bilgi alabilir miyim teşekkürler acaba".split()
+
+
+def build_intents(count: int, rng: random.Random) -> List[IntentSpec]:
+    seen = set()
+    intents = []
+    while len(intents) < count:
+        keywords = {"".join(rng.choices(SYLLABLES, k=4)): 1.0 for _ in range(5)}
+        if seen.isdisjoint(keywords):
+            seen.update(keywords)
+            intents.append(IntentSpec(name=f"intent{len(intents)}", category="tool", keywords=keywords))
+    return intents
+
+
+def run(intent_count: int, message_count: int, seed: int = 5) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    intents = build_intents(intent_count, rng)
+    messages = []
+    for _ in range(message_count):
+        words = rng.choices(FILLER, k=8)
+        words.insert(rng.randrange(len(words)), rng.choice(list(rng.choice(intents).keywords)))
+        messages.append(" ".join(words))
+
+    keyword_lists = [[normalize(keyword) for keyword in intent.keywords] for intent in intents]
+    started = time.perf_counter()
+    for message in messages:
+        text = normalize(message)
+        next((index for index, keywords in enumerate(keyword_lists) if any(k in text for k in keywords)), None)
+    linear = time.perf_counter() - started
+
+    started = time.perf_counter()
+    classifier = IntentClassifier(intents)
+    compile_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for message in messages:
+        classifier.classify(message)
+    compiled = time.perf_counter() - started
+
+    return {
+        "intents": intent_count,
+        "messages": message_count,
+        "compile_ms": round(compile_seconds * 1000, 2),
+        "any_scan_us_per_message": round(linear * 1e6 / message_count, 2),
+        "compiled_us_per_message": round(compiled * 1e6 / message_count, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--intents", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps([run(count, args.messages) for count in args.intents], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Startup time and per-worker memory of knowledge base loading strategies.
+
+Generates a synthetic catalogue-style KB, then measures each strategy in a
+fresh interpreter (as a uvicorn worker would start)::
+
+    python -m benchmarks.kb_loading --entries 100000 --workers 4
+
+``heap`` parses the JSONL file and builds an in-memory BM25 index per worker;
+``mmap`` maps one prebuilt index file. ``rss_anon_kb`` is private memory,
+``rss_file_kb`` is page cache shared between workers mapping the same file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from backend.kb_index import build_index
+from backend.rag_setup import iter_knowledge_entries
+
+WORDS = (
+    "iade kargo ödeme garanti teslimat sipariş ürün kampanya stok üyelik fatura "
+    "değişim kupon indirim adres müşteri destek beden renk elektronik kitap"
+).split()
+
+QUERIES = ["iade süresi", "kargo ücreti", "garanti kapsamı", "kampanya kupon"]
+
+
+def generate_kb(path: Path, entries: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    with path.open("w", encoding="utf-8") as handler:
+        for index in range(entries):
+            text = " ".join(rng.choices(WORDS, k=rng.randint(8, 30)))
+            handler.write(json.dumps({"key": f"sku-{index}", "text": text}, ensure_ascii=False))
+            handler.write("\n")
+
+
+def _memory_kb() -> Dict[str, int]:
+    fields = {}
+    with open("/proc/self/status", encoding="ascii") as handler:
+        for line in handler:
+            name, _, value = line.partition(":")
+            if name in {"VmRSS", "RssAnon", "RssFile"}:
+                fields[name] = int(value.split()[0])
+    return {
+        "rss_kb": fields.get("VmRSS", 0),
+        "rss_anon_kb": fields.get("RssAnon", 0),
+        "rss_file_kb": fields.get("RssFile", 0),
+    }
+
+
+def _worker(mode: str, source: Path, index: Path) -> Dict[str, Any]:
+    """Runs inside a child interpreter and reports its own numbers."""
+    baseline = _memory_kb()
+    started = time.perf_counter()
+    if mode == "heap":
+        from backend.rag_setup import BM25Retriever, load_knowledge_entries
+
+        entries = load_knowledge_entries(source)
+        retriever = BM25Retriever(entries.values(), entries.keys())
+    else:
+        from backend.kb_index import MmapBM25Index
+
+        retriever = MmapBM25Index(index)
+    startup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for query in QUERIES * 25:
+        retriever.search(query, k=2)
+    query_ms = (time.perf_counter() - started) * 1000 / (len(QUERIES) * 25)
+
+    memory = _memory_kb()
+    return {
+        "mode": mode,
+        "documents": len(retriever),
+        "startup_seconds": round(startup, 4),
+        "mean_query_ms": round(query_ms, 4),
+        **{key: memory[key] - baseline[key] for key in memory},
+    }
+
+
+def run(entries: int, workers: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="kb-bench-") as tmp:
+        source = Path(tmp) / "kb.jsonl"
+        index = Path(tmp) / "kb.idx"
+        generate_kb(source, entries)
+
+        started = time.perf_counter()
+        build_index(iter_knowledge_entries(source), index)
+        build_seconds = time.perf_counter() - started
+
+        results: List[Dict[str, Any]] = []
+        for mode in ("heap", "mmap"):
+            for _ in range(workers):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.kb_loading", "--worker", mode, str(source), str(index)],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+                results.append(json.loads(output.stdout))
+
+        return {
+            "entries": entries,
+            "workers": workers,
+            "source_bytes": source.stat().st_size,
+            "index_bytes": index.stat().st_size,
+            "index_build_seconds": round(build_seconds, 4),
+            "results": results,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--worker", nargs=3, metavar=("MODE", "SOURCE", "INDEX"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, source, index = args.worker
+        print(json.dumps(_worker(mode, Path(source), Path(index))))
+        return
+    print(json.dumps(run(args.entries, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
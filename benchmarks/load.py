@@ -0,0 +1,369 @@
+"""In-process load test for ``/api/chat`` and ``/ws`` plus hot-path micro-benchmarks.
+
+Drives the FastAPI app through ASGI (no sockets) with a configurable number
+of concurrent clients and a weighted message mix, or replays a JSON-lines
+corpus (one object per line with a ``message`` or ``body`` field)::
+
+    python -m benchmarks.load --requests 2000 --concurrency 32 --output baseline.json
+    python -m benchmarks.load --mix faq=1,order=1 --baseline baseline.json --max-regression 0.15
+
+Reports p50/p95/p99 latency, throughput and peak RSS per scenario as JSON.
+With ``--baseline`` every scenario is compared against a saved run and the
+exit status is 1 when a latency or throughput figure regresses by more than
+``--max-regression``.
+
+The database and checkpoints go to a temporary directory unless
+``SQLITE_URL``/``CHECKPOINT_PATH`` are set, and the Groq key is cleared
+unless ``--with-llm`` is given, so runs are reproducible and offline.
+``--mock-tools MIN MAX`` routes tool calls to the mock services with that
+latency range in seconds.
+Backend modules are imported only after that environment is prepared.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MESSAGES: Dict[str, List[str]] = {
+    "faq": [
+        "İade politikası nedir?",
+        "Kargo kaç günde gelir?",
+        "Ödeme seçenekleri nelerdir?",
+        "Ürünü nasıl iade ederim?",
+    ],
+    "order": [
+        "12345 numaralı siparişim nerede?",
+        "98765 sipariş durumu nedir?",
+        "Siparişim 55555 ne zaman gelir?",
+    ],
+    "shipping": [
+        "İstanbul'a kargo ücreti ne kadar?",
+        "Ankara kargo fiyatı nedir?",
+        "İzmir için kargo ücretini hesapla",
+    ],
+    "general": [
+        "Merhaba",
+        "Teşekkürler, iyi günler",
+        "Bir temsilciyle görüşebilir miyim?",
+    ],
+}
+DEFAULT_MIX = {"faq": 0.4, "order": 0.25, "shipping": 0.2, "general": 0.15}
+
+Workload = List[Tuple[str, str]]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in MESSAGES:
+            raise argparse.ArgumentTypeError(f"unknown category: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def load_corpus(path: Path) -> List[str]:
+    messages = []
+    with path.open(encoding="utf-8") as handler:
+        for line in handler:
+            if line.strip():
+                record = json.loads(line)
+                messages.append(str(record.get("message") or record.get("body") or ""))
+    return [message for message in messages if message]
+
+
+def build_workload(
+    requests: int, mix: Dict[str, float], corpus: Optional[Sequence[str]] = None, seed: int = 11
+) -> Workload:
+    """Deterministic ``(category, message)`` list; a corpus is replayed in order."""
+    if corpus:
+        return [("corpus", corpus[index % len(corpus)]) for index in range(requests)]
+    rng = random.Random(seed)
+    categories = rng.choices(list(mix), weights=list(mix.values()), k=requests)
+    return [(category, rng.choice(MESSAGES[category])) for category in categories]
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _report(latencies: List[float], errors: int, elapsed: float, **extra: Any) -> Dict[str, Any]:
+    return {
+        **extra,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        **percentiles(latencies),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+class ASGIWebSocket:
+    """Minimal in-process WebSocket client speaking the ASGI protocol."""
+
+    def __init__(self, app: Any, path: str, query: str = "") -> None:
+        self._app = app
+        self._scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "headers": [(b"host", b"benchmark")],
+            "client": ("127.0.0.1", 0),
+            "server": ("benchmark", 80),
+            "subprotocols": [],
+        }
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._outgoing: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "ASGIWebSocket":
+        self._task = asyncio.create_task(self._app(self._scope, self._incoming.get, self._outgoing.put))
+        await self._incoming.put({"type": "websocket.connect"})
+        message = await self._outgoing.get()
+        if message["type"] != "websocket.accept":
+            raise RuntimeError(f"WebSocket rejected: {message}")
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self._incoming.put({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+    async def send_json(self, payload: Dict[str, Any]) -> None:
+        await self._incoming.put({"type": "websocket.receive", "text": json.dumps(payload)})
+
+    async def receive_json(self) -> Dict[str, Any]:
+        message = await self._outgoing.get()
+        if message["type"] != "websocket.send":
+            raise RuntimeError(f"unexpected ASGI message: {message['type']}")
+        return json.loads(message["text"])
+
+
+async def drive_http(app: Any, workload: Workload, concurrency: int, sessions: int) -> Dict[str, Any]:
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, (_, message) in enumerate(workload):
+        queue.put_nowait((index, message))
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while not queue.empty():
+            index, message = queue.get_nowait()
+            payload = {"message": message, "session_id": f"load-http-{index % sessions}"}
+            started = time.perf_counter()
+            response = await client.post("/api/chat", json=payload)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return _report(latencies, errors, elapsed, transport="http", concurrency=concurrency)
+
+
+async def drive_websocket(app: Any, workload: Workload, concurrency: int) -> Dict[str, Any]:
+    """One connection per concurrent client, each sending its share of the workload in turn."""
+    latencies: List[float] = []
+    first_frame: List[float] = []
+    errors = 0
+
+    async def connection(worker: int) -> None:
+        nonlocal errors
+        session_id = f"load-ws-{worker}"
+        async with ASGIWebSocket(app, "/ws", f"session_id={session_id}") as websocket:
+            for index in range(worker, len(workload), concurrency):
+                started = time.perf_counter()
+                await websocket.send_json({"message": workload[index][1], "session_id": session_id})
+                frame = await websocket.receive_json()
+                first_frame.append(time.perf_counter() - started)
+                while frame["type"] == "delta":
+                    frame = await websocket.receive_json()
+                if frame["type"] == "response":
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection(worker) for worker in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    report = _report(latencies, errors, elapsed, transport="websocket", concurrency=concurrency)
+    report["first_frame_p50_ms"] = percentiles(first_frame)["p50_ms"]
+    return report
+
+
+def _timed_calls(func: Any, inputs: Sequence[Any]) -> Dict[str, Any]:
+    latencies = []
+    for item in inputs:
+        started = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - started)
+    total = sum(latencies)
+    return {
+        "calls": len(inputs),
+        "mean_us": round(total * 1e6 / len(inputs), 3),
+        **percentiles(latencies),
+        "throughput_rps": round(len(inputs) / total, 2) if total else 0.0,
+    }
+
+
+def micro_benchmarks(repeat: int, workload: Workload) -> Dict[str, Any]:
+    from backend.graph import INTENT_CLASSIFIER, KNOWLEDGE_BASE, _persist_messages
+    from backend.rag_setup import mini_rag_search
+
+    messages = [message for _, message in workload][:repeat] or MESSAGES["faq"]
+    inputs = [messages[index % len(messages)] for index in range(repeat)]
+    retriever = KNOWLEDGE_BASE.retriever
+    return {
+        "mini_rag_search": _timed_calls(lambda text: mini_rag_search(text, retriever), inputs),
+        "intent_routing": _timed_calls(INTENT_CLASSIFIER.classify, inputs),
+        "persist_messages_sqlite": _timed_calls(
+            lambda text: _persist_messages("load-persist", text, "yanıt", {"intent": "general"}),
+            inputs[: max(1, repeat // 10)],
+        ),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from backend.main import app, on_shutdown, on_startup
+
+    corpus = load_corpus(args.corpus) if args.corpus else None
+    workload = build_workload(args.requests, args.mix, corpus, args.seed)
+    categories: Dict[str, int] = {}
+    for category, _ in workload:
+        categories[category] = categories.get(category, 0) + 1
+
+    await on_startup()
+    try:
+        # Warm imports, caches and the checkpointer before measuring.
+        await drive_http(app, workload[: args.concurrency], args.concurrency, args.sessions)
+        scenarios = {}
+        if "http" in args.transports:
+            scenarios["http"] = await drive_http(app, workload, args.concurrency, args.sessions)
+        if "ws" in args.transports:
+            scenarios["ws"] = await drive_websocket(app, workload, args.concurrency)
+    finally:
+        await on_shutdown()
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "sessions": args.sessions,
+            "mix": categories,
+            "seed": args.seed,
+            "mock_tools": args.mock_tools,
+            "python": sys.version.split()[0],
+        },
+        "scenarios": scenarios,
+        "micro": await asyncio.to_thread(micro_benchmarks, args.micro_repeat, workload),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "mean_us")
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> Dict[str, Any]:
+    """Relative change per figure; positive ``change`` always means slower."""
+    rows = []
+    for section in ("scenarios", "micro"):
+        for name, figures in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+                old, new = previous.get(metric), figures.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old if metric in LOWER_IS_BETTER else (old - new) / old
+                rows.append(
+                    {
+                        "benchmark": f"{section}.{name}",
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                        "change": round(change, 4),
+                        "regressed": change > max_regression,
+                    }
+                )
+    return {"max_regression": max_regression, "regressions": sum(row["regressed"] for row in rows), "rows": rows}
+
+
+def _prepare_environment(with_llm: bool, mock_tools: Optional[Sequence[float]]) -> None:
+    if not with_llm:
+        os.environ["GROQ_API_KEY"] = ""
+    if mock_tools:
+        os.environ["TOOL_BACKEND"] = "mock"
+        os.environ["TOOL_MOCK_MIN_LATENCY_SECONDS"] = str(mock_tools[0])
+        os.environ["TOOL_MOCK_MAX_LATENCY_SECONDS"] = str(mock_tools[1])
+    if "SQLITE_URL" not in os.environ or "CHECKPOINT_PATH" not in os.environ:
+        directory = Path(tempfile.mkdtemp(prefix="load-bench-"))
+        os.environ.setdefault("SQLITE_URL", f"sqlite+aiosqlite:///{directory / 'load.db'}")
+        os.environ.setdefault("CHECKPOINT_PATH", str(directory / "checkpoints.db"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=200, help="distinct session ids for HTTP clients")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. faq=4,order=3,shipping=2,general=1")
+    parser.add_argument("--corpus", type=Path, help="JSON-lines file to replay instead of the mix")
+    parser.add_argument("--transports", nargs="+", choices=("http", "ws"), default=["http", "ws"])
+    parser.add_argument("--micro-repeat", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--output", type=Path, help="also write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against a saved run")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    parser.add_argument("--with-llm", action="store_true", help="keep GROQ_API_KEY from the environment")
+    parser.add_argument("--mock-tools", nargs=2, type=float, metavar=("MIN", "MAX"), help="mock tool latency range")
+    args = parser.parse_args()
+
+    _prepare_environment(args.with_llm, args.mock_tools)
+    results = asyncio.run(run(args))
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        results["comparison"] = compare(results, baseline, args.max_regression)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    print(output)
+    if results.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
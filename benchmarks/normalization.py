@@ -0,0 +1,77 @@
+"""Micro-benchmark for text normalization.
+
+Compares the previous per-character NFKD filter with :mod:`backend.text`
+on ASCII and Turkish messages, repeated short tool arguments and batch
+folding of knowledge base documents::
+
+    python -m benchmarks.normalization --repeat 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Sequence
+
+from backend.text import normalize, normalize_batch
+
+ASCII_MESSAGE = "Hello, where is my order 12345? It was shipped last week."
+TURKISH_MESSAGE = "Merhaba, 12345 numaralı siparişim kargoya verildi mi? Ödemeyi kapıda yapacağım."
+ARGUMENTS = ["İstanbul", "Ankara", "İzmir", "Antalya", "iade", "kargo", "ödeme"]
+WORDS = "ürün sipariş teslimat kargo ödeme iade değişim garanti üyelik kampanya stok".split()
+
+
+def legacy_normalize(text: str) -> str:
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in folded if not unicodedata.combining(char))
+
+
+def _per_call_us(func: Callable[[str], str], inputs: Sequence[str]) -> float:
+    started = time.perf_counter()
+    for text in inputs:
+        func(text)
+    return round((time.perf_counter() - started) * 1e6 / len(inputs), 3)
+
+
+def run(repeat: int, documents: int, seed: int = 3) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    cases = {
+        "ascii_message": [ASCII_MESSAGE] * repeat,
+        "turkish_message": [TURKISH_MESSAGE] * repeat,
+        "tool_arguments": [rng.choice(ARGUMENTS) for _ in range(repeat)],
+    }
+    results: Dict[str, Any] = {}
+    for name, inputs in cases.items():
+        results[name] = {
+            "legacy_us": _per_call_us(legacy_normalize, inputs),
+            "shared_us": _per_call_us(normalize, inputs),
+        }
+
+    corpus: List[str] = [" ".join(rng.choices(WORDS, k=rng.randint(8, 24))) for _ in range(documents)]
+    started = time.perf_counter()
+    [legacy_normalize(text) for text in corpus]
+    legacy = time.perf_counter() - started
+    started = time.perf_counter()
+    normalize_batch(corpus)
+    batch = time.perf_counter() - started
+    results["batch_documents"] = {
+        "documents": documents,
+        "legacy_ms": round(legacy * 1000, 2),
+        "shared_ms": round(batch * 1000, 2),
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20_000)
+    parser.add_argument("--documents", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat, args.documents), indent=2))
+
+
+if __name__ == "__main__":
+    main()
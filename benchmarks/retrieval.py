@@ -0,0 +1,115 @@
+"""Recall and latency of lexical, vector and hybrid knowledge base retrieval.
+
+Every synthetic document carries a unique anchor word. Half of the queries
+use the anchor verbatim, half use an inflected form ("<anchor>sini",
+"<anchor>ler"...), which exact-token matching cannot see::
+
+    python -m benchmarks.retrieval --sizes 10000 100000 --queries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from backend.rag_setup import BM25Retriever
+from backend.vector_search import HashingEmbedder, HybridRetriever, VectorIndex
+
+SYLLABLES = "ka ba la ma ta se de re ni lo mu ki po ya zu ge fi ho".split()
+FILLER = "ürün sipariş teslim kargo fatura destek üyelik kampanya stok adres".split()
+SUFFIXES = ["si", "sini", "ler", "leri", "de", "den", "im", "imiz"]
+
+
+def build_corpus(size: int, rng: random.Random) -> Tuple[List[str], List[str]]:
+    anchors: List[str] = []
+    seen = set()
+    while len(anchors) < size:
+        anchor = "".join(rng.choices(SYLLABLES, k=rng.randint(3, 4)))
+        if anchor not in seen:
+            seen.add(anchor)
+            anchors.append(anchor)
+    documents = [
+        f"{anchor}: " + " ".join(rng.choices(FILLER, k=rng.randint(6, 16))) for anchor in anchors
+    ]
+    return anchors, documents
+
+
+def build_queries(anchors: Sequence[str], count: int, rng: random.Random) -> List[Tuple[str, int, str]]:
+    queries = []
+    for index in range(count):
+        target = rng.randrange(len(anchors))
+        if index % 2:
+            word, kind = anchors[target] + rng.choice(SUFFIXES), "inflected"
+        else:
+            word, kind = anchors[target], "exact"
+        queries.append((f"{word} {rng.choice(FILLER)} nedir", target, kind))
+    return queries
+
+
+def _measure(
+    search: Callable[[str], List[str]], queries: Sequence[Tuple[str, int, str]], documents: Sequence[str]
+) -> Dict[str, Any]:
+    hits = {"exact": 0, "inflected": 0}
+    totals = {"exact": 0, "inflected": 0}
+    started = time.perf_counter()
+    for query, target, kind in queries:
+        totals[kind] += 1
+        hits[kind] += documents[target] in search(query)
+    elapsed = time.perf_counter() - started
+    return {
+        "mean_query_ms": round(elapsed * 1000 / len(queries), 4),
+        **{f"recall_{kind}": round(hits[kind] / max(totals[kind], 1), 4) for kind in hits},
+    }
+
+
+def run(size: int, query_count: int, k: int, seed: int = 11) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    anchors, documents = build_corpus(size, rng)
+    queries = build_queries(anchors, query_count, rng)
+
+    started = time.perf_counter()
+    lexical = BM25Retriever(documents)
+    lexical_build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vector = VectorIndex(documents, HashingEmbedder())
+    vector_build = time.perf_counter() - started
+    hybrid = HybridRetriever(lexical, vector, lexical_weight=0.5, min_vector_score=0.0)
+
+    results = {
+        "bm25": _measure(lambda q: lexical.search(q, k), queries, documents),
+        "vector": _measure(lambda q: vector.search(q, k), queries, documents),
+        "hybrid": _measure(lambda q: hybrid.search(q, k), queries, documents),
+    }
+
+    started = time.perf_counter()
+    vector.search_batch([query for query, _, _ in queries], k)
+    results["vector_batch"] = {
+        "mean_query_ms": round((time.perf_counter() - started) * 1000 / len(queries), 4)
+    }
+
+    return {
+        "documents": size,
+        "queries": query_count,
+        "k": k,
+        "bm25_build_seconds": round(lexical_build, 3),
+        "vector_build_seconds": round(vector_build, 3),
+        "vector_matrix_mb": round(vector.matrix.nbytes / 2**20, 2),
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=2)
+    args = parser.parse_args()
+    print(json.dumps([run(size, args.queries, args.k) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,13 @@
   let webSocket = null;
   let config = {};
   let isPanelOpen = false;
+  // Yanıtı gelmeden bağlantı koparsa aynı message_id ile yeniden gönderilir
+  let pendingPayload = null;
 
   function createWidget() {
-    // CSS'i dinamik olarak yükle (Eğer index.html'e eklenmediyse)
-    if (!document.querySelector('link[href*="widget.css"]')) {
+    // CSS'i dinamik olarak yükle (Eğer index.html'e eklenmediyse). Sunucu aşağıdaki
+    // adresi içerik özetli, kalıcı önbelleklenen widget.<hash>.css adresiyle değiştirir.
+    if (!document.querySelector('link[rel="stylesheet"][href*="widget."][href$=".css"]')) {
         const cssLink = document.createElement('link');
         cssLink.rel = 'stylesheet';
         cssLink.href = buildAssetUrl('/static/widget.css');
@@ -82,6 +85,45 @@
     body.scrollTop = body.scrollHeight;
   }
 
+  function appendDelta(text) {
+    const body = document.getElementById('webchatai-body');
+    if (!body) return;
+
+    let msg = document.getElementById('webchatai-streaming');
+    if (!msg) {
+      const typingMsg = document.getElementById('webchatai-typing');
+      if (typingMsg) {
+        typingMsg.remove();
+      }
+      msg = document.createElement('div');
+      msg.className = 'webchatai-msg assistant';
+      msg.id = 'webchatai-streaming';
+      body.appendChild(msg);
+    }
+    msg.textContent += text;
+    body.scrollTop = body.scrollHeight;
+  }
+
+  function resetStreaming() {
+    // Akan metin bir araç çağrısına dönüştü; yanıt bir sonraki turdan gelecek
+    const msg = document.getElementById('webchatai-streaming');
+    if (msg) {
+      msg.remove();
+    }
+    showTypingIndicator();
+  }
+
+  function finishStreaming(text) {
+    const msg = document.getElementById('webchatai-streaming');
+    if (!msg) {
+      addMessage('assistant', text);
+      return;
+    }
+    // Son çerçeve tam metni taşır; akış sırasında kaçan parça varsa düzeltir
+    msg.textContent = text;
+    msg.removeAttribute('id');
+  }
+
   function showTypingIndicator() {
     if (document.getElementById('webchatai-typing')) {
       return;
@@ -120,13 +162,23 @@
     webSocket.onopen = () => {
       console.log('WebSocket bağlantısı açıldı.');
       addMessage('system', 'Bağlantı kuruldu.');
+      if (pendingPayload) {
+        webSocket.send(JSON.stringify(pendingPayload));
+      }
     };
 
     webSocket.onmessage = (event) => {
       try {
         const payload = JSON.parse(event.data);
-        if (payload.type === 'response') {
-          addMessage('assistant', payload.response);
+        if (payload.type === 'delta') {
+          appendDelta(payload.delta || '');
+        } else if (payload.type === 'reset') {
+          resetStreaming();
+        } else if (payload.type === 'response') {
+          if (pendingPayload && payload.message_id === pendingPayload.message_id) {
+            pendingPayload = null;
+          }
+          finishStreaming(payload.response);
           if (payload.metadata && payload.metadata.kb_results && payload.metadata.kb_results.length) {
             addMessage('system', `📚 Bilgi kaynağı: ${payload.metadata.kb_results[0]}`);
           }
@@ -172,7 +224,9 @@
     const payload = {
       message,
       session_id: config.sessionId,
+      message_id: generateMessageId(),
     };
+    pendingPayload = payload;
 
     // Mesajı WebSocket üzerinden sunucuya JSON olarak gönder
     webSocket.send(JSON.stringify(payload));
@@ -213,6 +267,13 @@
     return generated;
   }
 
+  function generateMessageId() {
+    if (global.crypto && typeof global.crypto.randomUUID === 'function') {
+      return global.crypto.randomUUID();
+    }
+    return 'msg-' + Date.now().toString(36) + '-' + Math.random().toString(36).substr(2, 9);
+  }
+
   function persistSessionId(value) {
     try {
       localStorage.setItem(SESSION_STORAGE_KEY, value);
@@ -0,0 +1,46 @@
+"""Gunicorn launcher for multi-worker deployments.
+
+    gunicorn -c gunicorn.conf.py backend.main:app
+
+``WEB_CONCURRENCY`` sets the worker count (default: one per CPU). The app
+is imported once in the master and forked, so the knowledge base and
+indexes are shared copy-on-write; see ``backend/workers.py``.
+
+With several workers, metrics and the LLM response cache move to SQLite
+files every worker opens. Turn ordering and ``message_id`` deduplication
+(``backend/sessions.py``) stay per worker, and the kernel spreads
+connections over workers without regard to sessions: a session's
+WebSocket turn and its HTTP fallback may run concurrently on two workers.
+Where that matters, run single-worker instances behind a proxy that
+routes by session id.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+graceful_timeout = 30
+timeout = 60
+
+# Read by backend.config before the app is preloaded.
+os.environ.setdefault("WORKERS", str(workers))
+if workers > 1:
+    os.environ.setdefault("SHARED_STATE_BACKEND", "sqlite")
+    # One cache for all workers instead of a cold copy per process.
+    os.environ.setdefault("RESPONSE_CACHE_BACKEND", "sqlite")
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach; otherwise the
+    # first collection in each worker touches (and copies) every shared page.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from backend.workers import after_fork
+
+    after_fork()
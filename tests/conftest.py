@@ -1,7 +1,28 @@
+import os
+import tempfile
+from pathlib import Path
+
 import pytest
 from fastapi.testclient import TestClient
-from backend.main import app
+
+_TEST_DIR = Path(tempfile.mkdtemp(prefix="webchat-tests-"))
+_TEST_DB = _TEST_DIR / "webchat_test.db"
+os.environ.setdefault("SQLITE_URL", f"sqlite+aiosqlite:///{_TEST_DB}")
+os.environ.setdefault("CHECKPOINT_PATH", str(_TEST_DIR / "checkpoints.db"))
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
+
+from backend.database import Base, sync_engine  # noqa: E402
+from backend.main import app  # noqa: E402
+from backend.persistence import write_behind  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_schema():
+    Base.metadata.create_all(sync_engine)
+    yield
+    write_behind.stop()
+
 
 @pytest.fixture
 def client():
-    return TestClient(app)
+    return TestClient(app, headers={"X-Admin-Token": os.environ["ADMIN_TOKEN"]})
@@ -0,0 +1,55 @@
+"""Offline stand-ins for the Groq chat model."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.pydantic_v1 import Field
+
+
+class ScriptedChatModel(GenericFakeChatModel):
+    """Replays scripted replies, including tool calls, and records every prompt.
+
+    ``bind_tools`` returns the model itself so it can stand in for
+    ``LLM_WITH_TOOLS``; streamed replies keep their tool calls.
+    """
+
+    prompts: List[List[BaseMessage]] = Field(default_factory=list)
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.prompts.append(list(messages))
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        message = self._generate(messages, stop=stop, **kwargs).generations[0].message
+        calls = message.tool_calls if isinstance(message, AIMessage) else []
+        # Text before tool calls (e.g. "Kontrol ediyorum") streams like any answer.
+        if message.content or not calls:
+            for token in re.split(r"(\s)", message.content):
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, id=message.id))
+                if run_manager:
+                    run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+        if not calls:
+            return
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                    for index, call in enumerate(message.tool_calls)
+                ],
+            )
+        )
+
+
+def tool_call(name: str, call_id: str, **args: Any) -> dict:
+    return {"name": name, "args": args, "id": call_id}
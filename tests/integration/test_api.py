@@ -1,5 +1,7 @@
 """Integration tests covering the FastAPI surface area."""
 
+import json
+
 from fastapi.testclient import TestClient
 
 
@@ -44,3 +46,177 @@ def test_websocket_roundtrip(client: TestClient) -> None:
 def test_home_page_served_or_missing(client: TestClient) -> None:
     response = client.get("/")
     assert response.status_code in {200, 404}
+
+
+def test_admin_knowledge_reload(client: TestClient) -> None:
+    response = client.post("/api/admin/knowledge/reload")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["documents"] > 0
+    assert "version" in data
+
+
+def test_websocket_streams_llm_deltas(client: TestClient, monkeypatch) -> None:
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    from backend import graph
+
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="Kargonuz yarın teslim edilecek")]))
+    monkeypatch.setattr(graph, "LLM_WITH_TOOLS", model)
+    monkeypatch.setattr(graph, "RESPONSE_CACHE", None)
+
+    with client.websocket_connect("/ws?session_id=ws-stream") as websocket:
+        websocket.send_text("Merhaba")
+        deltas = []
+        message = websocket.receive_json()
+        while message["type"] == "delta":
+            deltas.append(message["delta"])
+            message = websocket.receive_json()
+
+    assert len(deltas) > 1
+    assert message["type"] == "response"
+    assert "".join(deltas) == message["response"] == "Kargonuz yarın teslim edilecek"
+    assert message["metadata"]["intent"] == "general"
+
+
+def test_chat_retry_with_same_message_id_is_deduplicated(client: TestClient) -> None:
+    payload = {"message": "12345 sipariş durumu", "session_id": "dedup-1", "message_id": "m-1"}
+    before = client.get("/api/metrics").json()
+
+    first = client.post("/api/chat", json=payload).json()
+    retry = client.post("/api/chat", json=payload).json()
+
+    after = client.get("/api/metrics").json()
+    assert retry["response"] == first["response"]
+    assert retry["message_id"] == "m-1"
+    assert after["total_messages"] == before["total_messages"] + 1
+    assert after["turns"]["coalesced_retries"] == before["turns"]["coalesced_retries"] + 1
+
+
+def test_prometheus_and_session_page_endpoints(client: TestClient) -> None:
+    client.post("/api/chat", json={"message": "İade politikası nedir?", "session_id": "prom-1"})
+
+    exposition = client.get("/metrics")
+    assert exposition.status_code == 200
+    assert exposition.headers["content-type"].startswith("text/plain")
+    assert "webchat_turn_duration_seconds_count" in exposition.text
+    assert 'webchat_node_duration_seconds_count{node="retriever"}' in exposition.text
+
+    page = client.get("/api/admin/sessions", params={"limit": 1}).json()
+    assert page["sessions"][0]["session_id"] == "prom-1"
+
+
+def test_trace_id_is_returned_and_dumpable(client: TestClient) -> None:
+    payload = client.post("/api/chat", json={"message": "Kargo ücreti ne kadar?", "session_id": "trace-api"}).json()
+    trace_id = payload["metadata"]["trace_id"]
+
+    dump = client.get("/api/admin/traces", params={"limit": 5}).json()
+    trace_ids = {
+        span["traceId"]
+        for resource in dump["resourceSpans"]
+        for scope in resource["scopeSpans"]
+        for span in scope["spans"]
+    }
+    assert trace_id in trace_ids
+
+
+def test_conversation_history_pages_and_export(client: TestClient) -> None:
+    from backend.persistence import write_behind
+
+    for text in ("Merhaba", "Kargo ücreti nedir?", "İade politikası nedir?"):
+        client.post("/api/chat", json={"message": text, "session_id": "history-1"})
+    write_behind.flush()
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/conversations/history-1/messages", params=params).json()
+        pages.append(page["messages"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    messages = [message for page in pages for message in page]
+    assert [len(page) for page in pages] == [4, 2]
+    assert [message["sender"] for message in messages] == ["user", "assistant"] * 3
+    assert messages[0]["content"] == "Merhaba"
+
+    newest = client.get("/api/conversations/history-1/messages", params={"limit": 1, "order": "desc"}).json()
+    assert newest["messages"][0]["id"] == messages[-1]["id"]
+
+    export = client.get("/api/conversations/history-1/export")
+    assert export.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in export.text.splitlines()] == [m["id"] for m in messages]
+
+    assert client.get("/api/conversations/history-1/messages", params={"cursor": "bozuk"}).status_code == 400
+    assert client.get("/api/conversations/yok/messages").status_code == 404
+    assert client.get("/api/conversations/yok/export").status_code == 404
+
+
+def test_chat_batch_streams_ndjson_results(client: TestClient) -> None:
+    items = [
+        {"session_id": "batch-1", "message": "Merhaba", "id": "a"},
+        {"session_id": "batch-2", "message": "İade politikası nedir?", "id": "b"},
+        {"session_id": "batch-1", "message": "Kargo ücreti nedir?", "id": "c"},
+    ]
+    body = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+    response = client.post(
+        "/api/chat/batch", content=body.encode(), headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    *lines, status = [json.loads(line) for line in response.text.splitlines()]
+    assert status == {"done": True, "persisted": 3, "persist_failed": 0}
+    assert sorted((line["index"], line["id"]) for line in lines) == [(0, "a"), (1, "b"), (2, "c")]
+    assert all(line["response"] and line["latency_ms"] >= 0 for line in lines)
+
+    page = client.get("/api/conversations/batch-1/messages").json()
+    user_messages = [message["content"] for message in page["messages"] if message["sender"] == "user"]
+    assert user_messages == ["Merhaba", "Kargo ücreti nedir?"]
+
+    as_json = client.post("/api/chat/batch", json={"items": [{"session_id": "batch-3", "message": "Merhaba"}]})
+    assert [json.loads(line).get("session_id") for line in as_json.text.splitlines()] == ["batch-3", None]
+    assert client.post("/api/chat/batch", json=[{"session_id": "batch-4"}]).status_code == 400
+    assert client.post("/api/chat/batch", json=[]).status_code == 400
+
+
+def test_static_assets_are_fingerprinted_compressed_and_revalidated(client: TestClient) -> None:
+    manifest = client.get("/static/manifest.json").json()
+    css_url = f"/static/{manifest['widget.css']}"
+
+    widget = client.get("/static/widget.js", headers={"Accept-Encoding": "gzip"})
+    assert widget.status_code == 200
+    assert widget.headers["content-encoding"] == "gzip"
+    assert widget.headers["cache-control"] == "public, max-age=300, must-revalidate"
+    assert css_url in widget.text
+
+    not_modified = client.get(
+        "/static/widget.js", headers={"Accept-Encoding": "gzip", "If-None-Match": widget.headers["etag"]}
+    )
+    assert not_modified.status_code == 304
+
+    stylesheet = client.get(css_url)
+    assert stylesheet.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert stylesheet.headers["content-type"].startswith("text/css")
+
+    home = client.get("/")
+    assert home.status_code == 200
+    assert client.get("/", headers={"If-None-Match": home.headers["etag"]}).status_code == 304
+
+
+def test_admin_endpoints_fail_closed(client: TestClient, monkeypatch) -> None:
+    from backend.config import settings
+
+    anonymous = TestClient(client.app)
+    assert anonymous.get("/api/conversations/history-1/messages").status_code == 403
+    wrong = anonymous.get("/api/admin/traces", headers={"X-Admin-Token": "wrong-token"})
+    assert wrong.status_code == 403
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    for method, path in (
+        ("get", "/api/conversations/history-1/export"),
+        ("post", "/api/chat/batch"),
+        ("post", "/api/admin/retention/run"),
+        ("post", "/api/admin/knowledge/reload"),
+    ):
+        assert getattr(client, method)(path).status_code == 403
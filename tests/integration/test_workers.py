@@ -0,0 +1,100 @@
+"""Multi-worker deployment: gunicorn with preloading and shared metrics."""
+
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+
+pytestmark = pytest.mark.skipif(shutil.which("gunicorn") is None, reason="gunicorn is not installed")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def gunicorn_server(tmp_path):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": "2",
+        "BIND": f"127.0.0.1:{port}",
+        "SQLITE_URL": f"sqlite+aiosqlite:///{tmp_path / 'webchat.db'}",
+        "CHECKPOINT_PATH": str(tmp_path / "checkpoints.db"),
+        "SHARED_STATE_PATH": str(tmp_path / "shared_state.db"),
+        "RESPONSE_CACHE_PATH": str(tmp_path / "response_cache.db"),
+        "METRICS_PUBLISH_INTERVAL_SECONDS": "0.2",
+        "KNOWLEDGE_BASE_RELOAD_INTERVAL_SECONDS": "0",
+        "GROQ_API_KEY": "",
+    }
+    # Left to gunicorn.conf.py, which picks the shared backends for several workers.
+    for name in ("WORKERS", "SHARED_STATE_BACKEND", "RESPONSE_CACHE_BACKEND"):
+        env.pop(name, None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                metrics = httpx.get(f"{base_url}/api/metrics", timeout=1).json()
+                if metrics["workers"] == 2:
+                    break
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                pytest.fail(f"gunicorn did not start: {process.stderr.read().decode()[-2000:]}")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def test_metrics_are_aggregated_across_workers(gunicorn_server):
+    def chat(index: int) -> dict:
+        # A fresh connection per request lets the kernel spread them over workers.
+        response = httpx.post(
+            f"{gunicorn_server}/api/chat",
+            json={"message": "İade politikası nedir?", "session_id": f"worker-{index}"},
+            timeout=30,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(chat, range(20)))
+    assert all(result["response"] for result in results)
+
+    deadline = time.monotonic() + 5
+    while True:
+        metrics = httpx.get(f"{gunicorn_server}/api/metrics", timeout=5).json()
+        if metrics["total_messages"] == 20 or time.monotonic() > deadline:
+            break
+        time.sleep(0.2)
+
+    assert metrics["workers"] == 2
+    assert metrics["total_messages"] == 20
+    assert metrics["active_sessions"] == 20
+    assert metrics["response_cache"]["backend"] == "SQLiteCacheBackend"
+    assert "webchat_messages_total 20" in httpx.get(f"{gunicorn_server}/metrics", timeout=5).text
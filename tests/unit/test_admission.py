@@ -0,0 +1,122 @@
+"""Unit tests for LLM admission control and backpressure."""
+
+import asyncio
+
+import pytest
+
+from backend.admission import AdmissionController, AdmissionRejected
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_concurrency_is_bounded_and_waiters_run_in_order():
+    controller = AdmissionController(max_concurrency=2, max_wait=1.0)
+    running = []
+    peak = []
+    order = []
+
+    async def call(index):
+        async with controller.aadmit():
+            running.append(index)
+            peak.append(len(running))
+            order.append(index)
+            await asyncio.sleep(0.01)
+            running.remove(index)
+
+    async def scenario():
+        await asyncio.gather(*(call(index) for index in range(6)))
+
+    asyncio.run(scenario())
+    assert max(peak) == 2
+    assert order == list(range(6))
+    stats = controller.stats()
+    assert stats["admitted"] == 6 and stats["shed"] == 0
+    assert stats["in_flight"] == 0 and stats["queue_length"] == 0
+
+
+def test_full_queue_and_expired_deadline_shed():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, max_wait=0.05)
+
+    async def hold():
+        async with controller.aadmit():
+            await asyncio.sleep(0.2)
+
+    async def waiter():
+        async with controller.aadmit():
+            pass
+
+    async def scenario():
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            async with controller.aadmit():
+                pass
+        with pytest.raises(AdmissionRejected):
+            await queued
+        await holder
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert stats["shed"] == 2
+    assert stats["in_flight"] == 0 and stats["queue_length"] == 0
+
+
+def test_rate_budget_sheds_when_wait_exceeds_deadline():
+    clock = FakeClock()
+    controller = AdmissionController(requests_per_minute=2, tokens_per_minute=600, max_wait=5.0, clock=clock)
+
+    with controller.admit(100):
+        pass
+    with controller.admit(100):
+        pass
+    # The request bucket refills one call per 30 s, far beyond the 5 s deadline.
+    with pytest.raises(AdmissionRejected):
+        with controller.admit(100):
+            pass
+
+    clock.now = 30.0
+    with controller.admit(100):
+        pass
+    assert controller.stats()["admitted"] == 3
+
+
+def test_settle_refunds_overestimated_tokens():
+    clock = FakeClock()
+    controller = AdmissionController(tokens_per_minute=600, max_wait=0.0, clock=clock)
+
+    with controller.admit(600):
+        pass
+    with pytest.raises(AdmissionRejected):
+        with controller.admit(100):
+            pass
+    controller.settle(600, 200)
+    with controller.admit(400):
+        pass
+
+
+def test_shed_llm_call_falls_back_to_rule_based_answer(monkeypatch):
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    from backend import graph
+
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="LLM yanıtı")]))
+    monkeypatch.setattr(graph, "LLM_WITH_TOOLS", model)
+    monkeypatch.setattr(graph, "RESPONSE_CACHE", None)
+    monkeypatch.setattr(graph, "LLM_ADMISSION", AdmissionController(requests_per_minute=1, max_wait=0.0))
+
+    first = graph.run_agent("admission-a", "Merhaba")
+    second = graph.run_agent("admission-b", "Merhaba")
+
+    assert first["response"] == "LLM yanıtı"
+    assert first["metadata"]["llm_shed"] is False
+    assert second["metadata"]["llm_shed"] is True
+    assert second["response"] != "LLM yanıtı"
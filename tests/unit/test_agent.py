@@ -1,6 +1,8 @@
 """Unit tests covering the LangGraph agent orchestration."""
 
-from backend.graph import run_agent
+import asyncio
+
+from backend.graph import arun_agent, astream_agent, run_agent
 
 
 def test_faq_route_returns_kb_snippet():
@@ -13,3 +15,19 @@ def test_tool_route_invokes_order_status():
     result = run_agent(session_id="sess-tool", user_input="12345 sipariş durumum ne?")
     assert result["metadata"]["intent"] == "tool"
     assert "12345" in result["response"]
+
+
+def test_arun_agent_matches_sync_route():
+    result = asyncio.run(arun_agent(session_id="sess-async", user_input="İade politikası nedir?"))
+    assert result["metadata"]["intent"] == "faq"
+    assert "iade" in result["response"].lower()
+
+
+def test_astream_agent_without_llm_yields_final_event_only():
+    async def collect():
+        return [event async for event in astream_agent("sess-stream", "12345 sipariş durumum ne?")]
+
+    events = asyncio.run(collect())
+    assert [event["type"] for event in events] == ["response"]
+    assert "12345" in events[0]["response"]
+    assert events[0]["metadata"]["intent"] == "tool"
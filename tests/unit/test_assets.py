@@ -0,0 +1,89 @@
+"""Unit tests for the widget asset pipeline."""
+
+import gzip
+
+from backend.assets import AssetPipeline, asset_response, minify_css, minify_js, negotiate_encoding
+
+
+def test_minify_css_keeps_strings_and_descendant_pseudo_selectors():
+    source = """
+    /* header */
+    .chat  a :hover ,
+    .chat > b {
+        content: "a  ;  b" ;
+        margin : 0 auto;
+    }
+    """
+    assert minify_css(source) == '.chat a :hover,.chat>b{content:"a  ;  b";margin :0 auto}'
+
+
+def test_minify_js_strips_comments_but_not_literals():
+    source = """
+    // leading comment
+    const url = "https://example.com"; /* inline */
+    const trimmed = url.replace(/\\/$/, '');
+    const html = `
+      <b>${ value ? `x // y` : "z" }</b>`;
+    let i = 1
+    i = i + +2
+    return typeof /a\\/b/.source
+    """
+    minified = minify_js(source)
+    assert minified == (
+        'const url="https://example.com";\n'
+        "const trimmed=url.replace(/\\/$/,'');\n"
+        "const html=`\n      <b>${ value ? `x // y` : \"z\" }</b>`;\n"
+        "let i=1\n"
+        "i=i+ +2\n"
+        "return typeof/a\\/b/.source\n"
+    )
+    assert minify_js(minified) == minified
+
+
+def _pipeline(tmp_path, css="#w { color : red; }", brotli=None):
+    (tmp_path / "widget.css").write_text(css, encoding="utf-8")
+    (tmp_path / "widget.js").write_text(
+        "// loader\nlink.href = buildAssetUrl('/static/widget.css');\n" * 20, encoding="utf-8"
+    )
+    return AssetPipeline(tmp_path, ["widget.css", "widget.js", "missing.js"], brotli=brotli)
+
+
+def test_pipeline_fingerprints_and_rewrites_references(tmp_path):
+    pipeline = _pipeline(tmp_path)
+    manifest = pipeline.build()
+    assert set(manifest) == {"widget.css", "widget.js"}
+    css_name = manifest["widget.css"]
+    assert css_name.startswith("widget.") and css_name.endswith(".css") and css_name != "widget.css"
+
+    script = pipeline.get("widget.js")
+    assert f"/static/{css_name}".encode() in script.bodies["identity"]
+    assert gzip.decompress(script.bodies["gzip"]) == script.bodies["identity"]
+    assert pipeline.lookup(script.hashed_name) == (script, True)
+    assert pipeline.lookup("widget.js") == (script, False)
+
+    # A stylesheet change moves the script's fingerprint too, since it embeds the URL.
+    changed = _pipeline(tmp_path, css="#w { color: blue; }").build()
+    assert changed["widget.css"] != css_name
+    assert changed["widget.js"] != manifest["widget.js"]
+
+
+def test_encoding_negotiation_and_conditional_requests(tmp_path):
+    pipeline = _pipeline(tmp_path, brotli=lambda data: b"br:" + data[:8])
+    script = pipeline.get("widget.js")
+
+    assert negotiate_encoding(script, "gzip, deflate, br") == "br"
+    assert negotiate_encoding(script, "br;q=0, gzip") == "gzip"
+    assert negotiate_encoding(script, "") == "identity"
+
+    response = asset_response(script, {"accept-encoding": "gzip"}, "no-cache")
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.body == script.bodies["gzip"]
+    etag = response.headers["etag"]
+    assert etag != script.etag
+
+    revalidated = asset_response(script, {"accept-encoding": "gzip", "if-none-match": etag}, "no-cache")
+    assert revalidated.status_code == 304
+    assert revalidated.body == b""
+    assert asset_response(script, {"if-none-match": '"stale"'}, "no-cache").status_code == 200
@@ -0,0 +1,166 @@
+"""Unit tests for batch runs of chat turns."""
+
+import asyncio
+import json
+
+import pytest
+
+from backend import batch, graph
+from backend.batch import parse_items, parse_ndjson, run_batch
+from backend.sessions import SessionCoordinator
+
+
+def _run(items, **kwargs):
+    async def scenario():
+        return [line async for line in run_batch(items, **kwargs)]
+
+    *lines, status = asyncio.run(scenario())
+    assert status["done"] is True
+    return lines, status
+
+
+def _collect(items, **kwargs):
+    return _run(items, **kwargs)[0]
+
+
+@pytest.fixture
+def fake_agent(monkeypatch):
+    calls = []
+    running = {"now": 0, "peak": 0}
+
+    async def arun_agent(session_id, user_input, persist=True):
+        assert persist is False
+        calls.append((session_id, user_input))
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        # Later items of a session finish first if they are not serialized.
+        await asyncio.sleep(0.02 if user_input.endswith("1") else 0.005)
+        running["now"] -= 1
+        if user_input == "patla":
+            raise RuntimeError("bozuldu")
+        return {"response": f"yanıt: {user_input}", "metadata": {"intent": "general"}}
+
+    monkeypatch.setattr(graph, "arun_agent", arun_agent)
+    return calls, running
+
+
+@pytest.fixture
+def persisted(monkeypatch):
+    batches = []
+
+    async def apersist_turns(turns):
+        batches.append([(turn.session_id, turn.user_message) for turn in turns])
+
+    monkeypatch.setattr(batch, "apersist_turns", apersist_turns)
+    return batches
+
+
+def test_parse_items_accepts_body_and_assigns_sessions():
+    records = parse_ndjson(['{"message": "Merhaba", "session_id": "s1"}', "", '{"body": "İade?", "id": 7}'])
+    items = parse_items(records, session_prefix="replay")
+    assert [(item.index, item.session_id, item.message, item.id) for item in items] == [
+        (0, "s1", "Merhaba", None),
+        (1, "replay-1", "İade?", 7),
+    ]
+    with pytest.raises(ValueError, match="line 2"):
+        parse_ndjson(['{"message": "a"}', "{bozuk"])
+    with pytest.raises(ValueError, match="item 1"):
+        parse_items([{"message": "a"}, {"session_id": "s"}])
+
+
+def test_sessions_run_in_order_and_in_parallel(fake_agent, persisted):
+    calls, running = fake_agent
+    items = parse_items(
+        [{"session_id": f"s{session}", "message": f"m{turn}"} for turn in (1, 2) for session in range(4)]
+    )
+    lines = _collect(items, concurrency=2, persist_batch_size=3)
+
+    assert sorted(line["index"] for line in lines) == list(range(8))
+    for session in range(4):
+        assert [message for sid, message in calls if sid == f"s{session}"] == ["m1", "m2"]
+    assert running["peak"] == 2
+    assert all(line["latency_ms"] > 0 and line["response"].startswith("yanıt") for line in lines)
+    # Grouped writes: 8 turns in batches of at most 3, the remainder flushed at the end.
+    assert [len(group) for group in persisted] == [3, 3, 2]
+
+
+def test_results_stream_in_completion_order(fake_agent, persisted):
+    items = parse_items([{"session_id": "slow", "message": "m1"}, {"session_id": "fast", "message": "m2"}])
+    lines = _collect(items, concurrency=2)
+    assert [line["session_id"] for line in lines] == ["fast", "slow"]
+
+
+def test_failed_items_are_reported_and_not_persisted(fake_agent, persisted):
+    items = parse_items([{"session_id": "s", "message": "patla"}, {"session_id": "s", "message": "sonra"}])
+    lines, status = _run(items)
+    lines.sort(key=lambda line: line["index"])
+    assert lines[0]["error"] == "bozuldu"
+    assert lines[1]["response"] == "yanıt: sonra"
+    assert persisted == [[("s", "sonra")]]
+    assert status == {"done": True, "persisted": 1, "persist_failed": 0}
+
+
+def test_failed_writes_are_reported_in_the_closing_record(fake_agent, monkeypatch):
+    writes = []
+
+    async def apersist_turns(turns):
+        writes.append(len(turns))
+        if len(writes) == 1:
+            raise RuntimeError("veritabanı kapalı")
+
+    monkeypatch.setattr(batch, "apersist_turns", apersist_turns)
+    items = parse_items([{"session_id": f"s{index}", "message": "m2"} for index in range(5)])
+    lines, status = _run(items, persist_batch_size=2)
+
+    assert len(lines) == 5 and not any("error" in line for line in lines)
+    assert writes == [2, 2, 1]
+    assert status == {"done": True, "persisted": 3, "persist_failed": 2}
+
+
+def test_replay_summary_counts_lost_writes(fake_agent, monkeypatch, tmp_path, capsys):
+    async def apersist_turns(turns):
+        raise RuntimeError("veritabanı kapalı")
+
+    async def init_db():
+        pass
+
+    monkeypatch.setattr(batch, "apersist_turns", apersist_turns)
+    monkeypatch.setattr("backend.database.init_db", init_db)
+    source = tmp_path / "replay.jsonl"
+    source.write_text('{"message": "m2"}\n{"message": "m2"}\n', encoding="utf-8")
+    monkeypatch.setattr("sys.argv", ["backend.batch", str(source)])
+
+    with pytest.raises(SystemExit) as exit_info:
+        batch.main()
+
+    assert exit_info.value.code == 1
+    output = capsys.readouterr()
+    assert len(output.out.splitlines()) == 2
+    summary = json.loads(output.err.splitlines()[-1])
+    assert (summary["items"], summary["failed"], summary["persisted"], summary["persist_failed"]) == (2, 0, 0, 2)
+
+
+def test_coordinator_deduplicates_message_ids(fake_agent, persisted):
+    calls, _ = fake_agent
+    items = parse_items([{"session_id": "s", "message": "m2", "message_id": "x"}] * 2)
+    lines = _collect(items, coordinator=SessionCoordinator())
+    assert len(calls) == 1
+    assert [line["response"] for line in lines] == ["yanıt: m2"] * 2
+    assert len(persisted[0]) == 1
+
+
+def test_retriever_node_uses_prefetched_results(monkeypatch):
+    state = {"messages": [graph.HumanMessage(content="İade politikası nedir?")], "context": {}}
+    prefetched = graph.prefetch_retrieval(["İade politikası nedir?", "İade politikası nedir?"])
+    assert list(prefetched) == ["İade politikası nedir?"]
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("retrieval should come from the batch prefetch")
+
+    monkeypatch.setattr(graph, "mini_rag_search", unexpected)
+    token = graph.BATCH_RETRIEVAL.set(prefetched)
+    try:
+        result = graph.retriever_node(state)
+    finally:
+        graph.BATCH_RETRIEVAL.reset(token)
+    assert result["context"]["kb"] == prefetched["İade politikası nedir?"]
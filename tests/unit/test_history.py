@@ -0,0 +1,22 @@
+"""Unit tests for transcript cursors."""
+
+import uuid
+from datetime import datetime
+
+import pytest
+
+from backend.history import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at, message_id = datetime(2025, 11, 15, 10, 30, 0, 123456), uuid.uuid4()
+    cursor = encode_cursor(created_at, message_id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, message_id)
+
+
+@pytest.mark.parametrize("cursor", ["bozuk", "", encode_cursor(datetime(2025, 1, 1), uuid.uuid4())[:-6]])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,59 @@
+"""Unit tests for the compiled intent classifier."""
+
+import re
+
+from backend.intents import DEFAULT_INTENTS, IntentClassifier, IntentSpec, trie_pattern
+
+CLASSIFIER = IntentClassifier.from_config(DEFAULT_INTENTS)
+
+
+def test_trie_pattern_prefers_longest_keyword():
+    pattern = re.compile(trie_pattern(["kargo", "kargo ucret", "kapida"]))
+    assert pattern.findall("kargo ucreti ve kargo kapida") == ["kargo ucret", "kargo", "kapida"]
+
+
+def test_classifies_bundled_intents_with_entities():
+    order = CLASSIFIER.classify("12345 numaralı siparişim nerede?")
+    assert (order.category, order.tool) == ("tool", "check_order_status")
+    assert order.entities["order_id"] == "12345"
+
+    shipping = CLASSIFIER.classify("İzmir için kargo ücreti ne kadar?")
+    assert shipping.tool == "calculate_shipping"
+    assert shipping.entities["city"] == "izmir"
+
+    faq = CLASSIFIER.classify("İADE politikası nedir?")
+    assert faq.category == "faq"
+    assert faq.confidence == 1.0
+
+
+def test_numbers_inside_faq_questions_do_not_pick_a_tool():
+    for classifier in (CLASSIFIER, IntentClassifier.from_file("knowledge/intents.json")):
+        year = classifier.classify("2024 iade politikası nedir")
+        assert (year.category, year.tool) == ("faq", None)
+        assert year.entities["order_id"] == "2024"
+
+        free_shipping = classifier.classify("1500 TL üstü kargo ücretsiz mi?")
+        assert (free_shipping.category, free_shipping.tool) == ("faq", None)
+
+        assert classifier.classify("2024 yılında ne değişti?").category == "general"
+        # Keyword weights decide mixed messages: "sipariş" (1.5) outranks "iade" (1.0).
+        assert classifier.classify("siparişimi iade etmek istiyorum").tool == "check_order_status"
+
+
+def test_unmatched_text_falls_back_to_default_intent():
+    match = CLASSIFIER.classify("Merhaba, nasılsınız?")
+    assert match.category == "general"
+    assert match.confidence == 0.0
+
+
+def test_keywords_match_only_at_word_starts():
+    assert CLASSIFIER.classify("border collie").category == "general"
+
+
+def test_scales_to_hundreds_of_intents():
+    intents = [
+        IntentSpec(name=f"intent{index}", category="tool", keywords={f"anahtar{index}kelime": 1.0})
+        for index in range(500)
+    ]
+    classifier = IntentClassifier(intents)
+    assert classifier.classify("lütfen anahtar417kelime çalıştır").name == "intent417"
@@ -0,0 +1,129 @@
+"""Unit tests for streaming knowledge base loaders and the mmap index."""
+
+import json
+import os
+import struct
+
+import pytest
+
+from backend.kb_index import MmapBM25Index, build_index
+from backend.knowledge import KnowledgeBaseManager
+from backend.rag_setup import BM25Retriever, iter_knowledge_entries, load_knowledge_entries
+
+ENTRIES = {
+    "iade": "İade politikası: 14 gün içinde iade hakkınız bulunmaktadır.",
+    "kargo": "Kargo süresi: Ortalama teslimat 2-4 iş günüdür.",
+    "odeme": "Ödeme seçenekleri: Kredi kartı, banka kartı veya kapıda ödeme.",
+}
+
+
+def test_jsonl_and_shard_directory_are_streamed(tmp_path):
+    shards = tmp_path / "kb"
+    shards.mkdir()
+    (shards / "01.jsonl").write_text(
+        json.dumps({"key": "iade", "text": ENTRIES["iade"]}, ensure_ascii=False)
+        + "\n\n"
+        + json.dumps(ENTRIES["kargo"], ensure_ascii=False)
+        + "\n",
+        encoding="utf-8",
+    )
+    (shards / "02.json").write_text(json.dumps({"garanti": "2 yıl"}), encoding="utf-8")
+    (shards / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    entries = dict(iter_knowledge_entries(shards))
+
+    assert entries == {
+        "iade": ENTRIES["iade"],
+        ENTRIES["kargo"]: ENTRIES["kargo"],
+        "garanti": "garanti: 2 yıl",
+    }
+    assert load_knowledge_entries(shards) == entries
+
+
+def test_mmap_index_matches_in_memory_retriever(tmp_path):
+    index_path = tmp_path / "kb.idx"
+    assert build_index(ENTRIES.items(), index_path) == 3
+
+    index = MmapBM25Index(index_path)
+    retriever = BM25Retriever(ENTRIES.values(), ENTRIES.keys())
+    try:
+        assert list(index) == list(retriever)
+        for query in ["iade politikası", "kargo", "ÖDEME kart", "bilinmeyen"]:
+            assert index.search(query, k=2) == retriever.search(query, k=2)
+            assert index.scores(query) == retriever.scores(query)
+    finally:
+        index.close()
+
+
+def test_opposite_byte_order_host_swaps_on_write_and_read(tmp_path, monkeypatch):
+    from backend import kb_index
+
+    little_path = tmp_path / "little.idx"
+    build_index(ENTRIES.items(), little_path)
+    monkeypatch.setattr(kb_index, "_BYTESWAP", True)
+    swapped_path = tmp_path / "swapped.idx"
+    build_index(ENTRIES.items(), swapped_path)
+    assert swapped_path.read_bytes() != little_path.read_bytes()
+
+    index = MmapBM25Index(swapped_path)
+    retriever = BM25Retriever(ENTRIES.values(), ENTRIES.keys())
+    try:
+        assert list(index) == list(retriever)
+        assert index.scores("iade politikası") == retriever.scores("iade politikası")
+    finally:
+        index.close()
+
+
+def test_manager_prefers_prebuilt_index(tmp_path):
+    index_path = tmp_path / "kb.idx"
+    build_index(ENTRIES.items(), index_path)
+
+    manager = KnowledgeBaseManager(tmp_path / "missing.json", index_path)
+    assert isinstance(manager.retriever, MmapBM25Index)
+    assert manager.retriever.search("kargo", k=1) == [ENTRIES["kargo"]]
+
+    build_index({**ENTRIES, "garanti": "Garanti 2 yıl"}.items(), index_path)
+    assert manager.reload(force=True)
+    assert len(manager.retriever) == 4
+
+
+def test_outdated_index_is_rejected_and_source_used(tmp_path):
+    source = tmp_path / "kb.json"
+    source.write_text(json.dumps(list(ENTRIES.values()), ensure_ascii=False), encoding="utf-8")
+    index_path = tmp_path / "kb.idx"
+    # Header of the first format, written before "ı" folded to "i".
+    index_path.write_bytes(struct.pack("<8sIIQQ", b"WCKBIDX1", 0, 0, 0, 0) + b"\0" * 16)
+
+    with pytest.raises(ValueError, match="eski biçimde"):
+        MmapBM25Index(index_path)
+
+    manager = KnowledgeBaseManager(source, index_path)
+    assert isinstance(manager.retriever, BM25Retriever)
+    assert manager.retriever.search("kapida odeme", k=1) == [ENTRIES["odeme"]]
+    assert not manager.reload()
+
+    # While the index is refused, edits to the source are still hot-reloaded.
+    edited = [*ENTRIES.values(), "Garanti süresi 2 yıldır."]
+    source.write_text(json.dumps(edited, ensure_ascii=False), encoding="utf-8")
+    os.utime(source, ns=(2_000_000_000, 2_000_000_000))
+    assert manager.reload()
+    assert isinstance(manager.retriever, BM25Retriever)
+    assert manager.retriever.search("garanti", k=1) == ["Garanti süresi 2 yıldır."]
+
+    build_index(ENTRIES.items(), index_path)
+    assert manager.reload()
+    assert isinstance(manager.retriever, MmapBM25Index)
+    assert len(manager.retriever) == 3
+
+
+def test_index_built_with_other_normalization_is_rejected(tmp_path, monkeypatch):
+    from backend import kb_index
+
+    monkeypatch.setattr(kb_index, "NORMALIZATION_VERSION", 1)
+    index_path = tmp_path / "kb.idx"
+    build_index(ENTRIES.items(), index_path)
+    monkeypatch.undo()
+
+    with pytest.raises(ValueError, match="v1"):
+        MmapBM25Index(index_path)
+
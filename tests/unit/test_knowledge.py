@@ -0,0 +1,50 @@
+"""Unit tests for knowledge base hot reloading and incremental indexing."""
+
+import json
+import os
+
+from backend.knowledge import KnowledgeBaseManager
+from backend.rag_setup import BM25Retriever
+
+
+def _write(path, data, mtime_ns):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_incremental_update_matches_full_rebuild():
+    base = BM25Retriever(["iade 14 gün", "kargo 3 gün", "ödeme kartı"], ["iade", "kargo", "odeme"])
+    updated = base.with_changes({"kargo": "kargo 2 gün ücretsiz", "garanti": "garanti 2 yıl"}, ["odeme"])
+    rebuilt = BM25Retriever(
+        ["iade 14 gün", "kargo 2 gün ücretsiz", "garanti 2 yıl"], ["iade", "kargo", "garanti"]
+    )
+
+    for query in ["kargo", "gün", "garanti yıl", "ödeme"]:
+        assert updated.search(query, k=3) == rebuilt.search(query, k=3)
+    assert sorted(updated) == sorted(rebuilt)
+    assert base.search("ödeme", k=1) == ["ödeme kartı"]
+
+
+def test_manager_reloads_changed_file(tmp_path):
+    kb_file = tmp_path / "kb.json"
+    _write(kb_file, {"iade": "14 gün içinde iade"}, 1_000_000_000)
+    manager = KnowledgeBaseManager(kb_file)
+    snapshot = manager.retriever
+
+    assert manager.reload() is False
+
+    _write(kb_file, {"iade": "30 gün içinde iade", "kargo": "2 günde teslim"}, 2_000_000_000)
+    assert manager.reload() is True
+    assert manager.version == 2
+    assert manager.retriever.search("kargo", k=1) == ["kargo: 2 günde teslim"]
+    assert snapshot.search("iade", k=1) == ["iade: 14 gün içinde iade"]
+
+
+def test_manager_keeps_snapshot_on_invalid_file(tmp_path):
+    kb_file = tmp_path / "kb.json"
+    _write(kb_file, {"iade": "14 gün"}, 1_000_000_000)
+    manager = KnowledgeBaseManager(kb_file)
+
+    kb_file.write_text("{bozuk", encoding="utf-8")
+    assert manager.reload(force=True) is False
+    assert manager.retriever.search("iade", k=1) == ["iade: 14 gün"]
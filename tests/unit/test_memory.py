@@ -0,0 +1,125 @@
+"""Unit tests for checkpointed conversation memory and the history window."""
+
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from backend import graph
+from backend.memory import (
+    CachedCheckpointSaver,
+    extractive_summary,
+    split_for_summary,
+    trim_history,
+)
+
+
+class RecordingModel:
+    def __init__(self) -> None:
+        self.prompts = []
+
+    def invoke(self, messages):
+        self.prompts.append(messages)
+        return AIMessage(content=f"cevap {len(self.prompts)}")
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+class CountingSaver(MemorySaver):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reads = 0
+
+    def get_tuple(self, config):
+        self.reads += 1
+        return super().get_tuple(config)
+
+
+def _turns(count):
+    messages = []
+    for index in range(count):
+        messages += [
+            HumanMessage(content=f"soru {index}", id=f"h{index}"),
+            AIMessage(content=f"cevap {index}", id=f"a{index}"),
+        ]
+    return messages
+
+
+def test_split_folds_half_of_the_window():
+    folded, kept = split_for_summary(_turns(5), max_turns=4)
+    assert [message.content for message in kept] == ["soru 3", "cevap 3", "soru 4", "cevap 4"]
+    assert len(folded) == 6
+    assert split_for_summary(_turns(4), max_turns=4)[0] == []
+
+
+def test_extractive_summary_keeps_newest_lines():
+    summary = extractive_summary("eski özet", _turns(30), max_chars=60)
+    assert len(summary) <= 60
+    assert summary.endswith("Asistan: cevap 29")
+
+
+def test_trim_history_respects_token_budget():
+    trimmed = trim_history(_turns(20), max_tokens=30)
+    assert trimmed and isinstance(trimmed[0], HumanMessage)
+    assert trimmed[-1].content == "cevap 19"
+    assert len(trimmed) < 40
+
+
+def test_llm_sees_previous_turns(monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(graph, "LLM_WITH_TOOLS", model)
+    monkeypatch.setattr(graph, "RESPONSE_CACHE", None)
+
+    graph.run_agent("memory-1", "Merhaba, adım Ayşe")
+    asyncio.run(graph.arun_agent("memory-1", "Adımı hatırlıyor musun?"))
+
+    contents = [message.content for message in model.prompts[-1]]
+    assert "Merhaba, adım Ayşe" in contents
+    assert "cevap 1" in contents
+    assert contents[-1] == "Adımı hatırlıyor musun?"
+
+
+def test_old_turns_are_folded_into_summary(monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(graph, "LLM_WITH_TOOLS", model)
+    monkeypatch.setattr(graph, "RESPONSE_CACHE", None)
+    monkeypatch.setattr(graph.settings, "HISTORY_MAX_TURNS", 4)
+
+    for index in range(9):
+        graph.run_agent("memory-2", f"mesaj {index}")
+
+    state = graph.graph_app.get_state({"configurable": {"thread_id": "memory-2"}}).values
+    human_turns = [message for message in state["messages"] if isinstance(message, HumanMessage)]
+    assert len(human_turns) <= 4
+    assert "mesaj 0" in state["summary"]
+    assert any(
+        isinstance(message, SystemMessage) and "mesaj 0" in message.content
+        for message in model.prompts[-1]
+    )
+
+
+def test_hot_threads_skip_checkpoint_reads():
+    saver = CountingSaver()
+    cached = CachedCheckpointSaver(saver, maxsize=10)
+    config = {"configurable": {"thread_id": "t", "checkpoint_ns": ""}}
+    checkpoint = {
+        "v": 1,
+        "id": "1",
+        "ts": "2024-01-01T00:00:00+00:00",
+        "channel_values": {"messages": [HumanMessage(content="selam")]},
+        "channel_versions": {},
+        "versions_seen": {},
+        "pending_sends": [],
+    }
+    cached.put(config, checkpoint, {"step": 0}, {})
+
+    first = cached.get_tuple(config)
+    first.checkpoint["channel_values"]["messages"].append(AIMessage(content="mutasyon"))
+    second = cached.get_tuple(config)
+    assert saver.reads == 0
+    assert len(second.checkpoint["channel_values"]["messages"]) == 1
+
+    cached.put_writes({"configurable": {**config["configurable"], "checkpoint_id": "1"}}, [], "task")
+    cached.get_tuple(config)
+    assert saver.reads == 1
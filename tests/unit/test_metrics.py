@@ -0,0 +1,72 @@
+"""Unit tests for bounded metrics, histograms and Prometheus rendering."""
+
+from backend.metrics import LatencyHistogram, MetricsState
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_histogram_quantiles_stay_within_bucket_bounds():
+    histogram = LatencyHistogram()
+    for _ in range(90):
+        histogram.observe(0.004)
+    for _ in range(10):
+        histogram.observe(0.8)
+
+    assert histogram.count == 100
+    assert 0.0025 <= histogram.quantile(0.5) <= 0.005
+    assert 0.5 <= histogram.quantile(0.99) <= 1.0
+    assert histogram.summary()["count"] == 100
+    assert LatencyHistogram().summary()["p99_ms"] == 0.0
+
+
+def test_idle_sessions_are_evicted_and_table_is_capped():
+    clock = FakeClock()
+    metrics = MetricsState(idle_timeout=60, max_sessions=3, clock=clock)
+
+    metrics.record_message("a", {"intent": "faq"})
+    clock.now = 30
+    metrics.record_message("b", {"intent": "tool", "tool": "check_order_status"})
+    clock.now = 70
+    metrics.register_session("c")
+    assert list(metrics.sessions) == ["b", "c"]
+
+    for session_id in "def":
+        metrics.register_session(session_id)
+    assert list(metrics.sessions) == ["d", "e", "f"]
+
+    snapshot = metrics.snapshot()
+    assert snapshot["total_messages"] == 2
+    assert snapshot["sessions"]["evicted_idle"] == 3
+    assert snapshot["intents"] == {"faq": 1, "tool": 1}
+
+
+def test_sessions_page_lists_most_recent_first():
+    metrics = MetricsState()
+    for index in range(5):
+        metrics.record_message(f"s{index}", {})
+
+    page = metrics.sessions_page(offset=1, limit=2)
+    assert page["total"] == 5
+    assert [item["session_id"] for item in page["sessions"]] == ["s3", "s2"]
+    assert page["sessions"][0]["message_count"] == 1
+
+
+def test_prometheus_exposition_contains_cumulative_histograms():
+    metrics = MetricsState()
+    metrics.record_message("s", {"intent": "faq", "cache_hit": True}, duration=0.02)
+    metrics.observe_node("retriever", 0.003)
+
+    text = metrics.render_prometheus({"webchat_llm_queue_length": 2})
+    assert 'webchat_intent_messages_total{intent="faq"} 1' in text
+    assert 'webchat_response_cache_total{result="hit"} 1' in text
+    assert 'webchat_turn_duration_seconds_bucket{le="0.025"} 1' in text
+    assert 'webchat_turn_duration_seconds_bucket{le="0.01"} 0' in text
+    assert 'webchat_node_duration_seconds_bucket{node="retriever",le="+Inf"} 1' in text
+    assert 'webchat_node_duration_seconds_count{node="retriever"} 1' in text
+    assert "webchat_llm_queue_length 2" in text
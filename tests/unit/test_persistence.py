@@ -0,0 +1,108 @@
+"""Unit tests for the write-behind persistence queue."""
+
+import threading
+
+from sqlalchemy import func, select
+
+from backend.database import SessionLocal
+from backend.models import Conversation, Message
+from backend.persistence import (
+    PendingTurn,
+    WriteBehindQueue,
+    conversation_ids,
+    persist_turns,
+    resolve_conversation_ids,
+)
+
+
+def _turn(session_id: str, text: str = "Merhaba") -> PendingTurn:
+    return PendingTurn(
+        session_id=session_id,
+        user_message=text,
+        ai_message="Cevap",
+        metadata={"intent": "general"},
+    )
+
+
+def test_queue_batches_and_flushes_on_stop():
+    batches = []
+    writer = WriteBehindQueue(batches.append, max_batch_size=3, max_delay=10.0)
+    for index in range(7):
+        assert writer.enqueue(_turn(f"s{index}"))
+
+    writer.stop()
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert writer.stats()["written"] == 7
+    assert writer.stats()["queue_depth"] == 0
+
+
+def test_flush_waits_for_pending_turns():
+    batches = []
+    writer = WriteBehindQueue(batches.append, max_batch_size=100, max_delay=10.0)
+    writer.enqueue(_turn("a"))
+    writer.enqueue(_turn("b"))
+
+    assert writer.flush(timeout=2)
+    assert sum(len(batch) for batch in batches) == 2
+    writer.stop()
+
+
+def test_full_queue_drops_and_counts():
+    release = threading.Event()
+
+    def blocking_writer(batch):
+        release.wait(2)
+
+    writer = WriteBehindQueue(blocking_writer, max_batch_size=1, max_delay=0, max_queue_size=1)
+    accepted = [writer.enqueue(_turn(f"s{index}")) for index in range(5)]
+    release.set()
+    writer.stop()
+
+    assert not all(accepted)
+    assert writer.stats()["dropped"] == accepted.count(False)
+
+
+def test_writer_failures_are_counted():
+    def failing_writer(batch):
+        raise RuntimeError("db down")
+
+    writer = WriteBehindQueue(failing_writer, max_batch_size=10, max_delay=0)
+    writer.enqueue(_turn("x"))
+    writer.stop()
+
+    assert writer.stats()["failed"] == 1
+    assert writer.stats()["written"] == 0
+
+
+def test_persist_turns_bulk_inserts_messages():
+    persist_turns([_turn("bulk-1", "ilk"), _turn("bulk-1", "ikinci"), _turn("bulk-2")])
+
+    with SessionLocal() as db:
+        conversations = db.scalars(
+            select(Conversation).where(Conversation.session_id.in_(["bulk-1", "bulk-2"]))
+        ).all()
+        message_count = db.scalar(
+            select(func.count(Message.id)).where(
+                Message.conversation_id.in_([conv.id for conv in conversations])
+            )
+        )
+
+    assert len(conversations) == 2
+    assert message_count == 6
+
+
+def test_conversation_ids_are_cached_and_upserted():
+    conversation_ids.clear()
+    with SessionLocal() as db:
+        first = resolve_conversation_ids(db, ["upsert-1"])
+        db.commit()
+    conversation_ids.clear()
+    with SessionLocal() as db:
+        second = resolve_conversation_ids(db, ["upsert-1", "upsert-1"])
+        db.commit()
+
+    assert first == second
+
+    persist_turns([_turn("upsert-1")])
+    assert conversation_ids.get("upsert-1") == first["upsert-1"]
@@ -0,0 +1,47 @@
+"""Unit tests for the knowledge base retriever."""
+
+from backend.rag_setup import BM25Retriever, load_knowledge_base, mini_rag_search
+
+DOCUMENTS = [
+    "İade politikası: 14 gün içinde iade hakkınız bulunmaktadır.",
+    "Kargo süresi: Ortalama teslimat 2-4 iş günüdür.",
+    "Ödeme seçenekleri: Kredi kartı, banka kartı veya kapıda ödeme.",
+]
+
+
+def test_search_ranks_best_match_first():
+    retriever = BM25Retriever(DOCUMENTS)
+    results = retriever.search("iade politikasi nedir?", k=2)
+    assert results[0] == DOCUMENTS[0]
+
+
+def test_search_ignores_case_diacritics_and_punctuation():
+    retriever = BM25Retriever(DOCUMENTS)
+    assert retriever.search("ODEME", k=1) == [DOCUMENTS[2]]
+    assert retriever.search("kargo?", k=1) == [DOCUMENTS[1]]
+
+
+def test_search_returns_nothing_without_overlap():
+    assert BM25Retriever(DOCUMENTS).search("hava durumu", k=2) == []
+
+
+def test_mini_rag_search_accepts_plain_lists_and_retrievers():
+    retriever = BM25Retriever(DOCUMENTS)
+    assert mini_rag_search("kargo", DOCUMENTS, k=1) == mini_rag_search("kargo", retriever, k=1)
+    assert len(retriever) == 3
+    assert retriever[1] == DOCUMENTS[1]
+
+
+def test_plain_lists_are_searched_as_they_are_now():
+    documents = list(DOCUMENTS)
+    assert mini_rag_search("kargo", documents, k=1) == [DOCUMENTS[1]]
+
+    # An in-place edit that keeps the length is picked up by the next call.
+    documents[1] = "Garanti süresi 2 yıldır."
+    assert mini_rag_search("kargo", documents, k=1) == []
+    assert mini_rag_search("garanti", documents, k=1) == ["Garanti süresi 2 yıldır."]
+
+
+def test_bundled_knowledge_base_answers_return_question():
+    knowledge_base = BM25Retriever(load_knowledge_base("knowledge/kb.json"))
+    assert "iade" in mini_rag_search("İade politikası nedir?", knowledge_base, k=2)[0].lower()
@@ -0,0 +1,84 @@
+"""Unit tests for the LLM response cache."""
+
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from backend import graph
+from backend.metrics import MetricsState
+from backend.response_cache import (
+    MemoryCacheBackend,
+    ResponseCache,
+    SQLiteCacheBackend,
+    normalize_query,
+)
+
+
+class CountingModel:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=f"LLM cevabı #{self.calls}")
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+def test_keys_ignore_case_diacritics_and_punctuation():
+    context = {"kb": ["kargo: 2-4 gün"]}
+    assert normalize_query("Kargo ne zaman gelir?") == normalize_query("kargo  NE zaman gelir")
+    assert ResponseCache.key_for("Kargo ne zaman gelir?", context) == ResponseCache.key_for(
+        "kargo ne zaman gelir", context
+    )
+
+
+def test_keys_change_with_context_and_namespace():
+    base = ResponseCache.key_for("sipariş", {"tool_result": "kargoda"}, "kb-v1")
+    assert base != ResponseCache.key_for("sipariş", {"tool_result": "teslim edildi"}, "kb-v1")
+    assert base != ResponseCache.key_for("sipariş", {"tool_result": "kargoda"}, "kb-v2")
+
+
+def test_sqlite_backend_evicts_least_recently_used(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.db", maxsize=2, ttl=None)
+    cache = ResponseCache(backend)
+    for key in ["a", "b", "c", "d"]:
+        cache.set(key, key.upper())
+    assert len(backend) == 2
+    assert cache.get("d") == "D"
+    assert cache.get("a") is None
+
+
+def test_sqlite_backend_expires_entries(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.db", maxsize=10, ttl=-1)
+    backend.set("a", "A")
+    assert backend.get("a") is None
+
+
+def test_graph_skips_llm_on_cache_hit(monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(graph, "LLM_WITH_TOOLS", model)
+    monkeypatch.setattr(graph, "RESPONSE_CACHE", ResponseCache(MemoryCacheBackend(100, None)))
+
+    first = graph.run_agent("cache-1", "Kargo ne zaman gelir?")
+    second = asyncio.run(graph.arun_agent("cache-2", "kargo ne zaman gelir"))
+
+    assert model.calls == 1
+    assert first["metadata"]["cache_hit"] is False
+    assert second["metadata"]["cache_hit"] is True
+    assert first["metadata"]["cache_lookup"] and second["metadata"]["cache_lookup"]
+    assert second["response"] == first["response"]
+
+
+def test_turns_without_a_lookup_are_not_cache_misses(monkeypatch):
+    monkeypatch.setattr(graph, "LLM_WITH_TOOLS", None)
+    metadata = graph.run_agent("cache-rules", "Kargo ne zaman gelir?")["metadata"]
+    assert metadata["cache_lookup"] is False
+
+    metrics = MetricsState()
+    metrics.record_message("cache-rules", metadata)
+    metrics.record_message("cache-llm", {"cache_lookup": True, "cache_hit": False})
+    metrics.record_message("cache-llm", {"cache_lookup": True, "cache_hit": True})
+    assert metrics.snapshot()["cache"] == {"hits": 1, "misses": 1}
+
@@ -0,0 +1,183 @@
+"""Unit tests for bucketed retention and archival on SQLite."""
+
+import gzip
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, create_mock_engine, func, insert, select
+
+from backend.database import Base
+from langgraph.checkpoint.base import empty_checkpoint
+
+from backend.memory import build_checkpointer, checkpoint_id_floor
+from backend.models import Conversation, Message
+from backend.persistence import conversation_ids
+from backend.retention import Bucket, RetentionManager, add_months, month_start
+
+NOW = datetime(2025, 6, 15, 12, 0)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _seed(engine, session_id, *timestamps):
+    conversation_id = uuid.uuid4()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Conversation), [{"id": conversation_id, "session_id": session_id, "created_at": timestamps[0]}]
+        )
+        connection.execute(
+            insert(Message),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "conversation_id": conversation_id,
+                    "sender": "user",
+                    "content": f"mesaj {index}",
+                    "metadata": {"intent": "faq"},
+                    "created_at": created_at,
+                }
+                for index, created_at in enumerate(timestamps)
+            ],
+        )
+    return conversation_id
+
+
+def test_month_arithmetic_and_bucket_names():
+    assert month_start(NOW) == datetime(2025, 6, 1)
+    assert add_months(datetime(2025, 11, 1), 2) == datetime(2026, 1, 1)
+    assert add_months(datetime(2025, 1, 1), -1) == datetime(2024, 12, 1)
+
+    bucket = Bucket(datetime(2025, 12, 1))
+    assert bucket.name == "messages_p2025_12"
+    assert bucket.end == datetime(2026, 1, 1)
+    assert Bucket.from_name(bucket.name) == bucket
+    assert Bucket.from_name("messages_default") is None
+
+
+def test_postgres_schema_creates_default_partition():
+    statements = []
+    engine = create_mock_engine("postgresql+psycopg2://", lambda sql, *args, **kwargs: statements.append(sql))
+    Base.metadata.create_all(engine, checkfirst=False)
+
+    ddl = [str(statement.compile(dialect=engine.dialect)) for statement in statements]
+    messages = next(index for index, sql in enumerate(ddl) if sql.strip().startswith("CREATE TABLE messages "))
+    assert "PARTITION BY RANGE (created_at)" in ddl[messages]
+    assert "CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT" in ddl[messages + 1 :]
+
+
+def test_expired_months_are_archived_then_deleted(engine, tmp_path):
+    old = _seed(engine, "old", datetime(2025, 1, 10), datetime(2025, 2, 3))
+    _seed(engine, "mixed", datetime(2025, 2, 20), datetime(2025, 3, 20), datetime(2025, 6, 1))
+    checkpointer = build_checkpointer("memory", "", cache_size=10, cache_ttl=None)
+    checkpointer.saver.storage["old"]["ns"] = {}
+    checkpointer.saver.storage["mixed"]["ns"] = {}
+    conversation_ids.set("old", old)
+
+    manager = RetentionManager(
+        engine,
+        retention_days=90,
+        archive_dir=tmp_path / "archive",
+        checkpointer=checkpointer,
+        clock=lambda: NOW,
+    )
+    summary = manager.run_once()
+
+    # Cutoff is 2025-03-17: January and February are whole months past it, March is not.
+    assert summary["buckets"] == ["messages_p2025_01", "messages_p2025_02"]
+    assert summary["archived_rows"] == 3
+    assert summary["deleted_conversations"] == 1
+
+    with gzip.open(tmp_path / "archive" / "messages_p2025_02.jsonl.gz", "rt", encoding="utf-8") as handle:
+        archived = [json.loads(line) for line in handle]
+    assert [(row["session_id"], row["created_at"]) for row in archived] == [
+        ("old", "2025-02-03T00:00:00"),
+        ("mixed", "2025-02-20T00:00:00"),
+    ]
+    assert archived[0]["metadata"] == {"intent": "faq"}
+
+    with engine.connect() as connection:
+        remaining = connection.scalars(select(Message.created_at).order_by(Message.created_at)).all()
+        sessions = connection.scalars(select(Conversation.session_id)).all()
+    assert remaining == [datetime(2025, 3, 20), datetime(2025, 6, 1)]
+    assert sessions == ["mixed"]
+    assert conversation_ids.get("old") is None
+    assert "old" not in checkpointer.saver.storage
+    assert "mixed" in checkpointer.saver.storage
+
+    assert manager.run_once()["buckets"] == []
+    assert manager.stats()["dropped_buckets"] == 2
+
+
+def test_without_retention_window_nothing_is_deleted(engine, tmp_path):
+    _seed(engine, "old", datetime(2020, 1, 1))
+    manager = RetentionManager(engine, retention_days=None, archive_dir=tmp_path, clock=lambda: NOW)
+
+    assert manager.run_once()["buckets"] == []
+    with engine.connect() as connection:
+        assert connection.scalar(select(func.count()).select_from(Message)) == 1
+
+
+def test_parquet_archive(engine, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _seed(engine, "old", datetime(2025, 1, 10))
+    manager = RetentionManager(
+        engine, retention_days=30, archive_dir=tmp_path, archive_format="parquet", clock=lambda: NOW
+    )
+
+    manager.run_once()
+
+    table = pq.read_table(tmp_path / "messages_p2025_01.parquet")
+    assert table.column("session_id").to_pylist() == ["old"]
+
+
+def _checkpoint(checkpointer, thread_id, taken_at, *texts):
+    checkpoint = empty_checkpoint()
+    # A real id from that moment: the floor plus a random-looking node part.
+    checkpoint["id"] = checkpoint_id_floor(taken_at)[:-12] + "0123456789ab"
+    checkpoint["channel_values"] = {"messages": list(texts)}
+    checkpointer.put({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}, checkpoint, {}, {})
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "memory"])
+def test_expired_messages_are_pruned_from_checkpoints(engine, tmp_path, backend):
+    _seed(engine, "mixed", datetime(2025, 2, 20), datetime(2025, 6, 1))
+    _seed(engine, "idle", datetime(2025, 2, 21))
+    checkpointer = build_checkpointer(backend, tmp_path / "checkpoints.db", cache_size=10, cache_ttl=None)
+    _checkpoint(checkpointer, "mixed", datetime(2025, 2, 20), "mesaj 0")
+    _checkpoint(checkpointer, "mixed", datetime(2025, 6, 1), "özet", "mesaj 1")
+    _checkpoint(checkpointer, "idle", datetime(2025, 2, 21), "mesaj 0")
+    # Warm the latest-checkpoint cache so deleting the thread has to invalidate it.
+    assert checkpointer.get_tuple({"configurable": {"thread_id": "idle"}}) is not None
+
+    manager = RetentionManager(engine, retention_days=90, checkpointer=checkpointer, clock=lambda: NOW)
+    summary = manager.run_once()
+
+    # "idle" lost its only message, so its thread goes with the conversation;
+    # "mixed" keeps its conversation but not the checkpoint from February.
+    assert summary["deleted_conversations"] == 1
+    assert summary["pruned_checkpoints"] == 1
+    stored = [
+        value
+        for thread_id in ("mixed", "idle")
+        for saved in checkpointer.list({"configurable": {"thread_id": thread_id}})
+        for value in saved.checkpoint["channel_values"]["messages"]
+    ]
+    assert stored == ["özet", "mesaj 1"]
+    assert checkpointer.get_tuple({"configurable": {"thread_id": "idle"}}) is None
+    assert manager.stats()["pruned_checkpoints"] == 1
+
+
+def test_checkpoint_id_floor_orders_like_langgraph_ids():
+    from langgraph.checkpoint.base.id import uuid6
+
+    now = datetime.utcnow()
+    assert checkpoint_id_floor(now - timedelta(seconds=1)) < str(uuid6()) < checkpoint_id_floor(now + timedelta(seconds=1))
+
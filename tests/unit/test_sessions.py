@@ -0,0 +1,75 @@
+"""Unit tests for per-session serialization and idempotent retries."""
+
+import asyncio
+
+import pytest
+
+from backend.sessions import SessionCoordinator
+
+
+def test_turns_of_one_session_never_overlap_but_sessions_do():
+    coordinator = SessionCoordinator()
+    running = {"a": 0, "b": 0}
+    peaks = {"a": 0, "b": 0}
+    overlap = []
+
+    def turn(session_id):
+        async def _turn():
+            running[session_id] += 1
+            peaks[session_id] = max(peaks[session_id], running[session_id])
+            overlap.append(running["a"] and running["b"])
+            await asyncio.sleep(0.01)
+            running[session_id] -= 1
+            return session_id
+
+        return _turn
+
+    async def scenario():
+        await asyncio.gather(
+            *(coordinator.run(session_id, None, turn(session_id)) for session_id in "aabbab")
+        )
+
+    asyncio.run(scenario())
+    assert peaks == {"a": 1, "b": 1}
+    assert any(overlap)
+    assert coordinator.stats()["active_sessions"] == 0
+
+
+def test_retry_with_same_message_id_attaches_to_in_flight_turn():
+    coordinator = SessionCoordinator()
+    calls = []
+
+    async def turn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"response": f"yanıt {len(calls)}"}
+
+    async def scenario():
+        first, retry = await asyncio.gather(
+            coordinator.run("s", "m-1", turn), coordinator.run("s", "m-1", turn)
+        )
+        later = await coordinator.run("s", "m-1", turn)
+        return first, retry, later
+
+    first, retry, later = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first == ({"response": "yanıt 1"}, False)
+    assert retry == later == ({"response": "yanıt 1"}, True)
+
+
+def test_failed_turn_can_be_retried():
+    coordinator = SessionCoordinator()
+    attempts = []
+
+    async def turn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("geçici hata")
+        return "tamam"
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await coordinator.run("s", "m-2", turn)
+        return await coordinator.run("s", "m-2", turn)
+
+    assert asyncio.run(scenario()) == ("tamam", False)
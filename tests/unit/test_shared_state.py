@@ -0,0 +1,65 @@
+"""Unit tests for shared worker state and cross-worker metric aggregation."""
+
+import time
+
+import pytest
+
+from backend.metrics import MetricsState
+from backend.shared_state import MemorySharedState, SQLiteSharedState
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def shared_state(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteSharedState(tmp_path / "shared.db")
+    return MemorySharedState()
+
+
+def test_publish_collect_and_remove(shared_state):
+    shared_state.publish("metrics", "host:1", {"total": 1})
+    shared_state.publish("metrics", "host:2", {"total": 2})
+    shared_state.publish("metrics", "host:1", {"total": 3})
+    shared_state.publish("other", "host:1", {"total": 9})
+
+    assert shared_state.collect("metrics") == {"host:1": {"total": 3}, "host:2": {"total": 2}}
+
+    shared_state.remove("metrics", "host:2")
+    assert shared_state.collect("metrics") == {"host:1": {"total": 3}}
+
+
+def test_stale_entries_are_ignored(shared_state):
+    shared_state.publish("metrics", "host:1", {"total": 1})
+    time.sleep(0.05)
+    shared_state.publish("metrics", "host:2", {"total": 2})
+
+    assert set(shared_state.collect("metrics", ttl=0.03)) == {"host:2"}
+
+
+def test_sqlite_state_is_visible_to_other_connections(tmp_path):
+    SQLiteSharedState(tmp_path / "shared.db").publish("metrics", "host:1", {"total": 1})
+    assert SQLiteSharedState(tmp_path / "shared.db").collect("metrics") == {"host:1": {"total": 1}}
+
+
+def test_merge_sums_worker_exports():
+    first, second = MetricsState(), MetricsState()
+    first.record_message("a", {"intent": "faq", "cache_lookup": True}, 0.01)
+    first.observe_node("retriever", 0.002)
+    second.record_message("b", {"intent": "faq", "cache_hit": True}, 0.3)
+    second.record_message("c", {"intent": "tool", "tool": "check_order_status"}, 0.02)
+    second.observe_node("retriever", 0.004)
+
+    merged = first.merge([first.export(), second.export()])
+    snapshot = merged.snapshot()
+
+    assert snapshot["workers"] == 2
+    assert snapshot["total_messages"] == 3
+    assert snapshot["active_sessions"] == 3
+    assert snapshot["intents"] == {"faq": 2, "tool": 1}
+    assert snapshot["tool_usage"] == {"check_order_status": 1}
+    # "c" never consulted the cache, so it is neither a hit nor a miss.
+    assert snapshot["cache"] == {"hits": 1, "misses": 1}
+    assert snapshot["latency"]["turn"]["count"] == 3
+    assert snapshot["latency"]["nodes"]["retriever"]["count"] == 2
+    assert "webchat_workers 2" in merged.render_prometheus()
+    # The source states are left untouched.
+    assert first.total_messages == 1
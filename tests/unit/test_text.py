@@ -0,0 +1,32 @@
+"""Unit tests for the shared text normalization helpers."""
+
+import unicodedata
+
+from backend.text import normalize, normalize_batch, tokenize, tokenize_batch
+
+
+def _reference(text: str) -> str:
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in folded if not unicodedata.combining(char))
+
+
+def test_turkish_letters_fold_to_ascii():
+    assert normalize("ŞİŞLİ'de Kapıda Ödeme ÇĞÜ") == "sisli'de kapida odeme cgu"
+    assert normalize("Hâlâ") == "hala"
+
+
+def test_matches_unicode_reference_outside_turkish_letters():
+    for text in ["Crème Brûlée", "ASCII only", "Ελληνικά", "naïve café ₺ 🚚", "Straße"]:
+        assert normalize(text) == _reference(text)
+
+
+def test_long_texts_bypass_the_cache():
+    text = "Sipariş " * 20
+    assert normalize(text) == "siparis " * 20
+
+
+def test_batch_api_matches_single_calls():
+    texts = ["İade süresi", "kargo", "", "Ürün\x00ayrı", "Ödeme seçenekleri"]
+    assert normalize_batch(texts) == [normalize(text) for text in texts]
+    assert tokenize_batch(texts) == [tokenize(text) for text in texts]
+    assert normalize_batch([]) == []
@@ -0,0 +1,164 @@
+"""Unit tests for the async tool execution layer."""
+
+import asyncio
+import time
+
+from langchain_core.tools import StructuredTool
+
+from backend.tool_executor import (
+    TOOL_UNAVAILABLE_MESSAGE,
+    CircuitBreaker,
+    MockToolService,
+    ToolCall,
+    ToolExecutor,
+    ToolSpec,
+    build_tool_executor,
+)
+from backend.tools import TOOL_REGISTRY
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _slow(delay, calls=None):
+    async def tool(value: str) -> str:
+        if calls is not None:
+            calls.append(value)
+        await asyncio.sleep(delay)
+        return f"sonuç {value}"
+
+    return tool
+
+
+def test_calls_fan_out_in_parallel_and_keep_order():
+    executor = ToolExecutor([ToolSpec(name, _slow(0.05)) for name in ("a", "b", "c")])
+
+    started = time.perf_counter()
+    results = asyncio.run(executor.execute_many([ToolCall(name, {"value": name}) for name in ("c", "a", "b")]))
+    elapsed = time.perf_counter() - started
+
+    assert [result.content for result in results] == ["sonuç c", "sonuç a", "sonuç b"]
+    assert elapsed < 0.12
+
+
+def test_timeout_returns_fallback_instead_of_raising():
+    executor = ToolExecutor([ToolSpec("slow", _slow(1.0), timeout=0.02)])
+    result = asyncio.run(executor.execute(ToolCall("slow", {"value": "x"})))
+    assert (result.ok, result.error, result.content) == (False, "timeout", TOOL_UNAVAILABLE_MESSAGE)
+    assert executor.stats()["slow"]["timeouts"] == 1
+
+
+def test_circuit_opens_after_failures_and_probes_after_reset():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_skips_the_service():
+    calls = []
+
+    async def broken(value: str) -> str:
+        calls.append(value)
+        raise ConnectionError("down")
+
+    executor = ToolExecutor([ToolSpec("broken", broken)], failure_threshold=2)
+
+    async def scenario():
+        return [await executor.execute(ToolCall("broken", {"value": "x"})) for _ in range(4)]
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert [result.error for result in results] == ["ConnectionError", "ConnectionError", "circuit_open", "circuit_open"]
+
+
+def test_results_are_cached_per_tool_ttl():
+    clock = FakeClock()
+    calls = []
+    executor = ToolExecutor(
+        [ToolSpec("status", _slow(0, calls), cache_ttl=10), ToolSpec("live", _slow(0, calls))],
+        clock=clock,
+    )
+
+    async def scenario():
+        first = await executor.execute(ToolCall("status", {"value": "İstanbul"}))
+        again = await executor.execute(ToolCall("status", {"value": "istanbul"}))
+        await executor.execute(ToolCall("live", {"value": "x"}))
+        await executor.execute(ToolCall("live", {"value": "x"}))
+        clock.now = 11
+        expired = await executor.execute(ToolCall("status", {"value": "istanbul"}))
+        return first, again, expired
+
+    first, again, expired = asyncio.run(scenario())
+    assert not first.cached and again.cached and not expired.cached
+    assert calls == ["İstanbul", "x", "x", "istanbul"]
+
+
+def test_mock_backend_matches_local_answers():
+    local = build_tool_executor("local")
+    mock = build_tool_executor("mock", mock_service=MockToolService(0, 0.001, seed=1))
+    call = ToolCall("calculate_shipping", {"city": "ankara"})
+    assert local.run(call).content == mock.run(call).content == "Ankara için tahmini kargo ücreti: 30 TL"
+
+
+def test_every_registry_tool_is_executable():
+    def stock_level(sku: str) -> str:
+        return f"{sku}: 3 adet"
+
+    stock = StructuredTool.from_function(func=stock_level, name="stock_level", description="Stok durumu")
+    registry = [*TOOL_REGISTRY, stock]
+    for backend in ("local", "mock"):
+        executor = build_tool_executor(backend, tools=registry, mock_service=MockToolService(0, 0.001, seed=1))
+        assert all(tool.name in executor for tool in registry)
+        assert executor.run(ToolCall("stock_level", {"sku": "A1"})).content == "A1: 3 adet"
+    assert all(tool.name in build_tool_executor() for tool in TOOL_REGISTRY)
+
+
+def test_invalid_arguments_do_not_open_the_circuit():
+    executor = build_tool_executor(failure_threshold=1)
+
+    async def scenario():
+        bad = [
+            await executor.execute(ToolCall("check_order_status", {})),
+            await executor.execute(ToolCall("check_order_status", {"order": "12345"})),
+        ]
+        # Schema coercion: a numeric id from the model still reaches the tool as a string.
+        good = await executor.execute(ToolCall("check_order_status", {"order_id": 12345}))
+        return bad, good
+
+    bad, good = asyncio.run(scenario())
+    assert [result.error for result in bad] == ["invalid_arguments", "invalid_arguments"]
+    assert good.ok and good.content == TOOL_REGISTRY[0].func("12345")
+    stats = executor.stats()["check_order_status"]
+    assert (stats["circuit"], stats["failures"], stats["invalid_arguments"]) == ("closed", 0, 2)
+
+
+def test_tool_failure_surfaces_as_fallback_answer(monkeypatch):
+    from backend import graph
+
+    async def broken(order_id: str) -> str:
+        raise ConnectionError("down")
+
+    monkeypatch.setattr(graph, "TOOL_EXECUTOR", ToolExecutor([ToolSpec("check_order_status", broken)]))
+    result = asyncio.run(graph.arun_agent("tool-down", "12345 sipariş durumu"))
+
+    assert result["response"] == TOOL_UNAVAILABLE_MESSAGE
+    assert result["metadata"]["tool_error"] == "ConnectionError"
@@ -0,0 +1,118 @@
+"""Unit tests for executing model-requested tool calls inside the graph."""
+
+import asyncio
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from backend import graph
+from backend.admission import AdmissionController
+from tests.fakes import ScriptedChatModel, tool_call
+
+
+def _use_model(monkeypatch, replies):
+    model = ScriptedChatModel(messages=iter(replies))
+    monkeypatch.setattr(graph, "LLM_WITH_TOOLS", model)
+    monkeypatch.setattr(graph, "CHAT_LLM", None)
+    monkeypatch.setattr(graph, "RESPONSE_CACHE", None)
+    monkeypatch.setattr(graph, "LLM_ADMISSION", AdmissionController())
+    return model
+
+
+def test_requested_tools_run_in_parallel_and_feed_the_next_call(monkeypatch):
+    model = _use_model(
+        monkeypatch,
+        [
+            AIMessage(
+                content="",
+                tool_calls=[
+                    tool_call("check_order_status", "c1", order_id="67890"),
+                    tool_call("calculate_shipping", "c2", city="ankara"),
+                ],
+            ),
+            AIMessage(content="Siparişiniz hazırlanıyor, Ankara kargosu 30 TL."),
+        ],
+    )
+
+    result = asyncio.run(graph.arun_agent("tool-loop-1", "67890 siparişim ve Ankara kargo ücreti"))
+
+    assert result["response"] == "Siparişiniz hazırlanıyor, Ankara kargosu 30 TL."
+    assert result["metadata"]["tool_calls"] == ["check_order_status", "calculate_shipping"]
+    tool_messages = [message for message in model.prompts[1] if isinstance(message, ToolMessage)]
+    assert [message.tool_call_id for message in tool_messages] == ["c1", "c2"]
+    assert "hazırlanıyor" in tool_messages[0].content
+    assert tool_messages[1].content.endswith("30 TL")
+
+
+def test_tool_rounds_are_bounded(monkeypatch):
+    monkeypatch.setattr(graph.settings, "LLM_MAX_TOOL_ITERATIONS", 2)
+    looping = AIMessage(content="", tool_calls=[tool_call("policy_lookup", "p", topic="iade")])
+    model = _use_model(monkeypatch, [looping] * 3)
+
+    result = graph.run_agent("tool-loop-2", "İade politikası nedir?")
+
+    assert len(model.prompts) == 3
+    assert result["metadata"]["tool_calls"] == ["policy_lookup", "policy_lookup"]
+    assert result["response"].startswith("Bulduğum bilgilere göre")
+
+
+def test_regex_tool_pass_is_skipped_when_llm_is_active(monkeypatch):
+    _use_model(monkeypatch, [AIMessage(content="Hangi siparişi soruyorsunuz?")])
+    result = graph.run_agent("tool-loop-3", "12345 sipariş durumu")
+    assert result["metadata"]["tool"] is None
+    assert result["response"] == "Hangi siparişi soruyorsunuz?"
+
+
+def test_streaming_turn_executes_tool_calls(monkeypatch):
+    _use_model(
+        monkeypatch,
+        [
+            AIMessage(content="", tool_calls=[tool_call("check_order_status", "s1", order_id="11111")]),
+            AIMessage(content="Siparişiniz teslim edildi."),
+        ],
+    )
+
+    async def collect():
+        return [event async for event in graph.astream_agent("tool-loop-4", "11111 nerede?")]
+
+    events = asyncio.run(collect())
+    assert "".join(event["delta"] for event in events if event["type"] == "delta") == "Siparişiniz teslim edildi."
+    assert events[-1]["metadata"]["tool_calls"] == ["check_order_status"]
+
+
+def _deltas_after_last_reset(events):
+    resets = [index for index, event in enumerate(events) if event["type"] == "reset"]
+    tail = events[resets[-1] + 1 :] if resets else events
+    return "".join(event["delta"] for event in tail if event["type"] == "delta")
+
+
+def test_streamed_text_of_a_tool_call_round_is_reset(monkeypatch):
+    _use_model(
+        monkeypatch,
+        [
+            AIMessage(content="Kontrol ediyorum", tool_calls=[tool_call("check_order_status", "s2", order_id="22222")]),
+            AIMessage(content="Siparişiniz yolda."),
+        ],
+    )
+
+    async def collect():
+        return [event async for event in graph.astream_agent("tool-loop-5", "22222 nerede?")]
+
+    events = asyncio.run(collect())
+    kinds = [event["type"] for event in events]
+    assert kinds.count("reset") == 1
+    assert "delta" in kinds[: kinds.index("reset")]
+    assert _deltas_after_last_reset(events) == events[-1]["response"] == "Siparişiniz yolda."
+
+
+def test_reset_precedes_the_composed_answer_at_the_tool_call_cap(monkeypatch):
+    monkeypatch.setattr(graph.settings, "LLM_MAX_TOOL_ITERATIONS", 1)
+    looping = AIMessage(content="Bir bakayım", tool_calls=[tool_call("policy_lookup", "p", topic="iade")])
+    _use_model(monkeypatch, [looping] * 2)
+
+    async def collect():
+        return [event async for event in graph.astream_agent("tool-loop-6", "İade politikası nedir?")]
+
+    events = asyncio.run(collect())
+    assert events[-2]["type"] == "reset"
+    assert _deltas_after_last_reset(events) == ""
+    assert events[-1]["response"].startswith("Bulduğum bilgilere göre")
@@ -0,0 +1,73 @@
+"""Unit tests for per-turn tracing and the OTLP/JSON export."""
+
+import asyncio
+import json
+
+import pytest
+
+from backend.tracing import NOOP_SPAN, Tracer
+
+
+def _spans(document):
+    return [span for resource in document["resourceSpans"] for scope in resource["scopeSpans"] for span in scope["spans"]]
+
+
+def test_spans_nest_and_capture_exceptions():
+    tracer = Tracer()
+    with tracer.trace("turn", **{"session.id": "s"}) as root:
+        trace_id = tracer.current_trace_id()
+        with tracer.span("node.ok"):
+            pass
+        with pytest.raises(ValueError):
+            with tracer.span("node.fail"):
+                raise ValueError("bozuk")
+        root.set_attribute("agent.intent", "faq")
+    assert tracer.current_trace_id() is None
+
+    spans = {span["name"]: span for span in _spans(tracer.dump())}
+    assert set(spans) == {"turn", "node.ok", "node.fail"}
+    assert all(span["traceId"] == trace_id for span in spans.values())
+    assert spans["node.ok"]["parentSpanId"] == spans["turn"]["spanId"]
+    assert "parentSpanId" not in spans["turn"]
+    assert spans["node.fail"]["status"] == {"code": "STATUS_CODE_ERROR", "message": "ValueError: bozuk"}
+    assert spans["node.fail"]["events"][0]["name"] == "exception"
+    assert {"key": "agent.intent", "value": {"stringValue": "faq"}} in spans["turn"]["attributes"]
+    assert int(spans["turn"]["endTimeUnixNano"]) >= int(spans["node.fail"]["endTimeUnixNano"])
+
+
+def test_unsampled_turns_keep_trace_id_but_record_nothing():
+    tracer = Tracer(sample_rate=0.0)
+    with tracer.trace("turn") as root:
+        assert root is NOOP_SPAN
+        assert tracer.current_trace_id()
+        with tracer.span("node") as span:
+            assert span is NOOP_SPAN
+    assert tracer.dump() == {"resourceSpans": []}
+    assert tracer.stats()["traces"] == 1
+
+
+def test_profiled_spans_carry_profile_and_memory(tmp_path):
+    export_path = tmp_path / "traces.jsonl"
+    tracer = Tracer(profile_rate=1.0, export_path=export_path)
+    with tracer.trace("turn"):
+        with tracer.span("node.work", profile=True):
+            sum(range(10_000))
+    tracer.flush()
+
+    exported = json.loads(export_path.read_text(encoding="utf-8"))
+    node = next(span for span in _spans(exported) if span["name"] == "node.work")
+    keys = {attribute["key"] for attribute in node["attributes"]}
+    assert {"profile.cumulative", "memory.peak_bytes"} <= keys
+
+
+def test_agent_turn_returns_trace_id_with_node_spans(monkeypatch):
+    from backend import graph
+
+    tracer = Tracer()
+    monkeypatch.setattr(graph, "TRACER", tracer)
+
+    result = asyncio.run(graph.arun_agent("trace-1", "12345 sipariş durumu"))
+    trace_id = result["metadata"]["trace_id"]
+
+    names = {span["name"] for span in _spans(tracer.dump()) if span["traceId"] == trace_id}
+    assert {"agent.turn", "node.intent_router", "node.tool_caller", "node.response_builder", "persist"} <= names
@@ -0,0 +1,50 @@
+"""Unit tests for the offline vector retriever."""
+
+import numpy as np
+
+from backend.knowledge import KnowledgeBaseManager
+from backend.rag_setup import BM25Retriever, load_knowledge_base
+from backend.vector_search import HashingEmbedder, HybridRetriever, VectorIndex, top_k_indices
+
+KB = load_knowledge_base("knowledge/kb.json")
+
+
+def test_embeddings_are_normalized_float32():
+    matrix = HashingEmbedder(dim=64).embed(["iade süresi", "", "kargo"])
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (3, 64)
+    assert np.allclose(np.linalg.norm(matrix[[0, 2]], axis=1), 1.0)
+    assert not matrix[1].any()
+
+
+def test_top_k_indices_orders_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 0]
+
+
+def test_vector_search_matches_inflected_turkish_words():
+    lexical = BM25Retriever(KB)
+    index = VectorIndex(KB, HashingEmbedder())
+
+    assert lexical.search("iadesi", k=1) == []
+    assert index.search("iadesi", k=1)[0].startswith("iade:")
+    assert index.search_batch(["iadesi", "kargom"], k=1) == [
+        index.search("iadesi", k=1),
+        index.search("kargom", k=1),
+    ]
+
+
+def test_hybrid_keeps_exact_lexical_matches():
+    lexical = BM25Retriever(KB)
+    hybrid = HybridRetriever(lexical, VectorIndex(lexical, HashingEmbedder()))
+    assert hybrid.search("garanti kapsamı", k=1) == lexical.search("garanti kapsamı", k=1)
+    assert hybrid.search("qwxz", k=2) == []
+    queries = ["garanti kapsamı", "kargom", "qwxz"]
+    assert hybrid.search_batch(queries, k=2) == [hybrid.search(query, k=2) for query in queries]
+
+
+def test_manager_publishes_hybrid_snapshots():
+    manager = KnowledgeBaseManager("knowledge/kb.json", embedder=HashingEmbedder())
+    assert isinstance(manager.retriever, HybridRetriever)
+    assert manager.retriever.search("kargom", k=1)[0].startswith("kargo:")